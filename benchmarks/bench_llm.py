@@ -0,0 +1,168 @@
+"""
+大模型调用压测：在本地模拟接口上以不同并发度运行论文分析和综述生成，报告吞吐和尾延迟
+
+所有请求发往benchmarks.mock_openai_server，不消耗token；延迟分布和429按随机种子注入，结果可复现。
+
+用法:
+    python -m benchmarks.bench_llm --papers 100 --concurrency 1,4,8,16 --latency 800 --distribution lognormal
+    python -m benchmarks.bench_llm --rate-429 0.05 --batch-size 1 --output bench_llm.json
+"""
+import os
+
+# 本地模拟接口不经过代理
+os.environ["NO_PROXY"] = ",".join(filter(None, ["127.0.0.1", "localhost", os.environ.get("NO_PROXY")]))
+os.environ["no_proxy"] = os.environ["NO_PROXY"]
+
+import sys
+import json
+import time
+import logging
+import argparse
+
+import config
+from modules.paper_analyzer import PaperAnalyzer
+from modules.content_generator import ContentGenerator
+from utils.llm_client import LLMClient, set_llm_client
+from utils.rate_limiter import RateLimiter
+from utils.paper_store import clear_paper_store
+from benchmarks.fixtures import build_corpus
+from benchmarks.mock_openai_server import MockOpenAIServer
+
+
+def build_papers(count, seed):
+    corpus = build_corpus(per_source=count, overlap=0.0, seed=seed)
+    papers = corpus["arxiv.org"][:count]
+    for paper in papers:
+        paper["source"] = "arXiv"
+    return papers
+
+
+def make_client(server, args):
+    """每个并发度使用新的客户端，用量统计互不影响；默认不限速，只测量客户端和接口本身"""
+    if args.respect_rate_limits:
+        rate_limiter = None
+    else:
+        rate_limiter = RateLimiter(0, 0, burst=1)
+    client = LLMClient(model="mock-model", api_key="sk-mock", base_url=server.base_url,
+                       token_budget=0, rate_limiter=rate_limiter)
+    set_llm_client(client)
+    return client
+
+
+def stage_summary(report, stage):
+    usage = report.get(stage) or {}
+    return {
+        "calls": usage.get("calls", 0),
+        "retries": usage.get("retries", 0),
+        "failures": usage.get("failures", 0),
+        "tokens": usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0),
+        "p50": usage.get("latency_p50", 0.0),
+        "p95": usage.get("latency_p95", 0.0),
+        "p99": usage.get("latency_p99", 0.0),
+    }
+
+
+def bench_level(server, papers, concurrency, args):
+    client = make_client(server, args)
+    result = {"concurrency": concurrency}
+
+    analyzer = PaperAnalyzer(use_cache=False, prefilter=False)
+    analyzer.max_workers = concurrency
+    analyzer.batch_size = max(1, args.batch_size)
+    # 嵌入接口需要下载分词器，压测中使用本地n-gram向量
+    analyzer.use_embedding_api = False
+
+    started = time.perf_counter()
+    analysis_results = analyzer.analyze_papers(papers, args.topic)
+    seconds = time.perf_counter() - started
+    result["analysis"] = dict(
+        stage_summary(client.usage_report(), "analysis"),
+        seconds=seconds,
+        papers=len(analysis_results),
+        errors=sum(1 for r in analysis_results if r.get("error")),
+        papers_per_second=len(analysis_results) / seconds if seconds else 0.0,
+    )
+
+    if not args.skip_generation:
+        categories = analyzer.categorize_papers(analysis_results)
+        generator = ContentGenerator()
+        generator.max_workers = concurrency
+        started = time.perf_counter()
+        generator.generate_survey(args.topic, categories, [r["paper"] for r in analysis_results], analysis_results)
+        seconds = time.perf_counter() - started
+        result["generation"] = dict(stage_summary(client.usage_report(), "section"), seconds=seconds)
+
+    clear_paper_store()
+    return result
+
+
+def print_report(report):
+    print(f"\n== 论文分析 ({report['config']['papers']} 篇，每批 {report['config']['batch_size']} 篇) ==")
+    print(f"{'并发':>4} {'耗时':>8} {'篇/秒':>8} {'调用':>6} {'重试':>6} {'失败':>6} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for level in report["levels"]:
+        a = level["analysis"]
+        print(f"{level['concurrency']:>4} {a['seconds']:>7.2f}s {a['papers_per_second']:>8.1f} {a['calls']:>6} "
+              f"{a['retries']:>6} {a['failures'] + a['errors']:>6} {a['p50']:>7.3f}s {a['p95']:>7.3f}s {a['p99']:>7.3f}s")
+
+    if any("generation" in level for level in report["levels"]):
+        print("\n== 综述生成 ==")
+        print(f"{'并发':>4} {'耗时':>8} {'调用':>6} {'重试':>6} {'p50':>8} {'p95':>8} {'p99':>8}")
+        for level in report["levels"]:
+            g = level.get("generation")
+            if g:
+                print(f"{level['concurrency']:>4} {g['seconds']:>7.2f}s {g['calls']:>6} {g['retries']:>6} "
+                      f"{g['p50']:>7.3f}s {g['p95']:>7.3f}s {g['p99']:>7.3f}s")
+
+    print(f"\n模拟接口统计: {report['server']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="大模型调用并发压测")
+    parser.add_argument("--topic", default="large language model", help="研究主题")
+    parser.add_argument("--papers", type=int, default=100, help="分析的论文数")
+    parser.add_argument("--concurrency", default="1,2,4,8,16", help="逗号分隔的并发度列表")
+    parser.add_argument("--batch-size", type=int, default=config.ANALYSIS_BATCH_SIZE, help="每次请求合并分析的论文数")
+    parser.add_argument("--latency", type=float, default=500, help="接口基础延迟(毫秒)，lognormal分布下为中位数")
+    parser.add_argument("--jitter", type=float, default=100, help="uniform分布下的延迟抖动(毫秒)")
+    parser.add_argument("--distribution", choices=["fixed", "uniform", "lognormal"], default="lognormal", help="延迟分布")
+    parser.add_argument("--sigma", type=float, default=0.5, help="lognormal分布的形状参数")
+    parser.add_argument("--token-latency", type=float, default=0, help="每个输出token额外的延迟(毫秒)")
+    parser.add_argument("--rate-429", type=float, default=0, help="随机返回429的概率")
+    parser.add_argument("--rpm-limit", type=int, default=0, help="模拟接口的每分钟请求数上限")
+    parser.add_argument("--retry-after", type=int, default=1, help="429响应的Retry-After(秒)")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--skip-generation", action="store_true", help="只测论文分析")
+    parser.add_argument("--respect-rate-limits", action="store_true", help="使用配置中的LLM_RPM_LIMIT/LLM_TPM_LIMIT限速")
+    parser.add_argument("--output", help="将结果保存为JSON文件")
+    parser.add_argument("--verbose", action="store_true", help="显示各模块日志")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        # 各模块创建Logger时会重设级别，因此直接屏蔽警告及以下的日志(重试次数已计入报告)
+        logging.disable(logging.WARNING)
+
+    papers = build_papers(args.papers, args.seed)
+    levels = [int(value) for value in args.concurrency.split(",") if value.strip()]
+
+    server = MockOpenAIServer(
+        latency=args.latency / 1000, jitter=args.jitter / 1000, distribution=args.distribution,
+        sigma=args.sigma, token_latency=args.token_latency / 1000, rate_429=args.rate_429,
+        rpm_limit=args.rpm_limit, retry_after=args.retry_after, seed=args.seed
+    )
+    with server:
+        results = []
+        for concurrency in levels:
+            results.append(bench_level(server, papers, concurrency, args))
+            print(f"并发 {concurrency} 完成: 分析 {results[-1]['analysis']['seconds']:.2f}s", file=sys.stderr)
+        report = {"config": vars(args), "levels": results, "server": dict(server.stats)}
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存到 {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""
+离线检索基准测试：端到端吞吐、各来源延迟和页面解析开销
+
+所有请求经ForwardingAdapter发往本地回放服务器，不访问外网，延迟和错误按随机种子注入，结果可复现。
+默认使用合成夹具，也可以用 HTTP_TRANSPORT_MODE=record 运行 main.py 录制真实响应后通过 --fixtures 指定。
+
+用法:
+    python -m benchmarks.bench_search --runs 5 --latency 80 --jitter 40
+    python -m benchmarks.bench_search --fixtures fixtures/http --query "large language model" --error-rate 0.1
+"""
+import os
+
+# 基准测试完全离线，不使用.env中的代理配置
+os.environ["USE_PROXY"] = "false"
+
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+import statistics
+from functools import partial
+
+from bs4 import BeautifulSoup
+
+from modules.search_engine import SearchEngine
+from utils.deadline import Deadline
+from utils.http_replay import ForwardingAdapter, FixtureStore
+from utils.html_parser import only
+from utils.proxy_pool import ProxyPool
+from utils.rate_limiter import RateLimiter
+from utils.circuit_breaker import CircuitBreaker
+from benchmarks.fixtures import write_fixtures
+from benchmarks.replay_server import ReplayServer
+from config import CRAWLER_HOST_LIMITS
+
+# 各主机结果页对应的解析范围，与SearchEngine中的解析方式一致
+PAGE_STRAINERS = {
+    "scholar.google.com": ("div", "gs_ri"),
+    "dl.acm.org": ("div", "issue-item"),
+    "ieeexplore.ieee.org": None,
+}
+
+
+class OfflineSearchEngine(SearchEngine):
+    """scholarly自行发送请求，无法经过回放传输层，因此Google Scholar改用直接爬取的方法"""
+    SOURCE_HANDLERS = dict(
+        SearchEngine.SOURCE_HANDLERS,
+        **{"scholar.google.com": ("_search_google_scholar_backup", "Google Scholar")}
+    )
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(values):
+    return {
+        "mean": statistics.fmean(values) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "min": min(values) if values else 0.0,
+        "max": max(values) if values else 0.0,
+    }
+
+
+def build_engine(server_url, args):
+    engine = OfflineSearchEngine(
+        max_papers=args.papers,
+        timeout=args.timeout,
+        concurrent=not args.sequential,
+        use_cache=False,
+        arxiv_max_results=args.arxiv_max,
+        transport=partial(ForwardingAdapter, server_url),
+        expand_query=args.expand
+    )
+    # 默认不限速，只测量客户端本身；--respect-rate-limits时使用与线上相同的各主机限速
+    if args.respect_rate_limits:
+        engine.rate_limiter = RateLimiter(limits=CRAWLER_HOST_LIMITS)
+    else:
+        engine.rate_limiter = RateLimiter(0, 0, burst=1)
+    engine.proxy_pool = ProxyPool()
+    # 熔断状态只在本次测试内有效，不写入主程序的状态文件
+    engine.circuit_breaker = CircuitBreaker()
+    if not args.verbose:
+        logging.getLogger("SearchEngine").setLevel(logging.CRITICAL)
+        logging.getLogger("QueryPlanner").setLevel(logging.CRITICAL)
+    return engine
+
+
+def bench_end_to_end(engine, server, query, runs):
+    durations, counts, requests = [], [], []
+    for _ in range(runs):
+        before = server.stats["replayed"] + server.stats["missing"] + server.stats["injected"]
+        started = time.perf_counter()
+        papers = engine.search(query)
+        durations.append(time.perf_counter() - started)
+        counts.append(len(papers))
+        requests.append(server.stats["replayed"] + server.stats["missing"] + server.stats["injected"] - before)
+
+    total_time = sum(durations)
+    return {
+        "seconds": summarize(durations),
+        "papers_per_run": summarize(counts),
+        "requests_per_run": summarize(requests),
+        "papers_per_second": sum(counts) / total_time if total_time else 0.0,
+        "requests_per_second": sum(requests) / total_time if total_time else 0.0,
+    }
+
+
+def bench_sources(engine, query, runs):
+    results = {}
+    for source, (_, display_name) in engine.SOURCE_HANDLERS.items():
+        durations, counts = [], []
+        for _ in range(runs):
+            engine._deadline = Deadline(engine.timeout)
+            started = time.perf_counter()
+            papers = engine._run_source(source, query)
+            durations.append(time.perf_counter() - started)
+            counts.append(len(papers))
+        results[display_name] = {"seconds": summarize(durations), "papers": summarize(counts)}
+    return results
+
+
+def bench_parse(fixture_dir, repeats):
+    """对夹具中的结果页分别用各解析器做完整解析和只解析结果子树，统计单页耗时"""
+    parsers = ["html.parser"]
+    try:
+        import lxml  # noqa: F401
+        parsers.append("lxml")
+    except ImportError:
+        pass
+
+    pages = []
+    for name in sorted(os.listdir(fixture_dir)):
+        if not name.endswith(".json"):
+            continue
+        with open(os.path.join(fixture_dir, name), "r", encoding="utf-8") as f:
+            fixture = json.load(f)
+        host = fixture["url"].split("/")[2]
+        content_type = {k.lower(): v for k, v in fixture["headers"].items()}.get("content-type", "")
+        if host in PAGE_STRAINERS and "html" in content_type:
+            status, headers, content = FixtureStore(fixture_dir).load(fixture["method"], fixture["url"])
+            if len(content) > 10000:
+                pages.append((host, content.decode("utf-8", errors="replace")))
+
+    results = {}
+    for host, text in pages:
+        strainer = PAGE_STRAINERS[host]
+        for parser in parsers:
+            modes = [("full", None)]
+            if strainer:
+                modes.append(("strained", only(*strainer)))
+            for mode, parse_only in modes:
+                durations = []
+                for _ in range(repeats):
+                    started = time.perf_counter()
+                    BeautifulSoup(text, parser, parse_only=parse_only)
+                    durations.append(time.perf_counter() - started)
+                results[f"{host} [{len(text) // 1024}KB] {parser}/{mode}"] = summarize(durations)
+    return results
+
+
+def print_report(report):
+    print(f"\n== 端到端检索 ({report['config']['runs']} 次) ==")
+    e2e = report["end_to_end"]
+    print(f"耗时: 平均 {e2e['seconds']['mean']:.3f}s  p50 {e2e['seconds']['p50']:.3f}s  p95 {e2e['seconds']['p95']:.3f}s")
+    print(f"每次论文数: {e2e['papers_per_run']['mean']:.1f}  每次请求数: {e2e['requests_per_run']['mean']:.1f}")
+    print(f"吞吐: {e2e['papers_per_second']:.1f} 篇/秒  {e2e['requests_per_second']:.1f} 请求/秒")
+
+    print("\n== 各来源延迟 ==")
+    for name, result in report["sources"].items():
+        seconds = result["seconds"]
+        print(f"{name:<16} p50 {seconds['p50']:.3f}s  p95 {seconds['p95']:.3f}s  论文数 {result['papers']['mean']:.1f}")
+
+    print("\n== 页面解析开销(单页) ==")
+    for name, result in report["parse"].items():
+        print(f"{name:<48} p50 {result['p50'] * 1000:8.2f}ms  p95 {result['p95'] * 1000:8.2f}ms")
+
+    print(f"\n回放服务器统计: {report['server']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线检索基准测试")
+    parser.add_argument("--query", default="large language model", help="检索主题")
+    parser.add_argument("--fixtures", help="夹具目录，不指定时生成合成夹具")
+    parser.add_argument("--per-source", type=int, default=50, help="合成夹具中每个来源的论文数")
+    parser.add_argument("--papers", type=int, default=100, help="最大检索论文数")
+    parser.add_argument("--arxiv-max", type=int, default=None, help="从ArXiv获取的论文数")
+    parser.add_argument("--timeout", type=int, default=120, help="检索时间预算(秒)")
+    parser.add_argument("--runs", type=int, default=5, help="端到端和各来源测试的重复次数")
+    parser.add_argument("--parse-repeats", type=int, default=20, help="解析测试的重复次数")
+    parser.add_argument("--latency", type=float, default=50, help="回放服务器基础延迟(毫秒)")
+    parser.add_argument("--jitter", type=float, default=20, help="延迟抖动(毫秒)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="注入错误的概率")
+    parser.add_argument("--error-status", type=int, default=503, help="注入的错误状态码")
+    parser.add_argument("--retry-after", type=int, default=None, help="注入错误时附带的Retry-After(秒)")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--sequential", action="store_true", help="按顺序检索各来源")
+    parser.add_argument("--expand", action="store_true", help="启用查询扩展，按子查询并发检索")
+    parser.add_argument("--respect-rate-limits", action="store_true", help="使用线上的各主机限速配置")
+    parser.add_argument("--output", help="将结果保存为JSON文件")
+    parser.add_argument("--verbose", action="store_true", help="显示检索日志")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="surge-fixtures-") as tmp_dir:
+        fixture_dir = args.fixtures or tmp_dir
+        server = ReplayServer(
+            fixture_dir, latency=args.latency / 1000, jitter=args.jitter / 1000,
+            error_rate=args.error_rate, error_status=args.error_status,
+            retry_after=args.retry_after, seed=args.seed
+        )
+        with server:
+            engine = build_engine(server.url, args)
+            try:
+                if not args.fixtures:
+                    queries = engine._plan_queries(args.query)
+                    write_fixtures(fixture_dir, engine, queries, per_source=args.per_source, seed=args.seed)
+
+                report = {
+                    "config": vars(args),
+                    "end_to_end": bench_end_to_end(engine, server, args.query, args.runs),
+                    "sources": bench_sources(engine, args.query, args.runs),
+                    "parse": bench_parse(fixture_dir, args.parse_repeats),
+                    "server": dict(server.stats),
+                }
+            finally:
+                engine.close()
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存到 {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+"""
+生成合成夹具：按各来源真实页面的结构构造ArXiv、Google Scholar、IEEE和ACM的检索响应
+
+生成的内容完全由随机种子决定，适合在没有录制数据的离线环境中做可复现的基准测试。
+部分论文会同时出现在多个来源中，以便覆盖去重逻辑。
+"""
+import json
+import random
+from xml.sax.saxutils import escape
+
+import arxiv
+
+from utils.http_replay import FixtureStore
+from config import ARXIV_PAGE_SIZE
+
+_WORDS = (
+    "graph neural network transformer attention retrieval augmented generation large language model "
+    "contrastive learning diffusion reinforcement policy optimization federated privacy robust adversarial "
+    "benchmark evaluation efficient sparse quantization distillation multimodal vision speech knowledge "
+    "reasoning planning agent scalable distributed inference training survey analysis framework"
+).split()
+_SURNAMES = "Wang Li Zhang Liu Chen Smith Johnson Brown Garcia Miller Davis Kim Park Nguyen Müller".split()
+
+
+def build_corpus(per_source=50, overlap=0.2, seed=0):
+    """
+    构造合成论文集
+
+    参数:
+    - per_source: 每个来源的论文数
+    - overlap: 每个来源中与其他来源重复的论文比例
+    - seed: 随机种子
+
+    返回:
+    - {来源: 论文列表}
+    """
+    rng = random.Random(seed)
+
+    def make_paper(index):
+        words = rng.sample(_WORDS, rng.randint(6, 12))
+        return {
+            "title": " ".join(words).capitalize(),
+            "authors": [f"{rng.choice('ABCDEFGHJKLMNPRSTWXYZ')}. {rng.choice(_SURNAMES)}" for _ in range(rng.randint(1, 6))],
+            "year": rng.randint(2012, 2025),
+            "abstract": " ".join(rng.choice(_WORDS) for _ in range(rng.randint(80, 200))).capitalize() + ".",
+            "doi": f"10.{rng.randint(1000, 9999)}/{rng.randint(100000, 999999)}",
+            "number": 9000000 + index,
+        }
+
+    shared_count = int(per_source * overlap)
+    shared = [make_paper(i) for i in range(shared_count)]
+    corpus = {}
+    next_index = shared_count
+    for source in ("arxiv.org", "scholar.google.com", "ieee.org", "acm.org"):
+        papers = list(shared)
+        for _ in range(per_source - shared_count):
+            papers.append(make_paper(next_index))
+            next_index += 1
+        rng.shuffle(papers)
+        corpus[source] = papers
+    return corpus
+
+
+def _padding(rng, size):
+    """页面中与检索结果无关的导航、脚本和样式，使页面大小接近真实页面"""
+    chunks = []
+    length = 0
+    while length < size:
+        kind = rng.randrange(3)
+        if kind == 0:
+            chunk = "<script>var cfg_%d = %s;</script>" % (length, json.dumps({w: rng.random() for w in rng.sample(_WORDS, 8)}))
+        elif kind == 1:
+            chunk = "<div class=\"nav\"><ul>%s</ul></div>" % "".join(
+                f"<li class=\"nav-item\"><a href=\"/{w}\">{w}</a></li>" for w in rng.sample(_WORDS, 10))
+        else:
+            chunk = "<style>.c%d{margin:0;padding:%dpx}</style>" % (length, rng.randrange(20))
+        chunks.append(chunk)
+        length += len(chunk)
+    return "".join(chunks)
+
+
+def render_arxiv_feed(papers, start, size, total):
+    entries = []
+    for offset, paper in enumerate(papers[start:start + size]):
+        arxiv_id = f"2101.{start + offset:05d}v1"
+        authors = "".join(f"<author><name>{escape(a)}</name></author>" for a in paper["authors"])
+        entries.append(
+            f"<entry><id>http://arxiv.org/abs/{arxiv_id}</id>"
+            f"<updated>{paper['year']}-01-01T00:00:00Z</updated><published>{paper['year']}-01-01T00:00:00Z</published>"
+            f"<title>{escape(paper['title'])}</title><summary>{escape(paper['abstract'])}</summary>{authors}"
+            f"<link href=\"http://arxiv.org/abs/{arxiv_id}\" rel=\"alternate\" type=\"text/html\"/>"
+            f"<link title=\"pdf\" href=\"http://arxiv.org/pdf/{arxiv_id}\" rel=\"related\" type=\"application/pdf\"/>"
+            f"<arxiv:primary_category xmlns:arxiv=\"http://arxiv.org/schemas/atom\" term=\"cs.LG\" scheme=\"http://arxiv.org/schemas/atom\"/>"
+            f"<category term=\"cs.LG\" scheme=\"http://arxiv.org/schemas/atom\"/></entry>"
+        )
+    return (
+        "<?xml version=\"1.0\" encoding=\"UTF-8\"?>"
+        "<feed xmlns=\"http://www.w3.org/2005/Atom\" xmlns:opensearch=\"http://a9.com/-/spec/opensearch/1.1/\">"
+        f"<opensearch:totalResults>{total}</opensearch:totalResults><opensearch:startIndex>{start}</opensearch:startIndex>"
+        + "".join(entries) + "</feed>"
+    )
+
+
+def render_scholar_page(papers, rng, padding=60000):
+    items = []
+    for paper in papers:
+        marker = "[PDF] " if rng.random() < 0.3 else ""
+        items.append(
+            "<div class=\"gs_r gs_or gs_scl\"><div class=\"gs_ri\">"
+            f"<h3 class=\"gs_rt\"><a href=\"https://example.org/{paper['number']}\">{marker}{escape(paper['title'])}</a></h3>"
+            f"<div class=\"gs_a\">{escape(', '.join(paper['authors']))} - Journal of Examples, {paper['year']} - example.org</div>"
+            f"<div class=\"gs_rs\">{escape(paper['abstract'][:300])}</div>"
+            "<div class=\"gs_fl\"><a href=\"#\">Cited by 12</a> <a href=\"#\">Related articles</a></div>"
+            "</div></div>"
+        )
+    return (
+        "<!doctype html><html><head><title>Google Scholar</title>" + _padding(rng, padding // 2) + "</head>"
+        "<body><div id=\"gs_res_ccl_mid\">" + "".join(items) + "</div>" + _padding(rng, padding // 2) + "</body></html>"
+    )
+
+
+def render_ieee_json(papers):
+    records = [{
+        "articleTitle": paper["title"],
+        "authors": [{"preferredName": a} for a in paper["authors"]],
+        "publicationYear": str(paper["year"]),
+        "abstract": paper["abstract"],
+        "documentLink": f"/document/{paper['number']}/",
+        "articleNumber": str(paper["number"]),
+        "doi": paper["doi"],
+    } for paper in papers]
+    return json.dumps({"records": records, "totalRecords": len(records), "totalPages": 1})
+
+
+def render_acm_page(papers, rng, padding=80000):
+    items = []
+    for paper in papers:
+        authors = "".join(
+            f"<li class=\"issue-item__etal\"><span class=\"author-name\">{escape(a)}</span></li>" for a in paper["authors"])
+        items.append(
+            "<div class=\"issue-item issue-item--search clearfix\">"
+            f"<h5 class=\"issue-item__title\"><a href=\"/doi/{paper['doi']}\">{escape(paper['title'])}</a></h5>"
+            f"<ul class=\"rlist--inline loa truncate-list\">{authors}</ul>"
+            f"<div class=\"bookPubDate simple-tooltip__block--b\">January {paper['year']}</div>"
+            f"<div class=\"issue-item__abstract truncate-text\"><p>{escape(paper['abstract'])}</p></div>"
+            f"<a class=\"issue-item__doi\" href=\"https://doi.org/{paper['doi']}\">https://doi.org/{paper['doi']}</a>"
+            "</div>"
+        )
+    return (
+        "<!doctype html><html><head><title>ACM Digital Library</title>" + _padding(rng, padding // 2) + "</head>"
+        "<body><ul class=\"search-result__body items-results\">" + "".join(items) + "</ul>"
+        + _padding(rng, padding // 2) + "</body></html>"
+    )
+
+
+def write_fixtures(directory, engine, queries, per_source=50, overlap=0.2, seed=0):
+    """
+    为一次检索生成全部夹具
+
+    参数:
+    - directory: 夹具目录
+    - engine: SearchEngine，用于按相同的参数构造ArXiv请求URL
+    - queries: 子查询列表；ArXiv按子查询分别生成结果，其余来源所有子查询共用同一结果页
+    - per_source, overlap, seed: 见build_corpus
+
+    返回:
+    - {来源: 论文列表}
+    """
+    store = FixtureStore(directory)
+    corpus = build_corpus(per_source=per_source, overlap=overlap, seed=seed)
+    rng = random.Random(seed)
+    html = {"Content-Type": "text/html; charset=utf-8"}
+
+    # ArXiv按分页请求，每页的URL与SearchEngine._fetch_arxiv_page发出的一致
+    max_results = engine.arxiv_max_results or int(engine.max_papers * 0.3)
+    page_size = max(1, min(ARXIV_PAGE_SIZE, max_results))
+    for index, query in enumerate(queries):
+        # 子查询的结果与原始主题部分重叠
+        papers = corpus["arxiv.org"] if index == 0 else build_corpus(per_source, overlap, seed + index)["arxiv.org"]
+        search_query = engine._build_arxiv_query(query)
+        for start in range(0, max_results, page_size):
+            size = min(page_size, max_results - start)
+            search = arxiv.Search(query=search_query, max_results=start + size, sort_by=arxiv.SortCriterion.Relevance)
+            url = arxiv.Client(page_size=size)._format_url(search, start, size)
+            feed = render_arxiv_feed(papers, start, size, total=len(papers))
+            store.save("GET", url, 200, {"Content-Type": "application/atom+xml; charset=utf-8"}, feed.encode("utf-8"), level=1)
+
+    # 其余来源只有一个结果页，按主机+路径匹配
+    store.save("GET", "https://scholar.google.com/scholar", 200, html,
+               render_scholar_page(corpus["scholar.google.com"], rng).encode("utf-8"), level=2)
+    store.save("GET", "https://ieeexplore.ieee.org/Xplore/home.jsp", 200, html,
+               b"<html><body>IEEE Xplore</body></html>", level=2)
+    store.save("POST", "https://ieeexplore.ieee.org/rest/search", 200, {"Content-Type": "application/json"},
+               render_ieee_json(corpus["ieee.org"]).encode("utf-8"), level=2)
+    store.save("GET", "https://dl.acm.org/", 200, html, b"<html><body>ACM Digital Library</body></html>", level=2)
+    store.save("GET", "https://dl.acm.org/action/doSearch", 200, html,
+               render_acm_page(corpus["acm.org"], rng).encode("utf-8"), level=2)
+    return corpus
+
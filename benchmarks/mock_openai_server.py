@@ -0,0 +1,283 @@
+"""
+本地模拟的OpenAI兼容接口：/v1/chat/completions 按提示词类型返回模板化的内容，可配置延迟分布和429限流
+
+论文分析(单篇和合并)返回符合ANALYSIS_FIELDS的JSON，查询扩展返回若干行查询，其他请求(综述章节)返回占位段落。
+把OPENAI_API_BASE_URL指向该服务器即可在不消耗token的情况下运行整个流程或做并发压测。
+
+用法:
+    python -m benchmarks.mock_openai_server --port 8766 --latency 800 --distribution lognormal --rate-429 0.05
+    OPENAI_API_BASE_URL=http://127.0.0.1:8766/v1 OPENAI_API_KEY=sk-mock python main.py --topic "large language model"
+"""
+import re
+import json
+import time
+import math
+import random
+import hashlib
+import argparse
+import threading
+from collections import Counter, deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from modules.paper_analyzer import ANALYSIS_FIELDS
+from utils.llm_client import estimate_tokens
+
+# 模板化分析结果中使用的研究方向，按标题哈希选取，使分类阶段有多个类别可合并
+DIRECTIONS = [
+    "大语言模型推理", "大语言模型的推理能力", "检索增强生成", "检索增强的语言模型",
+    "参数高效微调", "模型压缩与量化", "多模态学习", "多模态大模型", "代码生成", "智能体与工具调用",
+]
+RELEVANCE = ["高，直接研究该主题", "中，部分方法可借鉴", "低，仅在背景中涉及"]
+STATUS = ["开创性工作", "改进工作", "应用工作", "综述性工作"]
+
+_PAPER_BLOCK = re.compile(r"^\s*\[(\d+)\]\s*\nTitle: (.*)$", re.M)
+_TITLE = re.compile(r"^\s*Title: (.*)$", re.M)
+
+
+class MockOpenAIServer:
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, distribution="uniform", sigma=0.5,
+                 token_latency=0.0, rate_429=0.0, rpm_limit=0, retry_after=1, section_words=300, seed=0):
+        """
+        参数:
+        - host, port: 监听地址，port为0时自动选择空闲端口
+        - latency: 基础延迟(秒)；lognormal分布下为中位数
+        - jitter: uniform分布下延迟在 latency ± jitter 内均匀分布
+        - distribution: 延迟分布，"fixed"、"uniform"或"lognormal"
+        - sigma: lognormal分布的形状参数，越大长尾越明显
+        - token_latency: 每个输出token额外的生成时间(秒)
+        - rate_429: 按该概率返回429
+        - rpm_limit: 每分钟请求数上限，超出时返回429；0表示不限制。所有响应都带x-ratelimit-*响应头
+        - retry_after: 429响应附带的Retry-After(秒)
+        - section_words: 综述章节占位文本的词数
+        - seed: 随机种子，固定后延迟和429序列可复现
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.distribution = distribution
+        self.sigma = sigma
+        self.token_latency = token_latency
+        self.rate_429 = rate_429
+        self.rpm_limit = rpm_limit
+        self.retry_after = retry_after
+        self.section_words = section_words
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window = deque()
+        self.stats = Counter()
+
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def base_url(self):
+        """作为OPENAI_API_BASE_URL使用的地址"""
+        return f"{self.url}/v1"
+
+    def start(self):
+        """在后台线程中启动服务器，返回服务器地址"""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-openai", daemon=True)
+        self._thread.start()
+        return self.url
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _admit(self):
+        """
+        决定本次请求是否限流
+
+        返回:
+        - (是否返回429, 速率限制响应头)
+        """
+        now = time.monotonic()
+        with self._lock:
+            while self._window and now - self._window[0] >= 60:
+                self._window.popleft()
+            limited = self._random.random() < self.rate_429
+            if self.rpm_limit and len(self._window) >= self.rpm_limit:
+                limited = True
+            if not limited:
+                self._window.append(now)
+
+            headers = {}
+            if self.rpm_limit:
+                reset = 60 - (now - self._window[0]) if self._window else 0.0
+                headers["x-ratelimit-limit-requests"] = str(self.rpm_limit)
+                headers["x-ratelimit-remaining-requests"] = str(max(0, self.rpm_limit - len(self._window)))
+                headers["x-ratelimit-reset-requests"] = f"{reset:.3f}s"
+        return limited, headers
+
+    def _delay(self, completion_tokens):
+        with self._lock:
+            if self.distribution == "fixed":
+                delay = self.latency
+            elif self.distribution == "lognormal":
+                delay = self.latency * math.exp(self._random.gauss(0, self.sigma)) if self.latency else 0.0
+            else:
+                delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+        return max(0.0, delay) + self.token_latency * completion_tokens
+
+    def complete(self, body):
+        """
+        根据提示词生成模板化的回复
+
+        返回:
+        - (回复文本, 请求类型)
+        """
+        messages = body.get("messages") or []
+        prompt = "\n".join(str(m.get("content", "")) for m in messages)
+
+        batch = _PAPER_BLOCK.findall(prompt)
+        if batch:
+            papers = [dict(self._analysis(title), id=int(number)) for number, title in batch]
+            return json.dumps({"papers": papers}, ensure_ascii=False), "analysis_batch"
+
+        titles = _TITLE.findall(prompt)
+        if titles and "研究主题" in prompt:
+            return json.dumps(self._analysis(titles[0]), ensure_ascii=False), "analysis"
+
+        if "检索" in prompt and "查询" in prompt:
+            match = re.search(r"生成 (\d+) 个", prompt)
+            count = int(match.group(1)) if match else 3
+            return "\n".join(f"mock subquery {i + 1}" for i in range(count)), "query_expansion"
+
+        words = ["lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit"]
+        digest = int(hashlib.md5(prompt.encode("utf-8")).hexdigest(), 16)
+        text = " ".join(words[(digest >> (i % 64)) % len(words)] for i in range(self.section_words))
+        return text.capitalize() + ".", "section"
+
+    @staticmethod
+    def _analysis(title):
+        """按标题哈希生成确定的分析结果"""
+        digest = int(hashlib.md5(title.encode("utf-8")).hexdigest(), 16)
+        values = {
+            'research_direction': DIRECTIONS[digest % len(DIRECTIONS)],
+            'contributions': f"提出了与“{title[:40]}”相关的新方法",
+            'methods': "基于Transformer的模型与对比学习",
+            'results': "在公开数据集上优于基线方法",
+            'relevance': RELEVANCE[(digest >> 8) % len(RELEVANCE)],
+            'status': STATUS[(digest >> 16) % len(STATUS)],
+        }
+        return {key: values.get(key, "信息不足") for key in ANALYSIS_FIELDS}
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send(404, {"error": {"message": f"unsupported path {self.path}", "type": "invalid_request_error"}})
+                    return
+                try:
+                    body = json.loads(raw or b"{}")
+                except ValueError:
+                    self._send(400, {"error": {"message": "invalid JSON body", "type": "invalid_request_error"}})
+                    return
+
+                limited, headers = server._admit()
+                if limited:
+                    with server._lock:
+                        server.stats["429"] += 1
+                    headers["Retry-After"] = str(server.retry_after)
+                    self._send(429, {"error": {"message": "Rate limit reached (mock)", "type": "rate_limit_error",
+                                               "code": "rate_limit_exceeded"}}, headers)
+                    return
+
+                content, kind = server.complete(body)
+                prompt_tokens = sum(estimate_tokens(str(m.get("content", ""))) for m in body.get("messages") or [])
+                completion_tokens = estimate_tokens(content)
+                time.sleep(server._delay(completion_tokens))
+
+                with server._lock:
+                    server.stats["completed"] += 1
+                    server.stats[f"kind:{kind}"] += 1
+                    server.stats["prompt_tokens"] += prompt_tokens
+                    server.stats["completion_tokens"] += completion_tokens
+
+                self._send(200, {
+                    "id": f"chatcmpl-mock-{server.stats['completed']}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "mock"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens,
+                    },
+                }, headers)
+
+            def _send(self, status, payload, headers=None):
+                content = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模拟OpenAI chat completions接口的本地服务器")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=8766, help="监听端口")
+    parser.add_argument("--latency", type=float, default=500, help="基础延迟(毫秒)，lognormal分布下为中位数")
+    parser.add_argument("--jitter", type=float, default=0, help="uniform分布下的延迟抖动(毫秒)")
+    parser.add_argument("--distribution", choices=["fixed", "uniform", "lognormal"], default="uniform", help="延迟分布")
+    parser.add_argument("--sigma", type=float, default=0.5, help="lognormal分布的形状参数")
+    parser.add_argument("--token-latency", type=float, default=0, help="每个输出token额外的延迟(毫秒)")
+    parser.add_argument("--rate-429", type=float, default=0, help="随机返回429的概率")
+    parser.add_argument("--rpm-limit", type=int, default=0, help="每分钟请求数上限，超出返回429")
+    parser.add_argument("--retry-after", type=int, default=1, help="429响应的Retry-After(秒)")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(
+        host=args.host, port=args.port, latency=args.latency / 1000, jitter=args.jitter / 1000,
+        distribution=args.distribution, sigma=args.sigma, token_latency=args.token_latency / 1000,
+        rate_429=args.rate_429, rpm_limit=args.rpm_limit, retry_after=args.retry_after, seed=args.seed
+    )
+    print(f"模拟OpenAI接口已启动: {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"请求统计: {dict(server.stats)}")
+
+
+if __name__ == "__main__":
+    main()
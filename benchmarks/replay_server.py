@@ -0,0 +1,174 @@
+"""
+本地回放服务器：从夹具目录返回录制的响应，可配置延迟和错误注入
+
+配合utils.http_replay.ForwardingAdapter使用，请求经过真实的本地TCP连接，
+用于在离线环境下测量并发、限速和重试逻辑的表现。
+
+用法:
+    python -m benchmarks.replay_server --fixtures fixtures/http --port 8765 --latency 80 --jitter 40 --error-rate 0.05
+"""
+import time
+import random
+import argparse
+import threading
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from utils.http_replay import FixtureStore, ORIGINAL_URL_HEADER
+
+# 回放时不转发的响应头，由服务器根据实际内容重新生成
+_HOP_HEADERS = {"content-length", "transfer-encoding", "connection", "content-encoding"}
+
+
+class ReplayServer:
+    def __init__(self, fixture_dir, host="127.0.0.1", port=0, latency=0.0, jitter=0.0,
+                 error_rate=0.0, error_status=503, retry_after=None, host_latency=None, seed=0):
+        """
+        参数:
+        - fixture_dir: 夹具目录
+        - host, port: 监听地址，port为0时自动选择空闲端口
+        - latency: 每个响应的基础延迟(秒)
+        - jitter: 延迟的随机抖动范围(秒)，实际延迟在 latency ± jitter 内均匀分布
+        - error_rate: 按该概率返回错误状态码而不是夹具内容
+        - error_status: 注入的错误状态码，例如503或429
+        - retry_after: 可选，注入错误时附带的Retry-After(秒)
+        - host_latency: 可选，{原始主机: (延迟, 抖动)}，覆盖指定主机的延迟
+        - seed: 随机种子，固定后注入的延迟和错误序列可复现
+        """
+        self.store = FixtureStore(fixture_dir)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.host_latency = dict(host_latency or {})
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = Counter()
+
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """在后台线程中启动服务器，返回服务器地址"""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="replay-server", daemon=True)
+        self._thread.start()
+        return self.url
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _plan(self, original_host):
+        """决定本次响应的延迟以及是否注入错误"""
+        latency, jitter = self.host_latency.get(original_host, (self.latency, self.jitter))
+        with self._lock:
+            delay = max(0.0, latency + self._random.uniform(-jitter, jitter))
+            failed = self._random.random() < self.error_rate
+        return delay, failed
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                self._replay()
+
+            def do_POST(self):
+                self._replay()
+
+            def do_HEAD(self):
+                self._replay()
+
+            def _replay(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else None
+                original_url = self.headers.get(ORIGINAL_URL_HEADER) or f"http://{self.headers.get('Host')}{self.path}"
+                original_host = original_url.split("/")[2] if "://" in original_url else ""
+
+                delay, failed = server._plan(original_host)
+                if delay:
+                    time.sleep(delay)
+
+                fixture = None if failed else server.store.load(self.command, original_url, body)
+                if failed:
+                    status, headers, content = server.error_status, {"Content-Type": "text/plain"}, b"injected error"
+                    if server.retry_after is not None:
+                        headers["Retry-After"] = str(server.retry_after)
+                    outcome = "injected"
+                elif fixture is None:
+                    status, headers, content = 404, {"Content-Type": "text/plain"}, b"no fixture"
+                    outcome = "missing"
+                else:
+                    status, headers, content = fixture
+                    outcome = "replayed"
+
+                with server._lock:
+                    server.stats[outcome] += 1
+                    server.stats[f"host:{original_host}"] += 1
+
+                self.send_response(status)
+                for name, value in headers.items():
+                    if name.lower() not in _HOP_HEADERS:
+                        self.send_header(name, value)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="从夹具目录回放HTTP响应的本地服务器")
+    parser.add_argument("--fixtures", required=True, help="夹具目录")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=8765, help="监听端口")
+    parser.add_argument("--latency", type=float, default=0, help="基础延迟(毫秒)")
+    parser.add_argument("--jitter", type=float, default=0, help="延迟抖动(毫秒)")
+    parser.add_argument("--error-rate", type=float, default=0, help="注入错误的概率")
+    parser.add_argument("--error-status", type=int, default=503, help="注入的错误状态码")
+    parser.add_argument("--retry-after", type=int, default=None, help="注入错误时附带的Retry-After(秒)")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    server = ReplayServer(
+        args.fixtures, host=args.host, port=args.port,
+        latency=args.latency / 1000, jitter=args.jitter / 1000,
+        error_rate=args.error_rate, error_status=args.error_status,
+        retry_after=args.retry_after, seed=args.seed
+    )
+    print(f"回放服务器已启动: {server.url}，夹具目录: {args.fixtures}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"请求统计: {dict(server.stats)}")
+
+
+if __name__ == "__main__":
+    main()
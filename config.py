@@ -9,6 +9,39 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_API_BASE_URL = os.getenv("OPENAI_API_BASE_URL", "https://api.openai.com/v1")
 OPENAI_MODEL = os.getenv("OPENAI_API_MODEL", "gpt-4o-mini")
 
+# 大模型调用配置
+ANALYSIS_WORKERS = 8  # 并发分析论文的线程数
+LLM_RPM_LIMIT = 500  # 每分钟最多发出的请求数，0表示不限制
+LLM_TPM_LIMIT = 200000  # 每分钟最多消耗的token数(按提示词估算并加上预留的输出)，0表示不限制
+LLM_OUTPUT_TOKENS_ESTIMATE = 600  # 估算token消耗时为每次调用的输出预留的token数
+LLM_MAX_RETRIES = 4  # 429、5xx、超时等错误的最大重试次数，退避时长与检索共用BACKOFF_BASE/BACKOFF_MAX
+LLM_REQUEST_TIMEOUT = 120  # 单次调用的超时时间(秒)
+LLM_TOKEN_BUDGET = int(os.getenv("LLM_TOKEN_BUDGET", "0"))  # 每次运行最多消耗的token数(输入加输出)，用完后中止运行，0表示不限制
+
+# 论文分析结果缓存
+ANALYSIS_CACHE_ENABLED = True  # 是否缓存每篇论文的分析结果
+ANALYSIS_CACHE_DIR = os.path.join(".cache", "analysis")  # 缓存目录
+ANALYSIS_CACHE_MAX_ENTRIES = 5000  # 最多缓存的分析结果数，超出后淘汰最久未使用的
+ANALYSIS_PROMPT_VERSION = 2  # 分析提示词的版本，修改提示词或输出格式后递增，使旧的缓存失效
+
+# 合并分析：一次请求分析多篇论文，共用同一段说明
+ANALYSIS_BATCH_SIZE = 5  # 每次请求最多分析的论文数，1表示逐篇分析
+ANALYSIS_BATCH_MAX_TOKENS = 8000  # 每次请求的估算token数上限(提示词加预留输出)，超出时拆成更小的批次
+ANALYSIS_JSON_MODE = True  # 请求接口以JSON格式返回分析结果(response_format)，接口不支持时自动改为普通输出
+
+# 分析前的本地相关性预筛选，与主题明显无关的论文不调用大模型
+ANALYSIS_PREFILTER = True  # 是否启用预筛选
+ANALYSIS_MIN_RELEVANCE = 0.15  # 相对BM25分数阈值(得分最高的论文为1)，低于阈值的论文不分析
+ANALYSIS_MAX_PAPERS = 0  # 最多分析的论文数，超出时只分析分数最高的(流水线模式下按检索产出顺序保留)，0表示不限制
+
+# 论文分类：把语义相同的研究方向聚类合并
+CATEGORY_CLUSTERING = True  # 是否聚类合并研究方向，False时按研究方向的原文分组
+CATEGORY_MAX_COUNT = 8  # 最多的类别数(不含"未分类")
+CATEGORY_USE_EMBEDDING_API = True  # 是否调用嵌入接口，不可用时改用本地的哈希n-gram向量
+EMBEDDING_MODEL = "text-embedding-3-small"  # 嵌入模型
+CATEGORY_SIMILARITY_THRESHOLD = 0.8  # 嵌入向量的余弦相似度不低于该值的研究方向总会合并
+CATEGORY_NGRAM_SIMILARITY_THRESHOLD = 0.5  # 使用哈希n-gram向量时的相似度阈值
+
 # 学术API配置
 IEEE_API_KEY = os.getenv("IEEE_API_KEY")
 ACM_API_KEY = os.getenv("ACM_API_KEY")
@@ -32,11 +65,63 @@ BACKUP_SOCKS_PROXY = os.getenv("BACKUP_SOCKS_PROXY")  # 备用SOCKS代理
 USE_PROXY = os.getenv("USE_PROXY", "False").lower() in ["true", "1", "yes"]
 # 在主代理失败时是否尝试备用代理
 USE_BACKUP_PROXY = os.getenv("USE_BACKUP_PROXY", "True").lower() in ["true", "1", "yes"]
+# 代理被封禁或连续失败后的隔离时长(秒)，每次隔离翻倍，直到上限
+PROXY_QUARANTINE_BASE = 60
+PROXY_QUARANTINE_MAX = 1800
 
 # 搜索配置
 MAX_PAPERS = 100  # 最大检索论文数量
-SEARCH_TIMEOUT = 600  # 检索超时时间(秒)
+SEARCH_TIMEOUT = 600  # 检索超时时间(秒)，整个搜索阶段共享
+REQUEST_TIMEOUT = 30  # 单次HTTP请求的超时时间(秒)，不会超过搜索阶段的剩余时间
 MAX_RETRIES = 3  # 请求失败时的最大重试次数
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)  # 需要退避重试的状态码
+BACKOFF_BASE = 1  # 重试退避的基础时长(秒)，每次重试翻倍并加入随机抖动；服务器返回Retry-After时至少等待该时长
+BACKOFF_MAX = 60  # 单次退避的最长时间(秒)
+CIRCUIT_FAILURE_THRESHOLD = 5  # 同一来源连续失败多少次后熔断
+CIRCUIT_COOLDOWN = 300  # 熔断后跳过该来源的时长(秒)，再次熔断时翻倍
+CIRCUIT_COOLDOWN_MAX = 3600  # 熔断冷却时长上限(秒)
+CIRCUIT_STATE_FILE = os.path.join(".cache", "circuit_breaker.json")  # 熔断状态文件，下次运行时仍跳过冷却中的来源
+CONCURRENT_SEARCH = True  # 是否并发检索各论文来源
+SEARCH_MAX_WORKERS = 8  # 并发检索的最大线程数，同一主机的请求仍由限速器控制节奏
+DEDUP_SIMILARITY_THRESHOLD = 0.8  # 标题相似度达到该值即视为同一篇论文
+
+# 查询扩展
+QUERY_EXPANSION = False  # 是否把主题扩展为多个子查询(缩写、同义词、子领域)并发检索；每个子查询按完整配额检索各来源，请求量随子查询数成倍增加
+QUERY_MAX_SUBQUERIES = 4  # 子查询数量上限，包含原始主题
+QUERY_EXPANSION_USE_LLM = False  # 是否调用大模型生成子领域查询，否则只使用缩写和同义词规则
+QUERY_EXPANSION_WEIGHT = 0.5  # 扩展子查询的结果在排名融合中的权重，原始主题为1
+RRF_K = 60  # 倒数排名融合(RRF)的平滑常数，越大排名靠后的结果与靠前的差距越小
+
+# 截断前的相关性排序
+RANKING_WEIGHTS = {
+    "bm25": 0.6,  # 标题和摘要对主题的BM25相关性
+    "fusion": 0.2,  # 多个来源/子查询的融合排名
+    "recency": 0.1,  # 发表年份的新近度
+    "citations": 0.1,  # 引用数(目前只有Google Scholar和IEEE提供)
+}
+RANKING_RECENCY_HALF_LIFE = 5  # 新近度的半衰期(年)
+BM25_K1 = 1.5  # BM25词频饱和参数
+BM25_B = 0.75  # BM25文档长度归一化参数
+
+# ArXiv批量检索
+ARXIV_MAX_RESULTS = None  # 从ArXiv获取的论文数，None表示最大论文数的30%；其他来源被封时可调大
+ARXIV_PAGE_SIZE = 100  # 每次API请求获取的结果数(arXiv单页上限2000)
+ARXIV_PAGE_WORKERS = 3  # 并发获取分页的线程数
+ARXIV_CATEGORIES = []  # 服务端分类过滤，例如 ["cs.AI", "cs.LG"]，为空表示不过滤
+ARXIV_DATE_FROM = None  # 服务端提交日期过滤，格式 "YYYY-MM-DD"
+ARXIV_DATE_TO = None
+
+# 搜索结果缓存
+SEARCH_CACHE_ENABLED = True  # 是否缓存各来源的检索结果
+SEARCH_CACHE_DIR = os.path.join(".cache", "search")  # 缓存目录
+SEARCH_CACHE_TTL = 24 * 3600  # 缓存有效期(秒)
+SEARCH_CACHE_MAX_ENTRIES = 500  # 最多缓存的检索结果数，超出后淘汰最久未使用的
+
+# HTTP录制/回放，用于离线调试和基准测试
+# 可选 "record"(访问网络并保存响应)、"replay"(只从夹具目录回放)、"forward"(转发到本地回放服务器)，为空表示正常访问网络
+HTTP_TRANSPORT_MODE = os.getenv("HTTP_TRANSPORT_MODE") or None
+HTTP_FIXTURE_DIR = os.getenv("HTTP_FIXTURE_DIR", os.path.join("fixtures", "http"))  # 夹具目录
+HTTP_REPLAY_SERVER = os.getenv("HTTP_REPLAY_SERVER", "http://127.0.0.1:8765")  # forward模式的回放服务器地址
 
 # 论文来源
 PAPER_SOURCES = [
@@ -76,6 +161,11 @@ PAPER_SOURCES = [
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
 TOP_K_RESULTS = 5
+SECTION_WORKERS = 3  # 并发生成综述各部分的线程数
+
+# 流水线执行：检索、分析、分类通过有界队列同时进行
+PIPELINE_QUEUE_SIZE = 50  # 各阶段之间队列的容量，下游来不及处理时上游等待
+PIPELINE_FLUSH_INTERVAL = 2.0  # 检索暂时没有新论文时，等待多久(秒)后把未攒满的一批提交分析
 
 # 输出配置
 OUTPUT_DIR = "output"
@@ -92,4 +182,14 @@ LATEX_KEYWORDS = "Literature Survey, Research Topic, Future Directions"  # 关
 
 # 爬虫配置
 CRAWLER_DELAY_MIN = 1  # 最小请求延迟（秒）
-CRAWLER_DELAY_MAX = 3  # 最大请求延迟（秒）
\ No newline at end of file
+CRAWLER_DELAY_MAX = 3  # 最大请求延迟（秒）
+CRAWLER_BURST = 2  # 主机空闲时允许连续发出的请求数
+# 各主机的限速 (最小间隔秒, 最大间隔秒, 突发数)，未列出的主机使用CRAWLER_DELAY_MIN/MAX和CRAWLER_BURST
+CRAWLER_HOST_LIMITS = {
+    "scholar.google.com": (3, 7, 1),
+    "export.arxiv.org": (3, 3, 1),
+    "ieeexplore.ieee.org": (CRAWLER_DELAY_MIN, CRAWLER_DELAY_MAX, CRAWLER_BURST),
+    "dl.acm.org": (CRAWLER_DELAY_MIN, CRAWLER_DELAY_MAX, CRAWLER_BURST),
+}
+# 限速状态文件，多个进程同时运行时共享各主机的请求节奏；设为None则只在进程内共享
+CRAWLER_RATE_STATE_FILE = os.path.join(".cache", "rate_limits.json")
@@ -9,7 +9,13 @@ from utils.latex_generator import LatexGenerator
 from modules.search_engine import SearchEngine
 from modules.paper_analyzer import PaperAnalyzer
 from modules.content_generator import ContentGenerator
-from config import MAX_PAPERS, SEARCH_TIMEOUT, PAPER_SOURCES, OUTPUT_DIR
+from modules.pipeline import ResearchPipeline
+from utils.checkpoint import RunCheckpoint
+from utils.llm_client import get_llm_client
+from config import MAX_PAPERS, SEARCH_TIMEOUT, PAPER_SOURCES, OUTPUT_DIR, ARXIV_MAX_RESULTS, QUERY_EXPANSION
+
+# 续跑时从检查点恢复的参数
+RESUME_ARGS = ['papers', 'arxiv_max', 'expand', 'no_prefilter']
 
 def main():
     # 创建命令行参数解析器
@@ -17,6 +23,14 @@ def main():
     parser.add_argument('--topic', type=str, help='研究主题')
     parser.add_argument('--papers', type=int, default=MAX_PAPERS, help=f'最大论文数量 (默认: {MAX_PAPERS})')
     parser.add_argument('--timeout', type=int, default=SEARCH_TIMEOUT, help=f'搜索超时时间 (默认: {SEARCH_TIMEOUT}秒)')
+    parser.add_argument('--sequential', action='store_true', help='依次检索各来源，不并发')
+    parser.add_argument('--no-cache', action='store_true', help='不读取也不写入搜索结果和论文分析缓存')
+    parser.add_argument('--refresh', action='store_true', help='忽略已缓存的搜索结果并重新检索')
+    parser.add_argument('--expand', action='store_true', help='把主题扩展为多个子查询检索，各来源的请求量随子查询数成倍增加')
+    parser.add_argument('--no-prefilter', action='store_true', help='分析所有检索到的论文，不预先剔除相关性低的论文')
+    parser.add_argument('--pipeline', action='store_true', help='检索、分析和分类以流水线方式同时进行；每个来源先按份额产出最相关的论文，其余在全部来源完成后按相关性补足')
+    parser.add_argument('--resume', type=str, metavar='RUN_ID', help='从指定运行的检查点继续，跳过已完成的检索、分析和章节')
+    parser.add_argument('--arxiv-max', type=int, default=ARXIV_MAX_RESULTS, help='从ArXiv获取的论文数 (默认: 最大论文数的30%%)')
     parser.add_argument('--output', type=str, default=OUTPUT_DIR, help=f'输出目录 (默认: {OUTPUT_DIR})')
     args = parser.parse_args()
     
@@ -24,8 +38,39 @@ def main():
     logger = Logger("DeepResearch")
     logger.info("DeepResearch Agent 启动")
     
-    # 如果命令行没有指定主题，提示用户输入
+    # 运行检查点保存在输出目录的runs子目录中
+    runs_dir = os.path.join(args.output, "runs")
+    checkpoint = None
+    if args.resume:
+        checkpoint = RunCheckpoint(runs_dir, args.resume)
+        if not checkpoint.exists():
+            logger.error(f"找不到运行 {args.resume} 的检查点: {checkpoint.directory}")
+            sys.exit(1)
+        logger.info(f"从检查点继续运行 {args.resume}")
+    
+    # 如果命令行没有指定主题，续跑时使用检查点中的主题，否则提示用户输入
     research_topic = args.topic
+    if checkpoint:
+        meta = checkpoint.load_meta()
+        saved_topic = meta.get('topic')
+        if research_topic and saved_topic and research_topic != saved_topic:
+            # 检查点中的检索结果和章节都属于原主题，不能用于新主题
+            logger.error(f"运行 {args.resume} 的主题是 '{saved_topic}'，与指定的主题 '{research_topic}' 不一致，"
+                         f"请去掉 --topic 继续原运行，或去掉 --resume 开始新的运行")
+            sys.exit(1)
+        research_topic = research_topic or saved_topic
+
+        # 影响检索和分析结果的参数沿用原运行的设置，避免同一运行中混用不同设置得到的结果
+        saved_args = meta.get('args') or {}
+        if 'expand' not in saved_args and 'no_expand' in saved_args:
+            saved_args['expand'] = not saved_args['no_expand']
+        for name in RESUME_ARGS:
+            if name not in saved_args or getattr(args, name) == saved_args[name]:
+                continue
+            if getattr(args, name) != parser.get_default(name):
+                logger.warning(f"续跑沿用运行 {args.resume} 的 {name}={saved_args[name]}，忽略本次指定的 {getattr(args, name)}")
+            setattr(args, name, saved_args[name])
+    
     if not research_topic:
         research_topic = input("请输入要研究的主题: ")
     
@@ -37,31 +82,70 @@ def main():
     if not os.path.exists(args.output):
         os.makedirs(args.output)
     
+    if checkpoint is None:
+        checkpoint = RunCheckpoint(runs_dir)
+        checkpoint.save_meta({'topic': research_topic, 'created': time.strftime('%Y-%m-%d %H:%M:%S'), 'args': vars(args)})
+    logger.info(f"运行ID: {checkpoint.run_id}，中断后可使用 --resume {checkpoint.run_id} 继续")
+    
     # 开始计时
     start_time = time.time()
     
     try:
         # 第一步：搜索论文
         logger.info(f"开始为主题 '{research_topic}' 搜索论文")
-        search_engine = SearchEngine(max_papers=args.papers, timeout=args.timeout)
-        papers = search_engine.search(research_topic, PAPER_SOURCES)
+        search_engine = SearchEngine(
+            max_papers=args.papers,
+            timeout=args.timeout,
+            concurrent=not args.sequential,
+            use_cache=not args.no_cache,
+            refresh_cache=args.refresh,
+            arxiv_max_results=args.arxiv_max,
+            expand_query=args.expand or QUERY_EXPANSION
+        )
+        analyzer = PaperAnalyzer(use_cache=not args.no_cache, prefilter=not args.no_prefilter, checkpoint=checkpoint)
         
-        if not papers:
-            logger.error("未找到相关论文，程序退出")
-            sys.exit(1)
+        # 续跑时直接使用检查点中的检索结果
+        papers = checkpoint.load_stage("search")
+        if papers is not None:
+            logger.info(f"使用检查点中的 {len(papers)} 篇检索结果")
+            search_engine.close()
         
-        # 第二步：分析论文
-        logger.info("开始分析论文内容")
-        analyzer = PaperAnalyzer()
-        analysis_results = analyzer.analyze_papers(papers, research_topic)
+        if args.pipeline and papers is None:
+            # 第二、三步与检索同时进行：论文检索到后立即分析，分类随分析结果增量更新
+            pipeline = ResearchPipeline(search_engine, analyzer, checkpoint=checkpoint)
+            try:
+                analysis_results, paper_categories = pipeline.run(research_topic, PAPER_SOURCES)
+            finally:
+                search_engine.close()
+        else:
+            if papers is None:
+                try:
+                    papers = search_engine.search(research_topic, PAPER_SOURCES)
+                finally:
+                    search_engine.close()
+                checkpoint.save_stage("search", papers)
+            
+            if not papers:
+                logger.error("未找到相关论文，程序退出")
+                sys.exit(1)
+            
+            # 第二步：分析论文
+            logger.info("开始分析论文内容")
+            analysis_results = analyzer.analyze_papers(papers, research_topic)
+            
+            # 第三步：对论文进行分类
+            paper_categories = analyzer.categorize_papers(analysis_results)
         
-        # 第三步：对论文进行分类
-        paper_categories = analyzer.categorize_papers(analysis_results)
+        # 只保留经过分析的论文，预筛选剔除的不进入综述
+        papers = [result['paper'] for result in analysis_results]
+        if not papers:
+            logger.error("没有与主题相关的论文，程序退出")
+            sys.exit(1)
         
         # 打印分类结果
         logger.info("论文分类结果:")
-        for category, papers in paper_categories.items():
-            logger.info(f"- {category}: {len(papers)}篇")
+        for category, results in paper_categories.items():
+            logger.info(f"- {category}: {len(results)}篇")
         
         # 第四步：生成综述内容
         logger.info("开始生成综述内容")
@@ -70,7 +154,8 @@ def main():
             research_topic, 
             paper_categories, 
             papers, 
-            analysis_results
+            analysis_results,
+            checkpoint=checkpoint
         )
         
         # 第五步：生成LaTeX文档
@@ -83,14 +168,19 @@ def main():
         end_time = time.time()
         total_time = end_time - start_time
         
+        get_llm_client().log_usage()
+        checkpoint.save_meta(dict(checkpoint.load_meta(), status='completed', latex_file=latex_file,
+                                  llm_usage=get_llm_client().usage_report()))
         logger.info(f"综述生成完成! 总耗时: {total_time:.2f}秒")
         logger.info(f"LaTeX输出文件: {latex_file}")
         
     except KeyboardInterrupt:
-        logger.info("用户中断操作，程序退出")
+        logger.info(f"用户中断操作，程序退出，可使用 --resume {checkpoint.run_id} 继续")
         sys.exit(0)
     except Exception as e:
         logger.error(f"程序执行过程中出错: {str(e)}")
+        get_llm_client().log_usage()
+        logger.info(f"已完成的检索、分析和章节已保存，可使用 --resume {checkpoint.run_id} 继续")
         sys.exit(1)
 
 if __name__ == "__main__":
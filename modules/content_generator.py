@@ -1,20 +1,19 @@
+from concurrent.futures import ThreadPoolExecutor
 from utils.logger import Logger
 import openai
-from langchain_openai import ChatOpenAI
-from config import OPENAI_API_KEY, OPENAI_API_BASE_URL, OPENAI_MODEL
+from utils.llm_client import get_llm_client
+from config import SECTION_WORKERS
 
 class ContentGenerator:
     def __init__(self):
         self.logger = Logger("ContentGenerator")
-        self.chat_model = ChatOpenAI(
-            model_name=OPENAI_MODEL,
-            openai_api_key=OPENAI_API_KEY,
-            base_url=OPENAI_API_BASE_URL
-        )
-        self.logger.info(f"Initializing ChatOpenAI model: {OPENAI_MODEL}")
-        self.logger.info(f"Using API base URL: {OPENAI_API_BASE_URL if OPENAI_API_BASE_URL else 'default'}")
+        # Shared client: rate limiting, retries and token accounting are process-wide
+        self.llm = get_llm_client()
+        
+        # Sections only read the shared RAG documents, so they can be generated concurrently
+        self.max_workers = SECTION_WORKERS
     
-    def generate_survey(self, research_topic, paper_categories, papers, analysis_results):
+    def generate_survey(self, research_topic, paper_categories, papers, analysis_results, checkpoint=None):
         """
         Generate a complete literature survey
         
@@ -23,6 +22,7 @@ class ContentGenerator:
         - paper_categories: Paper classification results
         - papers: List of papers
         - analysis_results: Paper analysis results
+        - checkpoint: Optional RunCheckpoint; finished sections are saved and reused when resuming
         
         Returns:
         - survey_data: Dictionary containing each section of the survey
@@ -37,6 +37,9 @@ class ContentGenerator:
         # Generate title
         title = f"Research Survey on {research_topic}"
         
+        # Sections are collected first and generated concurrently below
+        sections = []
+        
         # Generate abstract
         abstract_prompt = """
         Based on the provided research papers, generate a comprehensive and concise abstract that summarizes the main content, research status, key challenges, and future directions in this research field.
@@ -44,7 +47,7 @@ class ContentGenerator:
         Format the abstract in a style suitable for IEEE conference papers.
         DO NOT use any markdown formatting like # or * in your response.
         """
-        abstract = rag.generate_section("Abstract", abstract_prompt, paper_categories)
+        sections.append(("abstract", "Abstract", abstract_prompt))
         
         # Generate introduction
         introduction_prompt = """
@@ -59,7 +62,7 @@ class ContentGenerator:
         DO NOT use any markdown formatting like # or * in your response.
         DO NOT use numbered lists with dots (like "1.") for paragraph numbering. Use proper IEEE-style paragraph organization.
         """
-        introduction = rag.generate_section("Introduction", introduction_prompt, paper_categories)
+        sections.append(("introduction", "Introduction", introduction_prompt))
         
         # Generate problem definition and basic concepts
         definition_prompt = """
@@ -74,7 +77,7 @@ class ContentGenerator:
         DO NOT use any markdown formatting like # or * in your response.
         DO NOT use numbered lists with dots (like "1.") for paragraph numbering. Use proper IEEE-style paragraph organization.
         """
-        problem_definition = rag.generate_section("Problem Definition and Basic Concepts", definition_prompt, paper_categories)
+        sections.append(("problem_definition", "Problem Definition and Basic Concepts", definition_prompt))
 
         
         # Generate challenges and open problems
@@ -90,7 +93,7 @@ class ContentGenerator:
         DO NOT use any markdown formatting like # or * in your response.
         DO NOT use numbered lists with dots (like "1.") for paragraph numbering. Use proper IEEE-style paragraph organization.
         """
-        challenges = rag.generate_section("Challenges and Open Problems", challenges_prompt, paper_categories)
+        sections.append(("challenges", "Challenges and Open Problems", challenges_prompt))
         
         # Generate future research directions
         future_prompt = """
@@ -105,7 +108,7 @@ class ContentGenerator:
         DO NOT use any markdown formatting like # or * in your response.
         DO NOT use numbered lists with dots (like "1.") for paragraph numbering. Use proper IEEE-style paragraph organization.
         """
-        future_directions = rag.generate_section("Future Research Directions", future_prompt, paper_categories)
+        sections.append(("future_directions", "Future Research Directions", future_prompt))
         
         # Generate conclusion
         conclusion_prompt = """
@@ -120,7 +123,28 @@ class ContentGenerator:
         DO NOT use any markdown formatting like # or * in your response.
         DO NOT use numbered lists with dots (like "1.") for paragraph numbering. Use proper IEEE-style paragraph organization.
         """
-        conclusion = rag.generate_section("Conclusion", conclusion_prompt, paper_categories)
+        sections.append(("conclusion", "Conclusion", conclusion_prompt))
+        
+        contents = checkpoint.load_sections() if checkpoint else {}
+        if contents:
+            self.logger.info(f"Reusing {len(contents)} sections from checkpoint: {', '.join(contents)}")
+        
+        def generate(key, name, prompt):
+            content = rag.generate_section(name, prompt, paper_categories)
+            # generate_section returns an error message instead of raising; only keep real sections
+            if checkpoint and not content.startswith(f"生成 {name} 部分时出错"):
+                try:
+                    checkpoint.save_section(key, content)
+                except Exception as e:
+                    self.logger.warning(f"Failed to checkpoint section '{name}': {str(e)}")
+            return content
+        
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers), thread_name_prefix="section") as executor:
+            futures = [
+                (key, executor.submit(generate, key, name, prompt))
+                for key, name, prompt in sections if key not in contents
+            ]
+            contents.update((key, future.result()) for key, future in futures)
         
         # Generate references
         references = rag.generate_references(papers)
@@ -128,12 +152,7 @@ class ContentGenerator:
         # Assemble final results
         survey_data = {
             'title': title,
-            'abstract': abstract,
-            'introduction': introduction,
-            'problem_definition': problem_definition,
-            'challenges': challenges,
-            'future_directions': future_directions,
-            'conclusion': conclusion,
+            **{key: contents[key] for key, _, _ in sections},
             'references': references,
             'papers': papers  # Include papers for reference generation
         }
@@ -1,21 +1,167 @@
-import time
-import random
+import re
+import json
+from dataclasses import dataclass, asdict, fields as dataclass_fields
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from utils.logger import Logger
 import openai
-from langchain_openai import ChatOpenAI
-from config import OPENAI_API_KEY, OPENAI_API_BASE_URL, OPENAI_MODEL
+from config import (
+    OPENAI_MODEL, ANALYSIS_WORKERS, LLM_OUTPUT_TOKENS_ESTIMATE,
+    ANALYSIS_CACHE_ENABLED, ANALYSIS_CACHE_DIR, ANALYSIS_CACHE_MAX_ENTRIES, ANALYSIS_PROMPT_VERSION,
+    ANALYSIS_BATCH_SIZE, ANALYSIS_BATCH_MAX_TOKENS, ANALYSIS_JSON_MODE,
+    ANALYSIS_PREFILTER, ANALYSIS_MIN_RELEVANCE, ANALYSIS_MAX_PAPERS,
+    CATEGORY_CLUSTERING, CATEGORY_MAX_COUNT, CATEGORY_USE_EMBEDDING_API,
+    CATEGORY_SIMILARITY_THRESHOLD, CATEGORY_NGRAM_SIMILARITY_THRESHOLD
+)
 from utils.paper_store import store_paper_info, clear_paper_store
+from utils.llm_client import get_llm_client, estimate_tokens, LLMBudgetExceeded
+from utils.disk_cache import DiskCache
+from utils.ranking import filter_relevant, query_terms, paper_terms
+from utils.clustering import ngram_embeddings, normalize_rows, agglomerative_clusters, representative
+from modules.query_planner import QueryPlanner
+
+# 分析结果字段 -> (提示词中的名称, 填写说明)
+ANALYSIS_FIELDS = {
+    'research_direction': ("研究方向", "论文所属的具体研究方向"),
+    'contributions': ("主要贡献", "论文的主要贡献，新方法或新发现"),
+    'methods': ("技术方法", "论文使用的关键技术、算法或方法"),
+    'results': ("实验结果", "论文的主要实验结果或结论"),
+    'relevance': ("与研究主题的相关性", "高/中/低，以及原因"),
+    'status': ("在研究领域中的地位", "开创性工作/改进工作/应用工作/综述性工作等"),
+}
+
+MISSING = "信息不足"
+
+# 超出模型上下文长度时接口返回的错误信息
+_CONTEXT_ERROR = re.compile(r"context[_ ]length|maximum context|too many tokens|max_tokens", re.I)
+# 接口不支持JSON输出模式时返回的错误信息
+_JSON_MODE_ERROR = re.compile(r"response_format|json_object", re.I)
+
+
+@dataclass
+class PaperAnalysis:
+    """一篇论文的结构化分析结果，字段与ANALYSIS_FIELDS一一对应"""
+    research_direction: str = MISSING
+    contributions: str = MISSING
+    methods: str = MISSING
+    results: str = MISSING
+    relevance: str = MISSING
+    status: str = MISSING
+    
+    @classmethod
+    def from_dict(cls, data):
+        """
+        校验模型返回的JSON对象并转换为分析结果
+        
+        字段可以用英文键或提示词中的中文名称；列表合并为一段文字，缺失或为空的字段记为"信息不足"。
+        
+        参数:
+        - data: JSON对象
+        
+        返回:
+        - PaperAnalysis
+        """
+        if not isinstance(data, dict):
+            raise ValueError(f"分析结果应为JSON对象，实际为 {type(data).__name__}")
+        values = {}
+        for key, (name, _) in ANALYSIS_FIELDS.items():
+            value = data.get(key, data.get(name))
+            if isinstance(value, (list, tuple)):
+                value = "；".join(str(v).strip() for v in value if str(v).strip())
+            elif isinstance(value, dict):
+                value = "；".join(f"{k}: {v}" for k, v in value.items())
+            value = str(value).strip() if value is not None else ""
+            values[key] = value or MISSING
+        if all(value == MISSING for value in values.values()):
+            raise ValueError("分析结果中没有任何已知字段")
+        return cls(**values)
+    
+    @classmethod
+    def from_text(cls, text):
+        """从"1. 研究方向: ..."形式的文本中逐项提取，兼容编号、全角冒号和Markdown加粗"""
+        return cls(**{key: extract_field(text, name) for key, (name, _) in ANALYSIS_FIELDS.items()})
+    
+    def to_dict(self):
+        return asdict(self)
+    
+    def to_text(self):
+        """按提示词中的编号和名称列出各字段，作为RAG文档中的分析文本"""
+        return "\n".join(
+            f"{number}. {ANALYSIS_FIELDS[field.name][0]}: {getattr(self, field.name)}"
+            for number, field in enumerate(dataclass_fields(self), 1)
+        )
+
+
+def extract_field(text, field_name):
+    """
+    从分析文本中提取特定字段的内容
+    
+    支持"研究方向: ..."、"1. 研究方向：..."、"- **研究方向**: ..."等写法，字段内容可以另起一行。
+    
+    返回:
+    - 字段内容，找不到时返回"信息不足"
+    """
+    pattern = re.compile(
+        rf"^[ \t>*#-]*(?:\d+\s*[.、)）]\s*)?[*_]*{re.escape(field_name)}[*_]*\s*[:：][*_]*[ \t]*(.*)$",
+        re.M
+    )
+    match = pattern.search(text)
+    if not match:
+        return MISSING
+    value = match.group(1).strip()
+    if not value:
+        # 内容另起一行时取下一行非空文本
+        rest = text[match.end():].lstrip("\n")
+        value = rest.split("\n", 1)[0].strip() if rest else ""
+    return value.strip("[]【】 ") or MISSING
+
+
+def parse_json(text):
+    """从模型输出中取出JSON，允许外面包着代码块或说明文字"""
+    fenced = re.search(r"```(?:json)?\s*(.*?)```", text, re.S)
+    if fenced:
+        text = fenced.group(1)
+    starts = [i for i in (text.find('{'), text.find('[')) if i >= 0]
+    if not starts:
+        raise ValueError("返回内容中没有JSON")
+    start = min(starts)
+    end = text.rfind('}' if text[start] == '{' else ']')
+    if end < start:
+        raise ValueError("返回内容中的JSON不完整")
+    return json.loads(text[start:end + 1])
+
 
 class PaperAnalyzer:
-    def __init__(self):
+    def __init__(self, use_cache=ANALYSIS_CACHE_ENABLED, prefilter=ANALYSIS_PREFILTER, checkpoint=None):
         self.logger = Logger("PaperAnalyzer")
-        self.chat_model = ChatOpenAI(
-            model_name=OPENAI_MODEL,
-            openai_api_key=OPENAI_API_KEY,
-            base_url=OPENAI_API_BASE_URL
-        )
-        self.logger.info(f"初始化 ChatOpenAI 模型: {OPENAI_MODEL}")
-        self.logger.info(f"使用API基础URL: {OPENAI_API_BASE_URL if OPENAI_API_BASE_URL else '默认'}")
+        # 进程内共享的大模型客户端，负责限速、重试和用量统计
+        self.llm = get_llm_client()
+        
+        # 并发分析的线程数
+        self.max_workers = ANALYSIS_WORKERS
+        
+        # 每次请求合并分析的论文数上限，1表示逐篇分析
+        self.batch_size = max(1, ANALYSIS_BATCH_SIZE)
+        # 是否要求接口以JSON格式返回；接口不支持时自动关闭
+        self.json_mode = ANALYSIS_JSON_MODE
+        
+        # 分析前按主题的BM25分数剔除明显无关的论文
+        self.prefilter = prefilter
+        self.min_relevance = ANALYSIS_MIN_RELEVANCE
+        self.max_papers = ANALYSIS_MAX_PAPERS
+        self._filter_queries = None
+        # 当前主题是否已有论文与主题有共同词，None表示尚未筛选过；此前没有匹配时预筛选全部保留
+        self._filter_matched = None
+        
+        # 分类时把语义相同的研究方向聚类合并；嵌入接口调用失败后本次运行不再尝试
+        self.cluster_categories = CATEGORY_CLUSTERING
+        self.max_categories = CATEGORY_MAX_COUNT
+        self.use_embedding_api = CATEGORY_USE_EMBEDDING_API
+        self._embedding_failed = False
+        
+        # 分析结果缓存，相同模型、提示词版本、主题和论文内容的分析直接复用
+        self.cache = DiskCache(ANALYSIS_CACHE_DIR, max_entries=ANALYSIS_CACHE_MAX_ENTRIES) if use_cache else None
+        # 运行检查点(RunCheckpoint)，每篇论文分析完成后立即保存，续跑时跳过已分析的论文
+        self.checkpoint = checkpoint
         
     def analyze_papers(self, papers, research_topic):
         """
@@ -26,35 +172,123 @@ class PaperAnalyzer:
         - research_topic: 研究主题
         
         返回:
-        - 分析结果列表
+        - 分析结果列表，不包括预筛选剔除的论文
         """
-        self.logger.info(f"开始分析 {len(papers)} 篇论文")
+        if self.prefilter:
+            papers = self.filter_papers(papers, research_topic)
+        
+        self.logger.info(f"开始分析 {len(papers)} 篇论文，并发数: {self.max_workers}，每批最多 {self.batch_size} 篇")
         
         # 清空之前存储的论文信息
         clear_paper_store()
         
-        analysis_results = []
-        
+        # 结果按输入顺序存放，已缓存的论文不再请求
+        results = [None] * len(papers)
+        pending = []
         for i, paper in enumerate(papers):
-            self.logger.progress(i+1, len(papers), "论文分析")
-            
-            try:
-                # 分析单篇论文
-                result = self._analyze_paper(paper, research_topic)
-                analysis_results.append(result)
-                
-                # 随机延迟，避免API限制
-                time.sleep(random.uniform(0.5, 1.5))
-                
-            except Exception as e:
-                self.logger.error(f"分析论文 '{paper.get('title')}' 时出错: {str(e)}")
+            results[i] = self._load_cached(paper, research_topic)
+            if results[i] is None:
+                pending.append(i)
+        if len(pending) < len(papers):
+            self.logger.info(f"{len(papers) - len(pending)} 篇论文使用缓存的分析结果")
+        
+        # 未缓存的论文合并成批次并发分析，请求节奏由限速器控制
+        batches = self._make_batches(pending, papers, research_topic)
+        if batches:
+            done = len(papers) - len(pending)
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(batches))),
+                                    thread_name_prefix="analysis") as executor:
+                futures = {
+                    executor.submit(self._analyze_batch, [papers[i] for i in batch], research_topic): batch
+                    for batch in batches
+                }
+                for future in as_completed(futures):
+                    batch = futures[future]
+                    try:
+                        for i, result in zip(batch, future.result()):
+                            results[i] = result
+                    except LLMBudgetExceeded:
+                        # 预算用完后不再分析其余论文，已完成的分析保存在检查点中
+                        for other in futures:
+                            other.cancel()
+                        raise
+                    except Exception as e:
+                        # 单个批次失败不影响其他论文
+                        self.logger.error(f"分析论文 '{papers[batch[0]].get('title')}' 等 {len(batch)} 篇时出错: {str(e)}")
+                    done += len(batch)
+                    self.logger.progress(done, len(papers), "论文分析")
+        
+        # 按输入顺序存储论文标题和作者信息
+        analysis_results = []
+        for result in results:
+            if result is None:
+                continue
+            paper = result['paper']
+            store_paper_info(paper.get('title', 'Untitled'), paper.get('authors', []))
+            analysis_results.append(result)
         
         self.logger.info("论文分析完成")
         return analysis_results
     
+    def filter_papers(self, papers, research_topic, min_relevance=None, max_papers=None):
+        """
+        用主题及其缩写/同义扩展对论文做本地相关性预筛选
+        
+        参数:
+        - papers: 论文列表
+        - research_topic: 研究主题
+        - min_relevance: 相对分数阈值，默认ANALYSIS_MIN_RELEVANCE；为0时只剔除与主题没有共同词的论文
+        - max_papers: 最多保留的论文数，默认ANALYSIS_MAX_PAPERS
+        
+        返回:
+        - 保留的论文列表，保持输入顺序
+        """
+        if self._filter_queries is None or self._filter_queries[0] != research_topic:
+            self._filter_queries = (research_topic, QueryPlanner(use_llm=False).plan(research_topic))
+            self._filter_matched = None
+        queries = self._filter_queries[1]
+        kept, dropped = filter_relevant(
+            papers, queries,
+            self.min_relevance if min_relevance is None else min_relevance,
+            self.max_papers if max_papers is None else max_papers,
+            require_match=bool(self._filter_matched)
+        )
+        if not self._filter_matched and papers:
+            # 流水线分批筛选时，一旦有论文匹配到主题，之后的批次照常剔除没有共同词的论文
+            terms = query_terms(queries)
+            matched = any(terms.intersection(paper_terms(paper)) for paper in papers)
+            if not matched and self._filter_matched is None:
+                self.logger.warning("预筛选: 没有论文与主题有共同词(主题与论文的语言可能不同)，不按相关性剔除")
+            self._filter_matched = matched
+        if dropped:
+            self.logger.info(f"预筛选剔除 {len(dropped)} 篇与主题相关性较低的论文，保留 {len(kept)} 篇")
+            for paper in dropped:
+                self.logger.debug(f"跳过分析: {paper.get('title', 'Untitled')}")
+        return kept
+    
+    def analyze_batch(self, papers, research_topic):
+        """
+        在当前线程中分析一小批论文，供流水线逐批调用
+        
+        与analyze_papers不同，不做预筛选，也不清空或写入论文信息存储。
+        
+        参数:
+        - papers: 论文列表
+        - research_topic: 研究主题
+        
+        返回:
+        - 与papers顺序一致的分析结果列表
+        """
+        results = [self._load_cached(paper, research_topic) for paper in papers]
+        pending = [i for i, result in enumerate(results) if result is None]
+        for batch in self._make_batches(pending, papers, research_topic):
+            for i, result in zip(batch, self._analyze_batch([papers[i] for i in batch], research_topic)):
+                results[i] = result
+        return results
+    
     def _analyze_paper(self, paper, research_topic):
         """
-        分析单篇论文
+        分析单篇论文，调用方已查过检查点和缓存
         
         参数:
         - paper: 论文信息字典
@@ -64,83 +298,250 @@ class PaperAnalyzer:
         - 分析结果字典
         """
         title = paper.get('title', 'Untitled')
-        abstract = paper.get('abstract', '')
         authors = paper.get('authors', [])
-        year = paper.get('year', 'Unknown')
         
         self.logger.info(f"正在分析: {title} ---------- by: {', '.join(authors if isinstance(authors, list) else [authors])}")
         
-        # 存储论文标题和作者信息
-        store_paper_info(title, authors)
-        
         # 使用OpenAI API分析论文
         try:
-            paper_content = f"Title: {title}\nAuthors: {', '.join(authors if isinstance(authors, list) else [authors])}\nYear: {year}\nAbstract: {abstract}"
+            paper_content = self._paper_content(paper)
             
             prompt = f"""
             你是一个专业的论文分析助手。请分析以下论文信息，提取与研究主题"{research_topic}"相关的关键信息:
 
             {paper_content}
             
-            请提供以下格式的分析:
-            1. 研究方向: [论文所属的具体研究方向]
-            2. 主要贡献: [论文的主要贡献，新方法或新发现]
-            3. 技术方法: [论文使用的关键技术、算法或方法]
-            4. 实验结果: [论文的主要实验结果或结论]
-            5. 与研究主题的相关性: [高/中/低，以及原因]
-            6. 在研究领域中的地位: [开创性工作/改进工作/应用工作/综述性工作等]
+            请输出一个JSON对象，格式为:
+            {self._json_schema()}
             
-            请基于文本内容进行客观分析，不要添加不存在的信息。如果某项信息无法从摘要中确定，请标注为"信息不足"。
+            请基于文本内容进行客观分析，不要添加不存在的信息。如果某项信息无法从摘要中确定，请填写"信息不足"。只输出JSON对象，不要输出其他内容。
             """
             
-            messages = [
-                {"role": "system", "content": "你是一个专业的学术论文分析助手。"},
-                {"role": "user", "content": prompt}
-            ]
-            
-            response = self.chat_model.invoke(messages)
-            
-            analysis_text = response.content
+            analysis_text = self._invoke(prompt, LLM_OUTPUT_TOKENS_ESTIMATE)
             
-            # 提取分析结果
-            result = {
-                'paper': paper,
-                'analysis': analysis_text,
-                'research_direction': self._extract_field(analysis_text, "研究方向"),
-                'contributions': self._extract_field(analysis_text, "主要贡献"),
-                'methods': self._extract_field(analysis_text, "技术方法"),
-                'results': self._extract_field(analysis_text, "实验结果"),
-                'relevance': self._extract_field(analysis_text, "与研究主题的相关性"),
-                'status': self._extract_field(analysis_text, "在研究领域中的地位")
-            }
+            # 优先按JSON解析，模型没有按格式输出时再逐项提取文本
+            try:
+                analysis = PaperAnalysis.from_dict(parse_json(analysis_text))
+            except ValueError:
+                analysis = PaperAnalysis.from_text(analysis_text)
             
-            return result
+            fields = dict(analysis.to_dict(), analysis=analysis.to_text())
+            self._store_cached(paper, research_topic, fields)
+            return dict(fields, paper=paper)
             
+        except LLMBudgetExceeded:
+            raise
         except Exception as e:
             self.logger.error(f"调用OpenAI API分析论文时出错: {str(e)}")
             # 返回基本信息和错误标记
-            return {
-                'paper': paper,
-                'analysis': f"分析失败: {str(e)}",
-                'research_direction': "信息不足",
-                'contributions': "信息不足",
-                'methods': "信息不足",
-                'results': "信息不足",
-                'relevance': "信息不足",
-                'status': "信息不足",
-                'error': True
-            }
-    
-    def _extract_field(self, text, field_name):
-        """从分析文本中提取特定字段的内容"""
-        lines = text.split('\n')
-        for line in lines:
-            if line.startswith(f"{field_name}:") or line.startswith(f"{field_name}：") or line.startswith(f"{len(field_name)}. {field_name}:"):
-                parts = line.split(':', 1)
-                if len(parts) > 1:
-                    return parts[1].strip()
-                return ""
-        return "信息不足"
+            result = {'paper': paper, 'analysis': f"分析失败: {str(e)}", 'error': True}
+            result.update(PaperAnalysis().to_dict())
+            return result
+    
+    def _make_batches(self, indices, papers, research_topic):
+        """
+        按篇数上限和估算的token数把论文分成批次
+        
+        参数:
+        - indices: 待分析论文在papers中的下标
+        - papers: 论文列表
+        - research_topic: 研究主题
+        
+        返回:
+        - 批次列表，每个批次是论文下标的列表
+        """
+        overhead = estimate_tokens(self._batch_prompt([], research_topic))
+        batches = []
+        batch, tokens = [], overhead
+        for i in indices:
+            cost = estimate_tokens(self._paper_content(papers[i])) + LLM_OUTPUT_TOKENS_ESTIMATE
+            if batch and (len(batch) >= self.batch_size or tokens + cost > ANALYSIS_BATCH_MAX_TOKENS):
+                batches.append(batch)
+                batch, tokens = [], overhead
+            batch.append(i)
+            tokens += cost
+        if batch:
+            batches.append(batch)
+        return batches
+    
+    def _analyze_batch(self, batch, research_topic):
+        """
+        用一次请求分析一批论文
+        
+        超出模型上下文时对半拆分后重试；返回无法解析或缺少某篇论文时，这些论文改为逐篇分析。
+        接口调用失败(重试用完的429、鉴权错误、连接失败等)时不再逐篇重发，整批标记为失败。
+        
+        参数:
+        - batch: 论文列表
+        - research_topic: 研究主题
+        
+        返回:
+        - 与batch顺序一致的分析结果列表，整批失败时为None
+        """
+        if len(batch) == 1:
+            return [self._analyze_paper(batch[0], research_topic)]
+        
+        try:
+            analyses = self._request_batch(batch, research_topic)
+        except LLMBudgetExceeded:
+            raise
+        except Exception as e:
+            if _CONTEXT_ERROR.search(str(e)):
+                half = len(batch) // 2
+                self.logger.warning(f"{len(batch)} 篇论文超出模型上下文，拆分为 {half} 篇和 {len(batch) - half} 篇两批")
+                return self._analyze_batch(batch[:half], research_topic) + self._analyze_batch(batch[half:], research_topic)
+            if not isinstance(e, ValueError):
+                # 接口本身不可用，逐篇重发只会多出N次注定失败的请求
+                self.logger.error(f"合并分析 {len(batch)} 篇论文时调用接口失败，本批论文标记为分析失败: {str(e)}")
+                return [None] * len(batch)
+            self.logger.warning(f"合并分析 {len(batch)} 篇论文的结果无法解析，改为逐篇分析: {str(e)}")
+            analyses = {}
+        
+        results = []
+        for number, paper in enumerate(batch, 1):
+            fields = analyses.get(number)
+            if fields is None:
+                if analyses:
+                    self.logger.warning(f"合并分析的结果中缺少论文 '{paper.get('title')}'，改为单独分析")
+                results.append(self._analyze_paper(paper, research_topic))
+            else:
+                self._store_cached(paper, research_topic, fields)
+                results.append(dict(fields, paper=paper))
+        return results
+    
+    def _request_batch(self, batch, research_topic):
+        """
+        发送合并分析请求并解析返回的JSON数组
+        
+        返回:
+        - 论文编号(从1开始) -> 分析字段的字典
+        """
+        self.logger.info(f"合并分析 {len(batch)} 篇论文: {', '.join(p.get('title', 'Untitled') for p in batch)}")
+        prompt = self._batch_prompt(batch, research_topic)
+        data = parse_json(self._invoke(prompt, LLM_OUTPUT_TOKENS_ESTIMATE * len(batch)))
+        # JSON模式下只能返回对象，数组放在papers字段中
+        items = data.get('papers') if isinstance(data, dict) else data
+        if not isinstance(items, list):
+            raise ValueError("返回内容中没有论文分析列表")
+        
+        analyses = {}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            try:
+                number = int(item.get('id'))
+                analysis = PaperAnalysis.from_dict(item)
+            except (TypeError, ValueError):
+                continue
+            if 1 <= number <= len(batch):
+                analyses[number] = dict(analysis.to_dict(), analysis=analysis.to_text())
+        return analyses
+    
+    def _invoke(self, prompt, output_tokens):
+        """
+        通过共享客户端调用模型，限速和429/5xx重试由客户端负责
+        
+        参数:
+        - prompt: 用户提示词
+        - output_tokens: 为输出预留的token数
+        
+        返回:
+        - 模型输出的文本
+        """
+        messages = [
+            {"role": "system", "content": "你是一个专业的学术论文分析助手，只输出JSON。"},
+            {"role": "user", "content": prompt}
+        ]
+        
+        if self.json_mode:
+            try:
+                return self.llm.invoke(messages, stage="analysis", output_tokens=output_tokens,
+                                       response_format={"type": "json_object"})
+            except Exception as e:
+                if not _JSON_MODE_ERROR.search(str(e)):
+                    raise
+                self.logger.warning(f"接口不支持JSON输出模式，改为普通输出: {str(e)}")
+                self.json_mode = False
+        return self.llm.invoke(messages, stage="analysis", output_tokens=output_tokens)
+    
+    @staticmethod
+    def _json_schema():
+        """各字段的JSON格式说明"""
+        return "{" + ", ".join(f'"{key}": "{name}：{hint}"' for key, (name, hint) in ANALYSIS_FIELDS.items()) + "}"
+    
+    def _batch_prompt(self, batch, research_topic):
+        """合并分析的提示词，说明只出现一次，论文按编号依次列出"""
+        papers_text = "\n\n".join(f"[{number}]\n{self._paper_content(paper)}" for number, paper in enumerate(batch, 1))
+        example = '{"papers": [{"id": 1, ' + self._json_schema()[1:] + ']}'
+        return f"""
+        你是一个专业的论文分析助手。请分别分析以下 {len(batch)} 篇论文，提取与研究主题"{research_topic}"相关的关键信息。
+        
+        {papers_text}
+        
+        请输出一个JSON对象，papers数组中每篇论文对应一个元素，id为论文编号，格式为:
+        {example}
+        
+        请基于文本内容进行客观分析，不要添加不存在的信息。如果某项信息无法从摘要中确定，请填写"信息不足"。只输出JSON对象，不要输出其他内容。
+        """
+    
+    @staticmethod
+    def _paper_content(paper):
+        authors = paper.get('authors', [])
+        return (f"Title: {paper.get('title', 'Untitled')}\n"
+                f"Authors: {', '.join(authors if isinstance(authors, list) else [authors])}\n"
+                f"Year: {paper.get('year', 'Unknown')}\n"
+                f"Abstract: {paper.get('abstract', '')}")
+    
+    def _load_cached(self, paper, research_topic):
+        """读取本次运行检查点或缓存中的分析结果，都未命中时返回None"""
+        if not self.cache and not self.checkpoint:
+            return None
+        key = self._cache_key(paper, research_topic)
+        if self.checkpoint:
+            saved = self.checkpoint.load_analysis(key)
+            if saved is not None:
+                self.logger.info(f"使用检查点中的分析结果: {paper.get('title', 'Untitled')}")
+                return dict(saved, paper=paper)
+        if not self.cache:
+            return None
+        cached = self.cache.get(key)
+        if cached is None:
+            return None
+        self.logger.info(f"使用缓存的分析结果: {paper.get('title', 'Untitled')}")
+        if self.checkpoint:
+            self._save_checkpoint(key, cached)
+        return dict(cached, paper=paper)
+    
+    def _store_cached(self, paper, research_topic, fields):
+        """只缓存成功的分析，失败的论文下次仍会重新分析"""
+        if not self.cache and not self.checkpoint:
+            return
+        key = self._cache_key(paper, research_topic)
+        if self.checkpoint:
+            self._save_checkpoint(key, fields)
+        if not self.cache:
+            return
+        try:
+            self.cache.set(key, fields)
+        except Exception as e:
+            self.logger.warning(f"写入分析缓存失败: {str(e)}")
+    
+    def _save_checkpoint(self, key, fields):
+        try:
+            self.checkpoint.save_analysis(key, fields)
+        except Exception as e:
+            self.logger.warning(f"写入检查点失败: {str(e)}")
+    
+    @staticmethod
+    def _cache_key(paper, research_topic):
+        """缓存键: (模型, 提示词版本, 研究主题, 标题, 摘要)"""
+        return DiskCache.make_key(
+            OPENAI_MODEL,
+            ANALYSIS_PROMPT_VERSION,
+            " ".join(research_topic.split()),
+            " ".join((paper.get('title') or '').split()),
+            " ".join((paper.get('abstract') or '').split())
+        )
     
     def categorize_papers(self, analysis_results):
         """
@@ -154,33 +555,108 @@ class PaperAnalyzer:
         """
         self.logger.info("开始对论文进行分类")
         
-        # 收集所有研究方向
-        research_directions = {}
+        research_directions = self.update_categories({}, analysis_results)
+        if self.cluster_categories and len(research_directions) > 1:
+            research_directions = self._cluster_directions(research_directions, analysis_results)
+        research_directions = self.sort_categories(research_directions)
+        
+        self.logger.info(f"论文分类完成，共分为 {len(research_directions)} 个类别")
+        
+        return research_directions
+    
+    def update_categories(self, research_directions, analysis_results):
+        """
+        把分析结果按研究方向加入已有的分类，流水线中每得到一批结果调用一次
+        
+        参数:
+        - research_directions: 已有的分类结果字典，原地修改
+        - analysis_results: 新的分析结果列表
+        
+        返回:
+        - research_directions
+        """
         for result in analysis_results:
             direction = result.get('research_direction', '其他')
-            if direction == "信息不足":
+            if direction == MISSING:
                 direction = "未分类"
             
             if direction not in research_directions:
                 research_directions[direction] = []
             
             research_directions[direction].append(result)
+        return research_directions
+    
+    def _cluster_directions(self, research_directions, analysis_results):
+        """
+        把语义相同的研究方向合并成不超过max_categories个类别，类别名取最能代表该类的研究方向
         
-        # 对每个方向内的论文进行相关性排序
-        for direction, papers in research_directions.items():
-            # 根据相关性高中低进行排序
-            def relevance_score(result):
-                relevance = result.get('relevance', '').lower()
-                if '高' in relevance:
-                    return 3
-                elif '中' in relevance:
-                    return 2
-                elif '低' in relevance:
-                    return 1
-                return 0
-            
-            research_directions[direction] = sorted(papers, key=relevance_score, reverse=True)
+        参数:
+        - research_directions: 按研究方向原文分组的结果
+        - analysis_results: 分析结果列表，合并后的类别内保持其顺序
         
-        self.logger.info(f"论文分类完成，共分为 {len(research_directions)} 个类别")
+        返回:
+        - 合并后的分类结果字典，按论文数从多到少排列，"未分类"放在最后
+        """
+        directions = [d for d in research_directions if d != "未分类"]
+        if len(directions) <= 1:
+            return research_directions
+        
+        vectors, threshold = self._embed_directions(directions)
+        weights = [len(research_directions[d]) for d in directions]
+        clusters = agglomerative_clusters(vectors, self.max_categories, threshold, weights)
+        
+        merged = {}
+        label_of = {}
+        for members in clusters:
+            label = directions[representative(members, vectors, weights)]
+            merged[label] = []
+            for i in members:
+                label_of[directions[i]] = label
         
+        unclassified = []
+        for result in analysis_results:
+            direction = result.get('research_direction', '其他')
+            if direction == MISSING or direction == "未分类":
+                unclassified.append(result)
+            else:
+                merged[label_of[direction]].append(result)
+        if unclassified:
+            merged["未分类"] = unclassified
+        
+        self.logger.info(f"{len(directions)} 个研究方向合并为 {len(clusters)} 个类别")
+        return merged
+    
+    def _embed_directions(self, directions):
+        """
+        计算研究方向的向量，嵌入接口不可用时改用哈希n-gram向量
+        
+        返回:
+        - (已归一化的向量, 对应的合并阈值)
+        """
+        if self.use_embedding_api and not self._embedding_failed:
+            try:
+                # 经过共享客户端，计入限速、token预算和用量统计
+                vectors = normalize_rows(self.llm.embed(directions, stage="embedding"))
+                return vectors, CATEGORY_SIMILARITY_THRESHOLD
+            except Exception as e:
+                # 包括token预算用完，本次运行不再尝试调用接口
+                self.logger.warning(f"调用嵌入接口失败，改用本地n-gram向量聚类: {str(e)}")
+                self._embedding_failed = True
+        return ngram_embeddings(directions), CATEGORY_NGRAM_SIMILARITY_THRESHOLD
+    
+    @staticmethod
+    def sort_categories(research_directions):
+        """对每个方向内的论文按相关性高中低排序，相同时保持原顺序"""
+        def relevance_score(result):
+            relevance = result.get('relevance', '').lower()
+            if '高' in relevance:
+                return 3
+            elif '中' in relevance:
+                return 2
+            elif '低' in relevance:
+                return 1
+            return 0
+        
+        for direction, papers in research_directions.items():
+            research_directions[direction] = sorted(papers, key=relevance_score, reverse=True)
         return research_directions
\ No newline at end of file
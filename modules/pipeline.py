@@ -0,0 +1,215 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.logger import Logger
+from utils.paper_store import store_paper_info, clear_paper_store
+from utils.llm_client import LLMBudgetExceeded
+from config import PIPELINE_QUEUE_SIZE, PIPELINE_FLUSH_INTERVAL
+
+# 上游阶段结束的标记
+_DONE = object()
+
+
+class ResearchPipeline:
+    """
+    流水线执行检索、分析和分类
+    
+    检索线程把流式检索产出的论文放入有界队列，分析线程攒够一批(或检索暂时没有新论文)即提交分析，
+    主线程随分析结果到达增量更新分类。总耗时接近最慢的阶段，而不是各阶段之和。
+    """
+    
+    def __init__(self, search_engine, analyzer, queue_size=PIPELINE_QUEUE_SIZE, flush_interval=PIPELINE_FLUSH_INTERVAL,
+                 checkpoint=None):
+        """
+        参数:
+        - search_engine: SearchEngine实例
+        - analyzer: PaperAnalyzer实例
+        - queue_size: 阶段之间队列的容量
+        - flush_interval: 检索暂时没有新论文时，提交未攒满批次前等待的秒数
+        - checkpoint: 可选的RunCheckpoint，检索完整结束后立即保存检索结果，之后分析中止也不必重新检索
+        """
+        self.logger = Logger("Pipeline")
+        self.search_engine = search_engine
+        self.analyzer = analyzer
+        self.checkpoint = checkpoint
+        self.queue_size = queue_size
+        self.flush_interval = flush_interval
+        # 最近一次运行中检索产出的全部论文，包括预筛选剔除的
+        self.papers = []
+        # 中止整个流水线的错误(如token预算用完)
+        self._fatal = None
+    
+    def run(self, research_topic, sources=None):
+        """
+        运行流水线
+        
+        参数:
+        - research_topic: 研究主题
+        - sources: 搜索源列表
+        
+        返回:
+        - (分析结果列表, 分类结果字典)，分析结果按检索产出的顺序排列
+        """
+        self.logger.info(f"开始流水线处理主题 '{research_topic}'")
+        clear_paper_store()
+        
+        paper_queue = queue.Queue(maxsize=self.queue_size)
+        result_queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        self.papers = []
+        self._fatal = None
+        # 论文 -> 检索产出的序号，用于最后恢复顺序
+        order = {}
+        
+        stages = [
+            threading.Thread(target=self._search_stage, args=(research_topic, sources, paper_queue, order, stop),
+                             name="pipeline-search", daemon=True),
+            threading.Thread(target=self._analysis_stage, args=(research_topic, paper_queue, result_queue, stop),
+                             name="pipeline-analysis", daemon=True),
+        ]
+        for stage in stages:
+            stage.start()
+        
+        analysis_results = []
+        paper_categories = {}
+        try:
+            while True:
+                try:
+                    result = result_queue.get(timeout=0.5)
+                except queue.Empty:
+                    # 上游因致命错误停止时不会再放入结束标记
+                    if stop.is_set():
+                        break
+                    continue
+                if result is _DONE:
+                    break
+                analysis_results.append(result)
+                self.analyzer.update_categories(paper_categories, [result])
+                self.logger.info(f"已完成 {len(analysis_results)} 篇论文的分析，当前共 {len(paper_categories)} 个研究方向")
+        finally:
+            # 主线程异常退出(如用户中断)时通知上游停止
+            stop.set()
+            for stage in stages:
+                stage.join(timeout=1)
+        if self._fatal is not None:
+            raise self._fatal
+        
+        # 按检索产出的顺序整理结果和存储论文信息，相关性相同时保持该顺序
+        def position(result):
+            return order.get(id(result['paper']), len(order))
+        
+        # 最终分类需要看到全部研究方向才能聚类合并
+        analysis_results.sort(key=position)
+        paper_categories = self.analyzer.categorize_papers(analysis_results)
+        for result in analysis_results:
+            paper = result['paper']
+            store_paper_info(paper.get('title', 'Untitled'), paper.get('authors', []))
+        
+        self.logger.info(f"流水线处理完成，共分析 {len(analysis_results)} 篇论文，分为 {len(paper_categories)} 个类别")
+        return analysis_results, paper_categories
+    
+    @staticmethod
+    def _put(target, item, stop):
+        """放入有界队列，下游已停止时放弃并返回False"""
+        while not stop.is_set():
+            try:
+                target.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def _search_stage(self, research_topic, sources, paper_queue, order, stop):
+        """检索阶段：流式检索的论文逐篇放入队列"""
+        stream = self.search_engine.search_stream(research_topic, sources)
+        try:
+            for paper in stream:
+                order[id(paper)] = len(order)
+                self.papers.append(paper)
+                if not self._put(paper_queue, paper, stop):
+                    break
+            else:
+                # 只保存完整结束的检索，下游中止导致的部分结果不能当作已完成
+                if self.checkpoint is not None:
+                    self.checkpoint.save_stage("search", self.papers)
+        except Exception as e:
+            self.logger.error(f"检索阶段出错: {str(e)}")
+        finally:
+            stream.close()
+            self._put(paper_queue, _DONE, stop)
+    
+    def _analysis_stage(self, research_topic, paper_queue, result_queue, stop):
+        """
+        分析阶段：攒够一批或检索暂时没有新论文时提交分析，同时进行的批次数不超过分析线程数
+        
+        预筛选在本线程中逐批进行，筛选状态不会被多个分析线程同时修改；保留的论文累计达到
+        ANALYSIS_MAX_PAPERS(analyzer.max_papers)后，之后检索到的论文不再分析
+        """
+        workers = max(1, self.analyzer.max_workers)
+        slots = threading.BoundedSemaphore(workers)
+        batch = []
+        done = False
+        kept = 0
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analysis") as executor:
+            while not done and not stop.is_set():
+                try:
+                    paper = paper_queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    paper = None
+                
+                if paper is _DONE:
+                    done = True
+                elif paper is not None:
+                    batch.append(paper)
+                
+                if batch and (len(batch) >= self.analyzer.batch_size or paper is None or done):
+                    papers = self._filter(batch, research_topic, kept)
+                    batch = []
+                    if not papers:
+                        continue
+                    kept += len(papers)
+                    slots.acquire()
+                    future = executor.submit(self._analyze, papers, research_topic, result_queue, stop)
+                    future.add_done_callback(lambda _: slots.release())
+        
+        self._put(result_queue, _DONE, stop)
+    
+    def _filter(self, batch, research_topic, kept):
+        """
+        对一批论文做预筛选
+        
+        参数:
+        - batch: 论文列表
+        - research_topic: 研究主题
+        - kept: 此前已保留的论文数
+        
+        返回:
+        - 需要分析的论文列表
+        """
+        if not self.analyzer.prefilter:
+            return batch
+        limit = self.analyzer.max_papers
+        if limit and kept >= limit:
+            self.logger.debug(f"已保留 {kept} 篇论文，达到分析数量上限，跳过 {len(batch)} 篇")
+            return []
+        try:
+            # 流式到达的论文无法与全部论文比较相对分数，只剔除与主题没有共同词的论文
+            return self.analyzer.filter_papers(batch, research_topic, min_relevance=0,
+                                               max_papers=limit - kept if limit else 0)
+        except Exception as e:
+            self.logger.error(f"预筛选出错，本批论文不做筛选: {str(e)}")
+            return batch
+    
+    def _analyze(self, papers, research_topic, result_queue, stop):
+        """分析一批论文并把结果放入结果队列"""
+        try:
+            for result in self.analyzer.analyze_batch(papers, research_topic):
+                if result is not None and not self._put(result_queue, result, stop):
+                    return
+        except LLMBudgetExceeded as e:
+            self.logger.error(f"{str(e)}，停止流水线")
+            self._fatal = e
+            stop.set()
+        except Exception as e:
+            self.logger.error(f"分析论文 '{papers[0].get('title')}' 等 {len(papers)} 篇时出错: {str(e)}")
@@ -0,0 +1,189 @@
+import re
+from utils.logger import Logger
+from utils.llm_client import get_llm_client
+from config import QUERY_MAX_SUBQUERIES, QUERY_EXPANSION_USE_LLM
+
+# 常见缩写 -> 全称，双向使用
+ACRONYMS = {
+    "llm": "large language model",
+    "llms": "large language models",
+    "lm": "language model",
+    "vlm": "vision language model",
+    "mllm": "multimodal large language model",
+    "rag": "retrieval augmented generation",
+    "gnn": "graph neural network",
+    "gnns": "graph neural networks",
+    "cnn": "convolutional neural network",
+    "rnn": "recurrent neural network",
+    "lstm": "long short-term memory",
+    "gan": "generative adversarial network",
+    "gans": "generative adversarial networks",
+    "vae": "variational autoencoder",
+    "vit": "vision transformer",
+    "rl": "reinforcement learning",
+    "rlhf": "reinforcement learning from human feedback",
+    "marl": "multi-agent reinforcement learning",
+    "nlp": "natural language processing",
+    "nlu": "natural language understanding",
+    "cv": "computer vision",
+    "asr": "automatic speech recognition",
+    "tts": "text to speech",
+    "mt": "machine translation",
+    "nmt": "neural machine translation",
+    "qa": "question answering",
+    "ner": "named entity recognition",
+    "kg": "knowledge graph",
+    "fl": "federated learning",
+    "ssl": "self-supervised learning",
+    "nas": "neural architecture search",
+    "moe": "mixture of experts",
+    "peft": "parameter-efficient fine-tuning",
+    "lora": "low-rank adaptation",
+    "cot": "chain of thought",
+    "slam": "simultaneous localization and mapping",
+    "iot": "internet of things",
+    "ai": "artificial intelligence",
+    "ml": "machine learning",
+    "dl": "deep learning",
+}
+
+# 同义或近义的表述
+SYNONYMS = {
+    "deep learning": ["deep neural networks"],
+    "large language model": ["foundation model"],
+    "large language models": ["foundation models"],
+    "retrieval augmented generation": ["retrieval-enhanced language model"],
+    "fine-tuning": ["adaptation"],
+    "detection": ["recognition"],
+    "compression": ["quantization", "pruning"],
+    "efficient": ["lightweight"],
+    "explainable": ["interpretable"],
+    "interpretability": ["explainability"],
+    "robustness": ["adversarial robustness"],
+    "privacy": ["differential privacy"],
+    "recommendation": ["recommender systems"],
+    "autonomous driving": ["self-driving"],
+    "text generation": ["natural language generation"],
+}
+
+# 综述类主题中与检索无关的修饰词
+_GENERIC_PATTERNS = [
+    r"\ba (?:comprehensive |systematic )?(?:survey|review) (?:of|on)\b",
+    r"\b(?:survey|review|overview|tutorial) (?:of|on)\b",
+    r"\brecent (?:advances|progress|developments|trends) (?:in|of|on)\b",
+    r"\b(?:survey|review|overview)\b",
+]
+
+
+class QueryPlanner:
+    def __init__(self, max_subqueries=QUERY_MAX_SUBQUERIES, use_llm=QUERY_EXPANSION_USE_LLM):
+        """
+        参数:
+        - max_subqueries: 子查询数量上限，包含原始主题
+        - use_llm: 是否调用大模型补充子领域查询
+        """
+        self.logger = Logger("QueryPlanner")
+        self.max_subqueries = max_subqueries
+        self.use_llm = use_llm
+        self._reverse_acronyms = {v: k for k, v in ACRONYMS.items()}
+
+    def plan(self, topic):
+        """
+        把研究主题扩展为多个子查询
+
+        参数:
+        - topic: 研究主题
+
+        返回:
+        - 子查询列表，第一个总是原始主题，其余按优先级排列且互不重复
+        """
+        candidates = [topic]
+        core = self._strip_generic(topic)
+        candidates.append(core)
+        candidates.extend(self._acronym_variants(core))
+        # 大模型生成的子领域查询覆盖面更广，优先于同义词替换
+        if self.use_llm and self.max_subqueries > 1:
+            candidates.extend(self._llm_subqueries(topic))
+        candidates.extend(self._synonym_variants(core))
+
+        queries = []
+        seen = set()
+        for query in candidates:
+            query = " ".join(query.split())
+            key = query.casefold()
+            if query and key not in seen:
+                seen.add(key)
+                queries.append(query)
+            if len(queries) >= self.max_subqueries:
+                break
+
+        self.logger.info(f"主题 '{topic}' 扩展为 {len(queries)} 个子查询: {queries}")
+        return queries
+
+    @staticmethod
+    def _strip_generic(topic):
+        """去掉“综述”“最新进展”等修饰，只保留主题本身"""
+        core = topic
+        for pattern in _GENERIC_PATTERNS:
+            core = re.sub(pattern, " ", core, flags=re.I)
+        core = " ".join(core.split()).strip(" ,:;-")
+        return core or topic
+
+    def _acronym_variants(self, query):
+        """缩写与全称互换"""
+        variants = []
+        lowered = query.casefold()
+
+        expanded = lowered
+        for acronym, full in ACRONYMS.items():
+            expanded = re.sub(rf"\b{re.escape(acronym)}\b", full, expanded)
+        if expanded != lowered:
+            variants.append(expanded)
+
+        # 全称按长度降序替换，避免短语被部分替换；两个字母的缩写歧义太大，不用于检索
+        contracted = lowered
+        for full in sorted(self._reverse_acronyms, key=len, reverse=True):
+            if len(self._reverse_acronyms[full]) < 3:
+                continue
+            contracted = re.sub(rf"\b{re.escape(full)}\b", self._reverse_acronyms[full].upper(), contracted)
+        if contracted != lowered:
+            variants.append(contracted)
+
+        return variants
+
+    def _synonym_variants(self, query):
+        """每次替换一个短语为其同义表述"""
+        variants = []
+        lowered = query.casefold()
+        for acronym, full in ACRONYMS.items():
+            lowered = re.sub(rf"\b{re.escape(acronym)}\b", full, lowered)
+        for phrase, synonyms in SYNONYMS.items():
+            if re.search(rf"\b{re.escape(phrase)}\b", lowered):
+                for synonym in synonyms:
+                    variants.append(re.sub(rf"\b{re.escape(phrase)}\b", synonym, lowered, count=1))
+        return variants
+
+    def _llm_subqueries(self, topic):
+        """调用大模型生成子领域查询，失败时返回空列表"""
+        try:
+            count = max(1, self.max_subqueries - 1)
+            prompt = f"""
+            请为研究主题"{topic}"生成 {count} 个用于学术论文检索引擎的英文查询，分别覆盖该主题最重要的子领域或常用的同义表述。
+            每行一个查询，只输出查询本身，不要编号、引号或解释，每个查询不超过8个单词。
+            """
+            messages = [
+                {"role": "system", "content": "你是一个熟悉各学科文献检索的学术助手。"},
+                {"role": "user", "content": prompt}
+            ]
+            content = get_llm_client().invoke(messages, stage="query_expansion", output_tokens=100, temperature=0)
+
+            queries = []
+            for line in content.splitlines():
+                line = re.sub(r"^\s*(?:[-*•]|\d+[.)、])\s*", "", line).strip().strip('"“”')
+                if line:
+                    queries.append(line)
+            return queries[:count]
+
+        except Exception as e:
+            self.logger.warning(f"调用大模型扩展查询失败，只使用规则扩展: {str(e)}")
+            return []
@@ -1,19 +1,13 @@
 import openai
 from utils.logger import Logger
-from langchain_openai import ChatOpenAI
-from config import OPENAI_API_KEY, OPENAI_API_BASE_URL, OPENAI_MODEL, CHUNK_SIZE, CHUNK_OVERLAP, TOP_K_RESULTS
+from utils.llm_client import get_llm_client, LLMBudgetExceeded
+from config import CHUNK_SIZE, CHUNK_OVERLAP, TOP_K_RESULTS
 from utils.paper_store import get_all_papers
 
 class RAGSystem:
     def __init__(self):
         self.logger = Logger("RAGSystem")
-        self.chat_model = ChatOpenAI(
-            model_name=OPENAI_MODEL,
-            openai_api_key=OPENAI_API_KEY,
-            base_url=OPENAI_API_BASE_URL
-        )
-        self.logger.info(f"初始化 ChatOpenAI 模型: {OPENAI_MODEL}")
-        self.logger.info(f"使用API基础URL: {OPENAI_API_BASE_URL if OPENAI_API_BASE_URL else '默认'}")
+        self.llm = get_llm_client()
         self.documents = []
         
     def add_documents(self, papers, analysis_results):
@@ -151,17 +145,19 @@ class RAGSystem:
                 {"role": "user", "content": full_prompt}
             ]
             
-            response = self.chat_model.invoke(
+            content = self.llm.invoke(
                 messages,
+                stage="section",
+                output_tokens=2500,
                 temperature=0.3,
                 max_tokens=2500
             )
-            
-            content = response.content
             self.logger.info(f"'{section_name}' 部分生成完成")
             
             return content
             
+        except LLMBudgetExceeded:
+            raise
         except Exception as e:
             self.logger.error(f"生成 '{section_name}' 部分时出错: {str(e)}")
             return f"生成 {section_name} 部分时出错: {str(e)}"
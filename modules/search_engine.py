@@ -2,22 +2,102 @@ import time
 import random
 import requests
 import arxiv
-import json
 import os
+import re
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+from functools import partial
 from scholarly import scholarly, ProxyGenerator
-from bs4 import BeautifulSoup
+from scholarly._navigator import Navigator
 from fake_useragent import UserAgent
 from utils.logger import Logger
+from modules.query_planner import QueryPlanner
+from utils.deadline import Deadline, DeadlineExceeded
+from utils.disk_cache import DiskCache
+from utils.session_pool import SessionPool
+from utils.rate_limiter import get_rate_limiter
+from utils.proxy_pool import ProxyPool, is_banned_response, proxy_name
+from utils.circuit_breaker import get_circuit_breaker, CircuitOpenError, backoff_delay, parse_retry_after
+from utils.dedup import PaperDeduplicator, fuse_ranked_lists
+from utils.ranking import rank_papers
+from utils.html_parser import make_soup, only, extract_js_json
+from utils.http_replay import make_transport
 from config import (
-    MAX_PAPERS, SEARCH_TIMEOUT, 
+    MAX_PAPERS, SEARCH_TIMEOUT, REQUEST_TIMEOUT, MAX_RETRIES, RETRY_STATUS_CODES,
+    CONCURRENT_SEARCH, SEARCH_MAX_WORKERS,
+    SEARCH_CACHE_ENABLED, SEARCH_CACHE_DIR, SEARCH_CACHE_TTL, SEARCH_CACHE_MAX_ENTRIES,
     USE_PROXY, HTTP_PROXY, HTTPS_PROXY, SOCKS_PROXY,
-    SCHOLAR_PROXY, ARXIV_PROXY, IEEE_PROXY, ACM_PROXY
+    SCHOLAR_PROXY, ARXIV_PROXY, IEEE_PROXY, ACM_PROXY,
+    USE_BACKUP_PROXY, BACKUP_HTTP_PROXY, BACKUP_HTTPS_PROXY, BACKUP_SOCKS_PROXY,
+    ARXIV_MAX_RESULTS, ARXIV_PAGE_SIZE, ARXIV_PAGE_WORKERS, ARXIV_CATEGORIES, ARXIV_DATE_FROM, ARXIV_DATE_TO,
+    HTTP_TRANSPORT_MODE, HTTP_FIXTURE_DIR, HTTP_REPLAY_SERVER,
+    QUERY_EXPANSION, QUERY_EXPANSION_WEIGHT
 )
 
+class _SiteSession:
+    """替代第三方客户端内部的requests.Session，把请求转交给SearchEngine._request"""
+    
+    def __init__(self, engine, site):
+        self.engine = engine
+        self.site = site
+    
+    def get(self, url, **kwargs):
+        return self.engine._request("GET", url, site=self.site, **kwargs)
+    
+    def post(self, url, **kwargs):
+        return self.engine._request("POST", url, site=self.site, **kwargs)
+
+
 class SearchEngine:
-    def __init__(self, max_papers=MAX_PAPERS, timeout=SEARCH_TIMEOUT):
+    # 论文来源 -> (检索方法名, 日志中显示的名称)
+    SOURCE_HANDLERS = {
+        "arxiv.org": ("_search_arxiv", "ArXiv"),
+        "scholar.google.com": ("_search_google_scholar", "Google Scholar"),
+        "ieee.org": ("_search_ieee", "IEEE"),
+        "acm.org": ("_search_acm", "ACM"),
+    }
+    # 论文来源 -> 实际请求的主机，熔断状态按主机记录
+    SOURCE_HOSTS = {
+        "arxiv.org": "export.arxiv.org",
+        "scholar.google.com": "scholar.google.com",
+        "ieee.org": "ieeexplore.ieee.org",
+        "acm.org": "dl.acm.org",
+    }
+    
+    def __init__(self, max_papers=MAX_PAPERS, timeout=SEARCH_TIMEOUT, concurrent=CONCURRENT_SEARCH,
+                 use_cache=SEARCH_CACHE_ENABLED, refresh_cache=False, arxiv_max_results=ARXIV_MAX_RESULTS,
+                 transport=None, expand_query=QUERY_EXPANSION):
         self.max_papers = max_papers
+        self.arxiv_max_results = arxiv_max_results
         self.timeout = timeout
+        self.concurrent = concurrent
+        self.max_workers = SEARCH_MAX_WORKERS
+        self._deadline = Deadline(None)
+        
+        # 把主题扩展为多个子查询，与各来源组合后并发检索
+        self.query_planner = QueryPlanner() if expand_query else None
+        
+        # 按主机复用的HTTP会话，跨来源、跨主题保持长连接和Cookie
+        # transport为传输适配器工厂(见utils.http_replay)，未指定时按HTTP_TRANSPORT_MODE配置录制/回放
+        if transport is None:
+            transport = make_transport(HTTP_TRANSPORT_MODE, HTTP_FIXTURE_DIR, HTTP_REPLAY_SERVER)
+        self.session_pool = SessionPool(adapter_factory=transport)
+        
+        # 进程内共享的按主机限速器，取代各爬虫中写死的随机等待
+        self.rate_limiter = get_rate_limiter()
+        
+        # 按主机熔断，连续失败的来源在冷却期内直接跳过
+        self.circuit_breaker = get_circuit_breaker()
+        
+        # scholarly的Navigator是全局单例，让其页面请求也经过限速器
+        navigator = Navigator()
+        navigator._get_page = partial(self._throttled_scholar_page, navigator)
+        
+        # 检索结果缓存，refresh_cache时不读取旧结果但仍写入新结果
+        self.cache = None
+        if use_cache:
+            self.cache = DiskCache(SEARCH_CACHE_DIR, ttl=SEARCH_CACHE_TTL, max_entries=SEARCH_CACHE_MAX_ENTRIES)
+        self.refresh_cache = refresh_cache
         self.logger = Logger("SearchEngine")
         self.user_agent = UserAgent()
         
@@ -33,6 +113,24 @@ class SearchEngine:
         self.ieee_proxy = IEEE_PROXY
         self.acm_proxy = ACM_PROXY
         
+        # 代理池：各网站的主代理优先，备用代理在后，按健康度自动切换
+        self.proxy_pool = ProxyPool()
+        if self.use_proxy:
+            backup_proxies = []
+            if BACKUP_HTTP_PROXY or BACKUP_HTTPS_PROXY:
+                backup_proxies.append({
+                    'http': BACKUP_HTTP_PROXY or BACKUP_HTTPS_PROXY,
+                    'https': BACKUP_HTTPS_PROXY or BACKUP_HTTP_PROXY
+                })
+            if BACKUP_SOCKS_PROXY:
+                backup_proxies.append({'http': BACKUP_SOCKS_PROXY, 'https': BACKUP_SOCKS_PROXY})
+            
+            for site in ('arxiv', 'scholar', 'ieee', 'acm'):
+                self.proxy_pool.add(site, self._get_proxies(site=site))
+                if USE_BACKUP_PROXY:
+                    for proxies in backup_proxies:
+                        self.proxy_pool.add(site, proxies)
+        
         # 配置Google Scholar代理
         if self.use_proxy and self.scholar_proxy:
             self._setup_scholar_proxy()
@@ -88,10 +186,10 @@ class SearchEngine:
         获取代理设置
         
         参数:
-        - site: 可选，指定网站的代理设置
+        - site: 可选，指定网站(arxiv/scholar/ieee/acm)的代理设置
         
         返回:
-        - 代理字典或None
+        - 代理字典或None，随每个请求单独传入，不修改进程级的环境变量
         """
         if not self.use_proxy:
             return None
@@ -99,20 +197,17 @@ class SearchEngine:
         proxies = {}
         
         # 使用特定网站的代理
-        if site == 'arxiv' and self.arxiv_proxy:
-            proxies = {
-                'http': self.arxiv_proxy,
-                'https': self.arxiv_proxy
-            }
-        elif site == 'ieee' and self.ieee_proxy:
-            proxies = {
-                'http': self.ieee_proxy,
-                'https': self.ieee_proxy
-            }
-        elif site == 'acm' and self.acm_proxy:
+        site_proxy = {
+            'arxiv': self.arxiv_proxy,
+            'scholar': self.scholar_proxy,
+            'ieee': self.ieee_proxy,
+            'acm': self.acm_proxy
+        }.get(site)
+        
+        if site_proxy:
             proxies = {
-                'http': self.acm_proxy,
-                'https': self.acm_proxy
+                'http': site_proxy,
+                'https': site_proxy
             }
         # 使用通用代理
         elif self.http_proxy or self.https_proxy:
@@ -123,6 +218,156 @@ class SearchEngine:
         
         return proxies if proxies else None
         
+    def _sleep(self, low, high):
+        """在剩余时间预算内随机等待，预算耗尽时返回False"""
+        return self._deadline.sleep(random.uniform(low, high))
+    
+    def _throttle(self, host):
+        """按主机限速，等待到可以发出请求为止；时间预算不足时返回False"""
+        return self.rate_limiter.acquire(host, deadline=self._deadline)
+    
+    def _throttled_scholar_page(self, navigator, pagerequest, premium=False):
+        """替换scholarly的页面请求，使每次实际访问Google Scholar都经过限速器和熔断器"""
+        host = "scholar.google.com"
+        if not self.circuit_breaker.allow(host):
+            raise CircuitOpenError(f"{host} 处于熔断状态，{self.circuit_breaker.retry_in(host):.0f} 秒后重试")
+        if not self._throttle(host):
+            self.circuit_breaker.release(host)
+            raise DeadlineExceeded("等待Google Scholar的请求配额时搜索时间预算耗尽")
+        try:
+            page = Navigator._get_page(navigator, pagerequest, premium)
+        except Exception:
+            self.circuit_breaker.record_failure(host)
+            raise
+        self.circuit_breaker.record_success(host)
+        return page
+    
+    def _request_timeout(self):
+        """单次请求的超时时间，不超过搜索阶段的剩余预算"""
+        return self._deadline.timeout(REQUEST_TIMEOUT)
+    
+    def _request(self, method, url, site=None, **kwargs):
+        """
+        通过会话池发送HTTP请求，复用同一主机的长连接和Cookie
+        
+        连接失败或返回RETRY_STATUS_CODES时按指数退避重试，最多MAX_RETRIES次，并遵循Retry-After；
+        每次失败(包括被拦截)都计入该主机的熔断器，熔断后不再发出请求
+        
+        参数:
+        - method: HTTP方法
+        - url: 请求地址
+        - site: 可选，用于从代理池选择该网站的代理；未指定时不使用配置的代理
+        - kwargs: 传给requests的其他参数，显式传入proxies时不经过代理池
+        
+        返回:
+        - requests.Response，重试耗尽时返回最后一次的响应
+        
+        异常:
+        - CircuitOpenError: 主机处于熔断状态
+        - DeadlineExceeded: 时间预算耗尽
+        """
+        host = urlparse(url).hostname
+        attempt = 0
+        while True:
+            if not self.circuit_breaker.allow(host):
+                raise CircuitOpenError(f"{host} 处于熔断状态，{self.circuit_breaker.retry_in(host):.0f} 秒后重试")
+            
+            response = None
+            try:
+                response = self._request_once(method, url, host, site, **kwargs)
+            except DeadlineExceeded:
+                self.circuit_breaker.release(host)
+                raise
+            except requests.RequestException as e:
+                error = e
+                retry_after = None
+            except Exception:
+                # 与主机健康无关的异常不计入熔断，但要交还半开状态的试探名额，否则该主机会一直被拦住
+                self.circuit_breaker.release(host)
+                raise
+            else:
+                if response.status_code not in RETRY_STATUS_CODES and not is_banned_response(response):
+                    self.circuit_breaker.record_success(host)
+                    return response
+                error = None
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            
+            # 被拦截(403/验证码)时重试也无济于事，只计入熔断
+            retryable = response is None or response.status_code in RETRY_STATUS_CODES
+            tripped = self.circuit_breaker.record_failure(host)
+            if tripped:
+                self.logger.warning(f"{host} 连续失败，暂停访问 {self.circuit_breaker.retry_in(host):.0f} 秒")
+            
+            if retryable and not tripped and attempt < MAX_RETRIES:
+                delay = backoff_delay(attempt, retry_after=retry_after)
+                self.logger.warning(
+                    f"请求 {host} 失败({error or response.status_code})，{delay:.1f} 秒后第 {attempt + 1} 次重试"
+                )
+                attempt += 1
+                if self._deadline.sleep(delay):
+                    continue
+            
+            if response is not None:
+                return response
+            raise error
+    
+    def _request_once(self, method, url, host, site=None, **kwargs):
+        """发送一次请求，配置了代理池时在代理之间自动切换"""
+        if site is None or 'proxies' in kwargs:
+            return self._send(method, url, host, **kwargs)
+        
+        # 依次尝试最健康的代理，连接失败或被拦截时切换到下一个
+        tried = set()
+        response = None
+        last_error = None
+        while True:
+            proxies = self.proxy_pool.select(site, host, exclude=tried)
+            if proxies is False:
+                break
+            
+            started = time.monotonic()
+            try:
+                response = self._send(method, url, host, proxies=proxies, **kwargs)
+            except DeadlineExceeded:
+                raise
+            except requests.RequestException as e:
+                self.proxy_pool.report(proxies, host, ok=False)
+                last_error = e
+            else:
+                banned = is_banned_response(response)
+                self.proxy_pool.report(proxies, host, ok=not banned, latency=time.monotonic() - started, banned=banned)
+                if not banned:
+                    return response
+            
+            if proxies is None:
+                break
+            tried.add(proxy_name(proxies))
+            self.logger.warning(f"代理 {proxy_name(proxies)} 访问 {host} 失败，尝试切换代理")
+        
+        if response is not None:
+            return response
+        raise last_error
+    
+    def _send(self, method, url, host, **kwargs):
+        """经过限速后通过会话池发送请求"""
+        if not self._throttle(host):
+            raise DeadlineExceeded(f"等待 {host} 的请求配额时搜索时间预算耗尽")
+        kwargs.setdefault('timeout', self._request_timeout())
+        session = self.session_pool.get(host)
+        return session.request(method, url, **kwargs)
+    
+    def _warm_up(self, url, site=None, **kwargs):
+        """访问网站首页获取Cookie，同一主机在会话池的生命周期内只访问一次"""
+        host = urlparse(url).hostname
+        try:
+            self.session_pool.warm_up(host, lambda session: self._request("GET", url, site=site, **kwargs))
+        except Exception as e:
+            self.logger.warning(f"访问 {host} 首页获取Cookie失败: {str(e)}")
+    
+    def close(self):
+        """释放会话池中的连接"""
+        self.session_pool.close()
+    
     def search(self, query, sources=None):
         """
         根据查询从多个来源搜索论文
@@ -139,65 +384,271 @@ class SearchEngine:
             
         self.logger.info(f"开始搜索关于 '{query}' 的论文，来源: {', '.join(sources)}")
         
-        all_papers = []
-        
-        # 从ArXiv搜索
-        if "arxiv.org" in sources:
-            arxiv_papers = self._search_arxiv(query)
-            all_papers.extend(arxiv_papers)
-            self.logger.info(f"从ArXiv获取了 {len(arxiv_papers)} 篇论文")
+        # 整个搜索阶段共享同一个时间预算，各来源的请求和等待都从中扣除
+        self._deadline = Deadline(self.timeout)
         
-        # 从Google Scholar搜索
-        if "scholar.google.com" in sources:
-            scholar_papers = self._search_google_scholar(query)
-            all_papers.extend(scholar_papers)
-            self.logger.info(f"从Google Scholar获取了 {len(scholar_papers)} 篇论文")
+        queries = self._plan_queries(query)
+        results = {(source, subquery): papers for source, subquery, papers in self._iter_source_results(queries, sources)}
         
-        # 从IEEE搜索
-        if "ieee.org" in sources:
-            ieee_papers = self._search_ieee(query)
-            all_papers.extend(ieee_papers)
-            self.logger.info(f"从IEEE获取了 {len(ieee_papers)} 篇论文")
+        # 每个(来源, 子查询)的结果是一个有序列表，用倒数排名融合合并并去重；
+        # 按来源顺序排列列表，保证去重时的主记录优先级与顺序检索一致
+        ranked_lists = []
+        for source in sources:
+            for index, subquery in enumerate(queries):
+                papers = results.get((source, subquery))
+                if papers:
+                    ranked_lists.append((papers, 1.0 if index == 0 else QUERY_EXPANSION_WEIGHT))
+        unique_papers = fuse_ranked_lists(ranked_lists)
         
-        # 从ACM搜索
-        if "acm.org" in sources:
-            acm_papers = self._search_acm(query)
-            all_papers.extend(acm_papers)
-            self.logger.info(f"从ACM获取了 {len(acm_papers)} 篇论文")
-        
-        # 去重
-        unique_papers = self._deduplicate_papers(all_papers)
-        
-        # 限制数量
+        # 按与主题的相关性、新近度、引用数和融合排名综合排序后再限制数量，使后续分析预算用在最相关的论文上
+        unique_papers = rank_papers(unique_papers, queries)
         result_papers = unique_papers[:self.max_papers]
         
         self.logger.info(f"搜索完成，总共找到 {len(unique_papers)} 篇不重复论文，保留 {len(result_papers)} 篇")
         
         return result_papers
     
+    def search_stream(self, query, sources=None):
+        """
+        流式检索论文，每个来源完成后立即产出其中最相关的一部分论文
+        
+        为避免最先返回的来源占满论文数上限，每个(来源, 子查询)最多先产出 max_papers/任务数 篇，
+        按与主题的相关性排序；超出份额的论文暂存，全部来源完成(或时间预算耗尽)后按相关性补足剩余名额。
+        
+        参数:
+        - query: 查询字符串
+        - sources: 搜索源列表
+        
+        返回:
+        - 生成器，逐篇产出去重后的论文；产出max_papers篇或调用方停止迭代后，
+          不再等待其余来源，仍在运行的来源会收到取消通知
+        """
+        if sources is None:
+            sources = ["arxiv.org", "scholar.google.com", "ieee.org", "acm.org"]
+        
+        self.logger.info(f"开始流式搜索关于 '{query}' 的论文，来源: {', '.join(sources)}")
+        
+        self._deadline = Deadline(self.timeout)
+        deduplicator = PaperDeduplicator()
+        emitted = 0
+        
+        # 流式检索按完成顺序产出，不做排名融合；每个任务的份额内按相关性排序
+        queries = self._plan_queries(query)
+        quota = max(1, -(-self.max_papers // (len(queries) * len(sources))))
+        held = []
+        results = self._iter_source_results(queries, sources)
+        try:
+            for source, subquery, papers in results:
+                new_papers = []
+                for paper in papers:
+                    # 重复论文的元数据会合并进已产出或暂存的记录
+                    record, is_new = deduplicator.add(paper)
+                    if is_new:
+                        new_papers.append(record)
+                
+                ranked = rank_papers(new_papers, queries)
+                held.extend(ranked[quota:])
+                for record in ranked[:quota]:
+                    emitted += 1
+                    yield record
+                    
+                    if emitted >= self.max_papers:
+                        self.logger.info(f"已产出 {emitted} 篇不重复论文，停止检索其余来源")
+                        return
+            
+            # 全部来源完成后，从暂存的论文中按相关性补足剩余名额
+            for record in rank_papers(held, queries)[:self.max_papers - emitted]:
+                emitted += 1
+                yield record
+        finally:
+            results.close()
+            self.logger.info(f"流式搜索结束，共产出 {emitted} 篇不重复论文")
+    
+    def _run_source(self, source, query):
+        """
+        从单个来源检索论文
+        
+        参数:
+        - source: 来源域名，需在SOURCE_HANDLERS中注册
+        - query: 查询字符串
+        
+        返回:
+        - 该来源检索到的论文列表
+        """
+        handler = self.SOURCE_HANDLERS.get(source)
+        if handler is None:
+            self.logger.warning(f"不支持的论文来源: {source}，已跳过")
+            return []
+        
+        method_name, display_name = handler
+        cache_key = self._cache_key(source, query)
+        if self.cache and not self.refresh_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.logger.info(f"从缓存获取了 {len(cached)} 篇{display_name}论文")
+                return cached
+        
+        if self._deadline.expired():
+            self.logger.warning(f"搜索时间预算已耗尽，跳过{display_name}")
+            return []
+        
+        host = self.SOURCE_HOSTS.get(source)
+        if host and self.circuit_breaker.is_open(host):
+            self.logger.warning(f"{display_name}连续失败已熔断，{self.circuit_breaker.retry_in(host):.0f} 秒内跳过该来源")
+            return []
+        
+        papers = getattr(self, method_name)(query)
+        self.logger.info(f"从{display_name}获取了 {len(papers)} 篇论文")
+        
+        # 空结果多半是请求失败，被时间预算截断的结果也不完整，都不写入缓存
+        if self.cache and papers and not self._deadline.expired():
+            try:
+                self.cache.set(cache_key, papers)
+            except Exception as e:
+                self.logger.warning(f"写入{display_name}检索缓存失败: {str(e)}")
+        
+        return papers
+    
+    def _cache_key(self, source, query):
+        """缓存键: (来源, 规范化后的查询, 最大论文数)"""
+        normalized_query = " ".join(re.sub(r"[^\w]+", " ", query.casefold()).split())
+        return DiskCache.make_key(source, normalized_query, self.max_papers, self.arxiv_max_results)
+    
+    def _plan_queries(self, query):
+        """生成本次检索的子查询，第一个总是原始主题"""
+        if self.query_planner is None:
+            return [query]
+        try:
+            return self.query_planner.plan(query)
+        except Exception as e:
+            self.logger.warning(f"扩展查询失败，只使用原始主题检索: {str(e)}")
+            return [query]
+    
+    def _iter_source_results(self, queries, sources):
+        """
+        按(来源, 子查询)检索，按完成顺序产出结果；并发模式下整体耗时取决于最慢的任务而非各任务之和，
+        同一主机的请求仍由限速器控制节奏
+        
+        参数:
+        - queries: 子查询列表，靠前的子查询先提交
+        - sources: 搜索源列表
+        
+        返回:
+        - 生成器，产出 (来源, 子查询, 论文列表)，只包含在时间预算内完成的任务
+        """
+        tasks = [(source, query) for query in queries for source in sources]
+        
+        if not (self.concurrent and len(tasks) > 1):
+            for source, query in tasks:
+                yield source, query, self._run_source(source, query)
+            return
+        
+        executor = ThreadPoolExecutor(
+            max_workers=min(self.max_workers, len(tasks)),
+            thread_name_prefix="search"
+        )
+        futures = {executor.submit(self._run_source, source, query): (source, query) for source, query in tasks}
+        
+        try:
+            for future in as_completed(futures, timeout=self._deadline.remaining()):
+                source, query = futures[future]
+                try:
+                    papers = future.result()
+                except Exception as e:
+                    self.logger.error(f"从 {source} 检索 '{query}' 时出错: {str(e)}")
+                    continue
+                yield source, query, papers
+        except FuturesTimeoutError:
+            pending = [f"{futures[f][0]}('{futures[f][1]}')" for f in futures if not f.done()]
+            self.logger.warning(f"搜索超过 {self.timeout} 秒，放弃未完成的检索: {', '.join(pending)}")
+        finally:
+            # 超时或调用方提前停止时，通知仍在运行的来源尽快结束
+            if not all(f.done() for f in futures):
+                self._deadline.cancel()
+            # 不等待仍在运行的来源，已完成的结果直接返回
+            executor.shutdown(wait=False, cancel_futures=True)
+    
     def _search_arxiv(self, query):
-        """从ArXiv搜索论文"""
+        """
+        从ArXiv批量检索论文
+        
+        按ARXIV_PAGE_SIZE分页，每页只需一次API请求。首页返回满页时，其余页面并发获取，
+        实际请求节奏仍由export.arxiv.org的限速配置控制。分类和日期过滤在服务端完成。
+        """
         self.logger.info(f"正在从ArXiv搜索: {query}")
         papers = []
         
-        # 如果有ArXiv特定代理，需要设置环境变量
-        if self.use_proxy and self.arxiv_proxy:
-            original_http_proxy = os.environ.get('http_proxy')
-            original_https_proxy = os.environ.get('https_proxy')
-            
-            os.environ['http_proxy'] = self.arxiv_proxy
-            os.environ['https_proxy'] = self.arxiv_proxy
-            self.logger.info(f"已为ArXiv设置代理: {self.arxiv_proxy}")
+        max_results = self.arxiv_max_results or int(self.max_papers * 0.3)
+        if max_results <= 0:
+            return papers
+        
+        search_query = self._build_arxiv_query(query)
+        page_size = max(1, min(ARXIV_PAGE_SIZE, max_results))
+        starts = list(range(0, max_results, page_size))
         
         try:
-            search = arxiv.Search(
-                query=query,
-                max_results=int(self.max_papers * 0.3),
-                sort_by=arxiv.SortCriterion.Relevance
-            )
+            # 先取首页，结果不足一页时无需再请求后续页面
+            papers = self._fetch_arxiv_page(search_query, 0, min(page_size, max_results))
             
-            for result in search.results():
-                paper = {
+            if len(papers) >= page_size and len(starts) > 1 and not self._deadline.expired():
+                with ThreadPoolExecutor(max_workers=ARXIV_PAGE_WORKERS, thread_name_prefix="arxiv") as executor:
+                    pages = executor.map(
+                        lambda start: self._fetch_arxiv_page(search_query, start, min(page_size, max_results - start)),
+                        starts[1:]
+                    )
+                    for page in pages:
+                        papers.extend(page)
+                        
+        except Exception as e:
+            self.logger.error(f"从ArXiv搜索时出错: {str(e)}")
+        
+        return papers
+    
+    def _build_arxiv_query(self, query):
+        """在查询中加入服务端的分类和提交日期过滤条件"""
+        clauses = [f"({query})"]
+        
+        if ARXIV_CATEGORIES:
+            clauses.append("(" + " OR ".join(f"cat:{category}" for category in ARXIV_CATEGORIES) + ")")
+        
+        if ARXIV_DATE_FROM or ARXIV_DATE_TO:
+            date_from = ARXIV_DATE_FROM.replace("-", "") + "0000" if ARXIV_DATE_FROM else "190001010000"
+            date_to = ARXIV_DATE_TO.replace("-", "") + "2359" if ARXIV_DATE_TO else "299912312359"
+            clauses.append(f"submittedDate:[{date_from} TO {date_to}]")
+        
+        return clauses[0][1:-1] if len(clauses) == 1 else " AND ".join(clauses)
+    
+    def _fetch_arxiv_page(self, search_query, start, size):
+        """
+        获取一页ArXiv检索结果
+        
+        参数:
+        - search_query: arXiv API查询字符串
+        - start: 结果起始位置
+        - size: 本页结果数
+        
+        返回:
+        - 本页论文列表，单页失败时返回已获取的部分
+        """
+        papers = []
+        search = arxiv.Search(
+            query=search_query,
+            max_results=start + size,
+            sort_by=arxiv.SortCriterion.Relevance
+        )
+        
+        # arxiv客户端的请求改走_request，使用ArXiv专用代理、会话池、限速器和熔断器
+        # 错误状态码的退避重试由_request负责，客户端只需再处理arXiv偶发的空页
+        client = arxiv.Client(page_size=size, delay_seconds=0, num_retries=1)
+        client._session = _SiteSession(self, 'arxiv')
+        
+        try:
+            for result in client.results(search, offset=start):
+                if self._deadline.expired():
+                    self.logger.warning("搜索时间预算已耗尽，停止从ArXiv获取论文")
+                    break
+                
+                papers.append({
                     'title': result.title,
                     'authors': [author.name for author in result.authors],
                     'year': result.published.year if hasattr(result, 'published') else None,
@@ -205,28 +656,11 @@ class SearchEngine:
                     'url': result.pdf_url,
                     'source': 'arxiv.org',
                     'id': result.entry_id
-                }
-                papers.append(paper)
-                
-                # 进度更新
-                if len(papers) % 5 == 0:
-                    self.logger.info(f"已从ArXiv获取 {len(papers)} 篇论文")
-                
+                })
         except Exception as e:
-            self.logger.error(f"从ArXiv搜索时出错: {str(e)}")
-        
-        # 恢复环境变量
-        if self.use_proxy and self.arxiv_proxy:
-            if original_http_proxy:
-                os.environ['http_proxy'] = original_http_proxy
-            else:
-                os.environ.pop('http_proxy', None)
-                
-            if original_https_proxy:
-                os.environ['https_proxy'] = original_https_proxy
-            else:
-                os.environ.pop('https_proxy', None)
+            self.logger.error(f"获取ArXiv第 {start} 条起的结果时出错: {str(e)}")
         
+        self.logger.info(f"已从ArXiv第 {start} 条起获取 {len(papers)} 篇论文")
         return papers
     
     def _search_google_scholar(self, query):
@@ -234,9 +668,6 @@ class SearchEngine:
         self.logger.info(f"正在从Google Scholar搜索: {query}")
         papers = []
         
-        # 随机等待一段时间，模拟人类行为
-        time.sleep(random.uniform(2, 5))
-        
         try:
             # 设置请求头，模拟不同的浏览器
             headers = {
@@ -257,15 +688,19 @@ class SearchEngine:
             
             search_query = scholarly.search_pubs(query)
             count = 0
+            failures = 0
             
             # 减少请求数量，避免被限制
             max_papers = min(20, int(self.max_papers * 0.2)) 
             
             for _ in range(max_papers):
+                if self._deadline.expired():
+                    self.logger.warning("搜索时间预算已耗尽，停止从Google Scholar获取论文")
+                    break
+                
                 try:
+                    # scholarly每页返回10条结果，实际请求由_throttled_scholar_page限速
                     pub = next(search_query)
-                    # 随机延迟以避免被封，增加延迟时间
-                    time.sleep(random.uniform(3, 7))
                     
                     # 从搜索结果提取论文信息
                     if 'bib' in pub:
@@ -283,25 +718,29 @@ class SearchEngine:
                                 'abstract': abstract,
                                 'url': url,
                                 'source': 'scholar.google.com',
-                                'id': pub.get('scholar_id', '')
+                                'id': pub.get('scholar_id', ''),
+                                'citations': pub.get('num_citations')
                             }
                             papers.append(paper)
                             count += 1
+                            failures = 0
                             
                             if count % 3 == 0:
                                 self.logger.info(f"已从Google Scholar获取 {count} 篇论文")
-                                # 每获取3篇论文后增加一个较长的随机延迟
-                                time.sleep(random.uniform(5, 10))
                         
                 except StopIteration:
                     break
+                except (CircuitOpenError, DeadlineExceeded) as e:
+                    self.logger.warning(f"停止从Google Scholar获取论文: {str(e)}")
+                    break
                 except Exception as e:
                     self.logger.warning(f"获取Google Scholar论文时出错: {str(e)}")
-                    # 出错后增加较长暂停，避免连续错误请求
-                    time.sleep(random.uniform(5, 10))
-                    # 最多重试3次
-                    if count >= 3:
+                    # 连续出错时按指数退避，超过最大重试次数或已熔断则放弃
+                    if failures >= MAX_RETRIES or self.circuit_breaker.is_open("scholar.google.com"):
+                        break
+                    if not self._deadline.sleep(backoff_delay(failures)):
                         break
+                    failures += 1
         
         except Exception as e:
             self.logger.error(f"从Google Scholar搜索时出错: {str(e)}")
@@ -316,6 +755,10 @@ class SearchEngine:
         self.logger.info(f"正在使用备用方法从Google Scholar搜索: {query}")
         papers = []
         
+        if self._deadline.expired():
+            self.logger.warning("搜索时间预算已耗尽，跳过备用Google Scholar搜索")
+            return papers
+        
         try:
             # 构建搜索URL
             base_url = "https://scholar.google.com/scholar"
@@ -335,26 +778,18 @@ class SearchEngine:
                 'Referer': 'https://scholar.google.com/'
             }
             
-            # 获取代理
-            proxies = self._get_proxies(site='scholar')
-            if not proxies and self.scholar_proxy:
-                proxies = {
-                    'http': self.scholar_proxy,
-                    'https': self.scholar_proxy
-                }
-            
-            # 发送请求
-            response = requests.get(
-                base_url, 
-                params=params, 
-                headers=headers, 
-                proxies=proxies,
-                timeout=self.timeout
+            # 发送请求，经过scholar代理池按健康度选择和切换代理
+            response = self._request(
+                "GET",
+                base_url,
+                site='scholar',
+                params=params,
+                headers=headers
             )
             
             if response.status_code == 200:
-                # 解析HTML
-                soup = BeautifulSoup(response.text, 'html.parser')
+                # 只解析结果条目的子树
+                soup = make_soup(response.text, parse_only=only("div", "gs_ri"))
                 
                 # 查找论文条目
                 articles = soup.select("div.gs_ri")
@@ -388,6 +823,14 @@ class SearchEngine:
                         abstract_elem = article.select_one("div.gs_rs")
                         abstract = abstract_elem.text if abstract_elem else ""
                         
+                        # 提取引用数
+                        citations = None
+                        links_elem = article.select_one("div.gs_fl")
+                        if links_elem:
+                            cited_match = re.search(r'(?:Cited by|被引用次数[:：]?)\s*(\d+)', links_elem.text)
+                            if cited_match:
+                                citations = int(cited_match.group(1))
+                        
                         # 生成ID
                         import hashlib
                         paper_id = hashlib.md5(title.encode()).hexdigest()
@@ -400,7 +843,8 @@ class SearchEngine:
                                 'abstract': abstract,
                                 'url': url,
                                 'source': 'scholar.google.com',
-                                'id': paper_id
+                                'id': paper_id,
+                                'citations': citations
                             }
                             papers.append(paper)
                     
@@ -450,38 +894,24 @@ class SearchEngine:
                 "Sec-Fetch-Site": "same-origin"
             }
             
-            # 随机延迟
-            time.sleep(random.uniform(1, 3))
-            
-            # 获取代理
-            proxies = self._get_proxies(site='ieee')
-            
-            # 添加Cookie支持和会话保持
-            session = requests.Session()
-            
-            # 先访问主页获取必要的Cookie
-            try:
-                home_url = "https://ieeexplore.ieee.org/Xplore/home.jsp"
-                session.get(
-                    home_url, 
-                    headers={
-                        "User-Agent": headers["User-Agent"],
-                        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8",
-                        "Accept-Language": headers["Accept-Language"]
-                    },
-                    proxies=proxies,
-                    timeout=self.timeout
-                )
-            except Exception as e:
-                self.logger.warning(f"访问IEEE主页获取Cookie失败: {str(e)}")
+            # 先访问主页获取必要的Cookie，会话池中的同一主机只需访问一次
+            self._warm_up(
+                "https://ieeexplore.ieee.org/Xplore/home.jsp",
+                site='ieee',
+                headers={
+                    "User-Agent": headers["User-Agent"],
+                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8",
+                    "Accept-Language": headers["Accept-Language"]
+                }
+            )
             
             # 发送搜索请求
-            response = session.post(
+            response = self._request(
+                "POST",
                 base_url, 
+                site='ieee',
                 headers=headers, 
-                json=payload, 
-                timeout=self.timeout,
-                proxies=proxies
+                json=payload
             )
             
             if response.status_code == 200:
@@ -524,7 +954,8 @@ class SearchEngine:
                                     'abstract': abstract,
                                     'url': url,
                                     'source': 'ieee.org',
-                                    'id': record.get("articleNumber", "")
+                                    'id': record.get("articleNumber", ""),
+                                    'citations': record.get("citationCount")
                                 }
                                 papers.append(paper)
                                 
@@ -554,6 +985,13 @@ class SearchEngine:
         self.logger.info(f"正在使用备用方法从IEEE爬取: {query}")
         papers = []
         
+        if self._deadline.expired():
+            self.logger.warning("搜索时间预算已耗尽，跳过IEEE备用方法")
+            return papers
+        if self.circuit_breaker.is_open("ieeexplore.ieee.org"):
+            self.logger.warning("IEEE连续失败已熔断，跳过IEEE备用方法")
+            return papers
+        
         try:
             # 构建搜索URL - 使用标准的搜索页面
             search_url = f"https://ieeexplore.ieee.org/search/searchresult.jsp?queryText={query.replace(' ', '+')}"
@@ -568,61 +1006,42 @@ class SearchEngine:
                 "Cache-Control": "max-age=0"
             }
             
-            # 获取代理
-            proxies = self._get_proxies(site='ieee')
-            
-            # 使用会话保持
-            session = requests.Session()
-            
-            # 随机延迟
-            time.sleep(random.uniform(1, 3))
-            
-            response = session.get(
+            response = self._request(
+                "GET",
                 search_url, 
-                headers=headers, 
-                timeout=self.timeout,
-                proxies=proxies
+                site='ieee',
+                headers=headers
             )
             
             if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # 查找结果数量，验证页面是否包含搜索结果
-                result_info = soup.select_one("span.strong.margin-right-10")
-                if result_info and "Results" in result_info.text:
-                    self.logger.info(f"IEEE搜索结果: {result_info.text.strip()}")
-                
-                # 尝试方法1: 从脚本提取JSON数据
+                # 尝试方法1: 直接扫描页面源码中的内嵌JSON，无需构建DOM树
                 script_data_found = False
-                for script in soup.find_all("script"):
-                    if script.string and "xplGlobal.document.metadata" in str(script.string):
-                        # 尝试提取JSON数据
-                        try:
-                            script_text = str(script.string)
-                            json_start = script_text.find("xplGlobal.document.metadata=") + len("xplGlobal.document.metadata=")
-                            json_end = script_text.find(";", json_start)
-                            
-                            if json_start > 0 and json_end > json_start:
-                                json_data = script_text[json_start:json_end].strip()
-                                paper_data = json.loads(json_data)
-                                
-                                paper = {
-                                    'title': paper_data.get("title", ""),
-                                    'authors': [author.get("name", "") for author in paper_data.get("authors", [])],
-                                    'year': paper_data.get("publicationYear", None),
-                                    'abstract': paper_data.get("abstract", ""),
-                                    'url': f"https://ieeexplore.ieee.org/document/{paper_data.get('articleId', '')}",
-                                    'source': 'ieee.org',
-                                    'id': paper_data.get("articleId", "")
-                                }
-                                papers.append(paper)
-                                script_data_found = True
-                        except Exception as e:
-                            self.logger.warning(f"从IEEE脚本提取数据时出错: {str(e)}")
-                            continue
+                for paper_data in extract_js_json(response.text, "xplGlobal.document.metadata"):
+                    try:
+                        paper = {
+                            'title': paper_data.get("title", ""),
+                            'authors': [author.get("name", "") for author in paper_data.get("authors", [])],
+                            'year': paper_data.get("publicationYear", None),
+                            'abstract': paper_data.get("abstract", ""),
+                            'url': f"https://ieeexplore.ieee.org/document/{paper_data.get('articleId', '')}",
+                            'source': 'ieee.org',
+                            'id': paper_data.get("articleId", "")
+                        }
+                        papers.append(paper)
+                        script_data_found = True
+                    except Exception as e:
+                        self.logger.warning(f"从IEEE脚本提取数据时出错: {str(e)}")
+                        continue
                 
                 # 尝试方法2: 查找搜索结果元素
                 if not script_data_found:
+                    soup = make_soup(response.text)
+                    
+                    # 查找结果数量，验证页面是否包含搜索结果
+                    result_info = soup.select_one("span.strong.margin-right-10")
+                    if result_info and "Results" in result_info.text:
+                        self.logger.info(f"IEEE搜索结果: {result_info.text.strip()}")
+                    
                     # 现代IEEE页面使用不同的类名
                     selectors = [
                         "div.List-results-items",  # 新版UI
@@ -761,6 +1180,10 @@ class SearchEngine:
         self.logger.info(f"使用替代方法搜索IEEE论文: {query}")
         papers = []
         
+        if self._deadline.expired():
+            self.logger.warning("搜索时间预算已耗尽，跳过IEEE替代方法")
+            return papers
+        
         try:
             # 使用谷歌学术或其他搜索引擎搜索IEEE论文
             search_query = f"{query} site:ieeexplore.ieee.org"
@@ -778,7 +1201,8 @@ class SearchEngine:
                         "q": search_query,
                         "num": 10
                     }
-                    response = requests.post(
+                    response = self._request(
+                        "POST",
                         "https://google.serper.dev/search",
                         headers=headers,
                         json=payload
@@ -844,41 +1268,28 @@ class SearchEngine:
                 "Sec-Fetch-User": "?1"
             }
             
-            # 获取代理
-            proxies = self._get_proxies(site='acm')
-            
-            # 使用会话对象保持Cookie
-            session = requests.Session()
-            
-            # 先访问首页获取必要的Cookie
-            try:
-                home_url = "https://dl.acm.org/"
-                session.get(
-                    home_url, 
-                    headers={
-                        "User-Agent": headers["User-Agent"],
-                        "Accept": headers["Accept"],
-                        "Accept-Language": headers["Accept-Language"]
-                    },
-                    proxies=proxies,
-                    timeout=self.timeout
-                )
-            except Exception as e:
-                self.logger.warning(f"访问ACM首页获取Cookie失败: {str(e)}")
-            
-            # 随机延迟，模拟人类行为
-            time.sleep(random.uniform(1, 3))
+            # 先访问首页获取必要的Cookie，会话池中的同一主机只需访问一次
+            self._warm_up(
+                "https://dl.acm.org/",
+                site='acm',
+                headers={
+                    "User-Agent": headers["User-Agent"],
+                    "Accept": headers["Accept"],
+                    "Accept-Language": headers["Accept-Language"]
+                }
+            )
             
             # 发送搜索请求
-            response = session.get(
+            response = self._request(
+                "GET",
                 search_url, 
-                headers=headers, 
-                timeout=self.timeout,
-                proxies=proxies
+                site='acm',
+                headers=headers
             )
             
             if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
+                # 只解析结果条目的子树
+                soup = make_soup(response.text, parse_only=only("div", "issue-item"))
                 
                 # 查找论文条目
                 article_elements = soup.select("div.issue-item")
@@ -967,7 +1378,8 @@ class SearchEngine:
                     except:
                         pass
                     
-                    # 尝试备用元素选择器
+                    # 尝试备用元素选择器，需要完整解析页面
+                    soup = make_soup(response.text)
                     fallback_selectors = [
                         "div.search__item", 
                         "div.search-result__item", 
@@ -1009,6 +1421,13 @@ class SearchEngine:
         self.logger.info(f"正在使用备用方法从ACM爬取: {query}")
         papers = []
         
+        if self._deadline.expired():
+            self.logger.warning("搜索时间预算已耗尽，跳过ACM备用方法")
+            return papers
+        if self.circuit_breaker.is_open("dl.acm.org"):
+            self.logger.warning("ACM连续失败已熔断，跳过ACM备用方法")
+            return papers
+        
         try:
             # ACM JSON搜索接口
             base_url = "https://dl.acm.org/action/doSearch"
@@ -1032,37 +1451,23 @@ class SearchEngine:
                 "Sec-Fetch-Site": "same-origin"
             }
             
-            # 获取代理
-            proxies = self._get_proxies(site='acm')
-            
-            # 使用会话保持
-            session = requests.Session()
-            
-            # 先访问首页获取必要的Cookie
-            try:
-                home_url = "https://dl.acm.org/"
-                session.get(
-                    home_url, 
-                    headers={
-                        "User-Agent": headers["User-Agent"],
-                        "Accept": "text/html,application/xhtml+xml,application/xml"
-                    },
-                    proxies=proxies,
-                    timeout=self.timeout
-                )
-            except Exception as e:
-                self.logger.warning(f"访问ACM首页获取Cookie失败: {str(e)}")
-            
-            # 随机延迟
-            time.sleep(random.uniform(1, 3))
+            # 先访问首页获取必要的Cookie，会话池中的同一主机只需访问一次
+            self._warm_up(
+                "https://dl.acm.org/",
+                site='acm',
+                headers={
+                    "User-Agent": headers["User-Agent"],
+                    "Accept": "text/html,application/xhtml+xml,application/xml"
+                }
+            )
             
             # 发送JSON搜索请求
-            response = session.get(
+            response = self._request(
+                "GET",
                 base_url, 
+                site='acm',
                 params=params, 
-                headers=headers, 
-                timeout=self.timeout,
-                proxies=proxies
+                headers=headers
             )
             
             if response.status_code == 200:
@@ -1140,6 +1545,10 @@ class SearchEngine:
         self.logger.info(f"使用替代方法搜索ACM论文: {query}")
         papers = []
         
+        if self._deadline.expired():
+            self.logger.warning("搜索时间预算已耗尽，跳过ACM替代方法")
+            return papers
+        
         try:
             # 使用谷歌学术或其他搜索引擎搜索ACM论文
             search_query = f"{query} site:dl.acm.org"
@@ -1157,7 +1566,8 @@ class SearchEngine:
                         "q": search_query,
                         "num": 10
                     }
-                    response = requests.post(
+                    response = self._request(
+                        "POST",
                         "https://google.serper.dev/search",
                         headers=headers,
                         json=payload
@@ -1223,16 +1633,3 @@ class SearchEngine:
             self.logger.error(f"ACM替代搜索方法出错: {str(e)}")
         
         return papers
-    
-    def _deduplicate_papers(self, papers):
-        """去除重复论文"""
-        unique_papers = []
-        seen_titles = set()
-        
-        for paper in papers:
-            title = paper.get('title', '').lower().strip()
-            if title and title not in seen_titles:
-                seen_titles.add(title)
-                unique_papers.append(paper)
-        
-        return unique_papers
\ No newline at end of file
@@ -0,0 +1,94 @@
+import time
+
+from utils.circuit_breaker import CircuitBreaker, backoff_delay, parse_retry_after, OPEN, HALF_OPEN, CLOSED
+
+
+def make_breaker(tmp_path=None, **kwargs):
+    options = dict(failure_threshold=2, cooldown=10, max_cooldown=25)
+    options.update(kwargs)
+    return CircuitBreaker(state_file=str(tmp_path / "breaker.json") if tmp_path else None, **options)
+
+
+def expire(breaker, key):
+    breaker._circuits[key].open_until = time.time() - 1
+
+
+def test_trips_after_consecutive_failures():
+    breaker = make_breaker()
+    assert breaker.record_failure("host") is False
+    assert breaker.allow("host")
+    assert breaker.record_failure("host") is True
+    assert breaker.is_open("host")
+    assert not breaker.allow("host")
+    assert 9 < breaker.retry_in("host") <= 10
+
+
+def test_success_resets_failure_count():
+    breaker = make_breaker()
+    breaker.record_failure("host")
+    breaker.record_success("host")
+    assert breaker.record_failure("host") is False
+
+
+def test_half_open_allows_a_single_probe():
+    breaker = make_breaker()
+    breaker.record_failure("host")
+    breaker.record_failure("host")
+    expire(breaker, "host")
+
+    assert breaker.allow("host")
+    assert breaker._circuits["host"].state == HALF_OPEN
+    assert not breaker.allow("host")
+
+    # 试探未得出结果时归还名额
+    breaker.release("host")
+    assert breaker.allow("host")
+
+
+def test_probe_success_closes_and_failure_reopens_with_doubled_cooldown():
+    breaker = make_breaker()
+    breaker.record_failure("host")
+    breaker.record_failure("host")
+    expire(breaker, "host")
+    assert breaker.allow("host")
+    assert breaker.record_failure("host") is True
+    assert 19 < breaker.retry_in("host") <= 20
+
+    # 冷却时长翻倍但不超过上限
+    expire(breaker, "host")
+    breaker.allow("host")
+    breaker.record_failure("host")
+    assert 24 < breaker.retry_in("host") <= 25
+
+    expire(breaker, "host")
+    assert breaker.allow("host")
+    breaker.record_success("host")
+    assert breaker._circuits["host"].state == CLOSED
+    assert breaker.allow("host") and breaker.allow("host")
+
+
+def test_open_state_persists_across_instances(tmp_path):
+    breaker = make_breaker(tmp_path)
+    breaker.record_failure("host")
+    breaker.record_failure("host")
+
+    restored = make_breaker(tmp_path)
+    assert restored.is_open("host")
+    assert restored._circuits["host"].state == OPEN
+
+    restored.record_success("host")
+    assert not make_breaker(tmp_path).is_open("host")
+
+
+def test_backoff_delay_respects_cap_and_retry_after():
+    for attempt in range(6):
+        assert 0 <= backoff_delay(attempt, base=1, cap=8) <= 8
+    assert backoff_delay(0, base=1, cap=8, retry_after=5) >= 5
+    assert backoff_delay(0, base=1, cap=8, retry_after=60) <= 8
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("12") == 12.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
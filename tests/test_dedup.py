@@ -0,0 +1,96 @@
+from utils.dedup import PaperDeduplicator, deduplicate_papers, fuse_ranked_lists, normalize_title, extract_identifiers
+
+
+def paper(title, **fields):
+    return dict(title=title, **fields)
+
+
+def test_normalize_title_strips_markers_and_truncation():
+    assert normalize_title("[PDF][HTML] Attention Is All You Need") == ("attention is all you need", False)
+    assert normalize_title("Attention is all you ...") == ("attention is all you", True)
+
+
+def test_extract_identifiers_from_doi_and_arxiv_urls():
+    assert extract_identifiers({"url": "https://doi.org/10.1145/3442188.3445922"}) == {"doi:10.1145/3442188.3445922"}
+    assert extract_identifiers({"id": "http://arxiv.org/abs/1706.03762v7"}) == {"arxiv:1706.03762"}
+    # arXiv的DOI同时给出arXiv ID
+    assert extract_identifiers({"doi": "10.48550/arXiv.1706.03762"}) == {"doi:10.48550/arxiv.1706.03762", "arxiv:1706.03762"}
+
+
+def test_same_arxiv_id_merges_despite_different_titles():
+    papers = deduplicate_papers([
+        paper("Attention is all you need", url="http://arxiv.org/abs/1706.03762", source="arXiv"),
+        paper("Transformer: a novel architecture", url="https://arxiv.org/pdf/1706.03762v5", source="Google Scholar"),
+    ])
+    assert len(papers) == 1
+    assert papers[0]["sources"] == ["arXiv", "Google Scholar"]
+    assert papers[0]["arxiv_id"] == "1706.03762"
+
+
+def test_near_duplicate_titles_merge_and_keep_richer_metadata():
+    papers = deduplicate_papers([
+        paper("[PDF] Deep Residual Learning for Image Recognition", abstract="short", authors=["He"], source="Google Scholar"),
+        paper("Deep residual learning for image recognition.", abstract="a much longer abstract", authors=["He", "Zhang"],
+              year="2016", citations=100, source="IEEE"),
+    ])
+    assert len(papers) == 1
+    merged = papers[0]
+    assert merged["abstract"] == "a much longer abstract"
+    assert merged["authors"] == ["He", "Zhang"]
+    assert merged["year"] == "2016"
+    assert merged["citations"] == 100
+
+
+def test_truncated_title_merges_and_is_replaced_by_full_title():
+    papers = deduplicate_papers([
+        paper("Language models are few-shot learners and also ..."),
+        paper("Language models are few-shot learners and also zero-shot reasoners"),
+    ])
+    assert len(papers) == 1
+    assert papers[0]["title"] == "Language models are few-shot learners and also zero-shot reasoners"
+
+
+def test_distinct_papers_are_kept_in_first_seen_order():
+    papers = deduplicate_papers([
+        paper("Graph neural networks for traffic forecasting"),
+        paper("Reinforcement learning from human feedback"),
+        paper("Graph neural networks for molecule generation"),
+    ])
+    assert [p["title"] for p in papers] == [
+        "Graph neural networks for traffic forecasting",
+        "Reinforcement learning from human feedback",
+        "Graph neural networks for molecule generation",
+    ]
+
+
+def test_add_reports_new_and_duplicate_records():
+    deduplicator = PaperDeduplicator()
+    record, is_new = deduplicator.add(paper("Diffusion models beat GANs on image synthesis"))
+    duplicate, again = deduplicator.add(paper("Diffusion Models Beat GANs on Image Synthesis"))
+    assert is_new and not again
+    assert duplicate is record
+    assert deduplicator.add(paper("")) == (None, False)
+
+
+def test_rrf_ranks_papers_found_by_several_lists_first():
+    a, b, c = paper("Alpha retrieval method"), paper("Beta generation model"), paper("Gamma evaluation benchmark")
+    fused = fuse_ranked_lists([([a, b], 1.0), ([dict(c), dict(b)], 1.0)], k=60)
+    # b在两个列表中各排第2，1/62 + 1/62 高于a和c的 1/61
+    assert [p["title"] for p in fused] == [b["title"], a["title"], c["title"]]
+    assert fused[0]["fusion_score"] == round(2 / 62, 6)
+
+
+def test_rrf_applies_list_weights_and_keeps_ties_in_first_seen_order():
+    a, b = paper("Alpha retrieval method"), paper("Beta generation model")
+    fused = fuse_ranked_lists([([a], 0.5), ([b], 1.0)], k=60)
+    assert [p["title"] for p in fused] == [b["title"], a["title"]]
+
+    fused = fuse_ranked_lists([([dict(a)], 1.0), ([dict(b)], 1.0)], k=60)
+    assert [p["title"] for p in fused] == [a["title"], b["title"]]
+
+
+def test_rrf_counts_duplicates_within_one_list_once():
+    a, b = paper("Alpha retrieval method"), paper("Beta generation model")
+    fused = fuse_ranked_lists([([a, dict(a), b], 1.0)], k=60)
+    assert len(fused) == 2
+    assert fused[0]["fusion_score"] == round(1 / 61, 6)
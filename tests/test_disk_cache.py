@@ -0,0 +1,73 @@
+import os
+import time
+
+from utils.disk_cache import DiskCache
+
+
+def entry_files(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(".json"))
+
+
+def test_get_returns_stored_value_and_none_for_missing(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    cache.set("key", {"papers": [1, 2]})
+    assert cache.get("key") == {"papers": [1, 2]}
+    assert cache.get("missing") is None
+
+
+def test_expired_entries_are_removed(tmp_path):
+    cache = DiskCache(str(tmp_path), ttl=60)
+    cache.set("old", 1)
+    path = cache._path("old")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"created": %f, "value": 1}' % (time.time() - 120))
+    assert cache.get("old") is None
+    assert not os.path.exists(path)
+
+
+def test_eviction_keeps_entry_count_within_limit(tmp_path):
+    cache = DiskCache(str(tmp_path), max_entries=20)
+    for i in range(100):
+        cache.set(str(i), i)
+        assert len(entry_files(tmp_path)) <= 20
+    # 超出上限时一次淘汰到容量的90%
+    assert len(entry_files(tmp_path)) == cache._count
+    assert cache._count <= 20
+
+
+def test_eviction_removes_least_recently_used(tmp_path):
+    cache = DiskCache(str(tmp_path), max_entries=10)
+    for i in range(10):
+        cache.set(str(i), i)
+        os.utime(cache._path(str(i)), (1000 + i, 1000 + i))
+    # 读取会刷新访问时间
+    assert cache.get("0") == 0
+    cache.set("new", "value")
+    assert cache.get("0") == 0
+    assert cache.get("1") is None
+    assert cache.get("new") == "value"
+
+
+def test_overwrites_and_deletes_keep_count_accurate(tmp_path):
+    cache = DiskCache(str(tmp_path), max_entries=50)
+    for i in range(5):
+        cache.set("same", i)
+    cache.set("other", 1)
+    assert cache._count == len(entry_files(tmp_path)) == 2
+
+    cache.delete("other")
+    assert cache._count == len(entry_files(tmp_path)) == 1
+
+    cache.clear()
+    assert entry_files(tmp_path) == []
+    cache.set("again", 1)
+    assert cache._count == 1
+
+
+def test_count_includes_entries_written_by_earlier_instances(tmp_path):
+    first = DiskCache(str(tmp_path), max_entries=5)
+    for i in range(5):
+        first.set(str(i), i)
+    second = DiskCache(str(tmp_path), max_entries=5)
+    second.set("extra", 1)
+    assert len(entry_files(tmp_path)) <= 5
@@ -0,0 +1,73 @@
+import time
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from utils.llm_client import LLMClient, LLMBudgetExceeded, parse_reset
+from utils.rate_limiter import RateLimiter
+
+
+class SlowModel:
+    """记录同时进行的调用数的假模型"""
+
+    def __init__(self, release):
+        self.release = release
+        self.calls = 0
+
+    def invoke(self, messages, **kwargs):
+        self.calls += 1
+        self.release.wait(5)
+        return SimpleNamespace(content="ok", usage_metadata={"input_tokens": 100, "output_tokens": 100},
+                               response_metadata={})
+
+
+def make_client(budget, model):
+    client = LLMClient(api_key="sk-test", token_budget=budget, rate_limiter=RateLimiter(0, 0, burst=1))
+    client.chat_model = model
+    return client
+
+
+def test_concurrent_calls_cannot_overshoot_budget():
+    release = threading.Event()
+    client = make_client(1000, SlowModel(release))
+    messages = [{"role": "user", "content": "x" * 400}]
+    outcomes = []
+
+    def call():
+        try:
+            client.invoke(messages, output_tokens=200)
+            outcomes.append("ok")
+        except LLMBudgetExceeded:
+            outcomes.append("budget")
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    # 每次调用预留约300个token，预算只够同时进行3次
+    for _ in range(500):
+        if len(outcomes) >= 5:
+            break
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert outcomes.count("ok") == 3
+    assert client.total_tokens() == 600
+    assert client._reserved == 0
+
+
+def test_budget_error_before_any_request():
+    model = SlowModel(threading.Event())
+    client = make_client(100, model)
+    with pytest.raises(LLMBudgetExceeded):
+        client.invoke([{"role": "user", "content": "x" * 400}], output_tokens=200)
+    assert model.calls == 0
+
+
+def test_parse_reset_durations():
+    assert parse_reset("1s") == 1
+    assert parse_reset("6m0s") == 360
+    assert parse_reset("250ms") == 0.25
+    assert parse_reset("bogus") is None
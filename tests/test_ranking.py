@@ -0,0 +1,46 @@
+from utils.ranking import filter_relevant, rank_papers, tokenize
+
+
+def paper(title, abstract=""):
+    return {"title": title, "abstract": abstract}
+
+
+PAPERS = [
+    paper("Scaling laws for neural language models", "large language model training"),
+    paper("Protein folding with deep learning", "structure prediction"),
+    paper("Instruction tuning for large language models", "language model alignment"),
+]
+
+
+def test_tokenize_drops_stopwords_and_splits_chinese_into_bigrams():
+    assert tokenize("A survey of Language Models") == ["language", "models"]
+    assert tokenize("大语言模型") == ["大语", "语言", "言模", "模型"]
+
+
+def test_filter_relevant_drops_papers_without_shared_terms():
+    kept, dropped = filter_relevant(PAPERS, ["large language model"], 0.1)
+    assert kept == [PAPERS[0], PAPERS[2]]
+    assert dropped == [PAPERS[1]]
+
+
+def test_filter_relevant_keeps_everything_when_nothing_matches():
+    # 中文主题对英文摘要，无法判断相关性
+    kept, dropped = filter_relevant(PAPERS, ["大语言模型"], 0.1)
+    assert kept == PAPERS and dropped == []
+
+    kept, dropped = filter_relevant(PAPERS, ["大语言模型"], 0.1, max_keep=2)
+    assert kept == PAPERS[:2] and dropped == PAPERS[2:]
+
+    kept, dropped = filter_relevant(PAPERS, ["大语言模型"], 0.1, require_match=True)
+    assert kept == [] and dropped == PAPERS
+
+
+def test_filter_relevant_max_keep_keeps_highest_scores_in_input_order():
+    kept, _ = filter_relevant(PAPERS, ["large language model alignment"], 0, max_keep=1)
+    assert kept == [PAPERS[2]]
+
+
+def test_rank_papers_orders_by_relevance():
+    ranked = rank_papers([dict(p) for p in PAPERS], ["protein folding"], weights={"bm25": 1.0})
+    assert ranked[0]["title"] == "Protein folding with deep learning"
+    assert ranked[0]["relevance_score"] >= ranked[-1]["relevance_score"]
@@ -0,0 +1,118 @@
+"""
+运行检查点：把检索结果、每篇论文的分析和已生成的综述章节保存到运行目录，中断后可以从断点继续
+"""
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+
+
+class RunCheckpoint:
+    def __init__(self, base_dir, run_id=None):
+        """
+        参数:
+        - base_dir: 所有运行目录的上级目录
+        - run_id: 运行ID，为None时生成新的ID；续跑时传入之前的ID
+        """
+        if run_id is None:
+            suffix = hashlib.sha1(f"{time.time()}-{os.getpid()}".encode("utf-8")).hexdigest()[:6]
+            run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{suffix}"
+        self.run_id = run_id
+        self.directory = os.path.join(base_dir, run_id)
+        self._lock = threading.Lock()
+        # 已保存的分析结果，第一次读取时从磁盘加载
+        self._analyses = None
+
+    def exists(self):
+        return os.path.exists(self._path("meta.json"))
+
+    def _path(self, *parts):
+        return os.path.join(self.directory, *parts)
+
+    @staticmethod
+    def _item_name(key):
+        return hashlib.sha256(str(key).encode("utf-8")).hexdigest()[:32] + ".json"
+
+    def _write(self, path, value):
+        """先写临时文件再原子替换，进程在写入过程中退出也不会留下半个文件"""
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _read_items(self, folder):
+        items = {}
+        directory = self._path(folder)
+        if not os.path.isdir(directory):
+            return items
+        for name in os.listdir(directory):
+            if name.endswith(".json"):
+                entry = self._read(os.path.join(directory, name))
+                if isinstance(entry, dict) and "key" in entry:
+                    items[entry["key"]] = entry.get("value")
+        return items
+
+    def save_meta(self, meta):
+        """保存运行信息(主题、参数等)"""
+        self._write(self._path("meta.json"), dict(meta, run_id=self.run_id, updated=time.time()))
+
+    def load_meta(self):
+        return self._read(self._path("meta.json")) or {}
+
+    def save_stage(self, name, value):
+        """保存整个阶段的结果，如检索到的论文列表"""
+        self._write(self._path(f"{name}.json"), value)
+
+    def load_stage(self, name):
+        """
+        返回:
+        - 阶段结果，该阶段尚未完成时返回None
+        """
+        return self._read(self._path(f"{name}.json"))
+
+    def save_analysis(self, key, value):
+        """保存单篇论文的分析结果，可在多个线程中同时调用"""
+        self._write(self._path("analyses", self._item_name(key)), {"key": key, "value": value})
+        with self._lock:
+            if self._analyses is not None:
+                self._analyses[key] = value
+
+    def load_analysis(self, key):
+        """
+        返回:
+        - 该论文已保存的分析结果，没有时返回None
+        """
+        with self._lock:
+            if self._analyses is None:
+                self._analyses = self._read_items("analyses")
+            return self._analyses.get(key)
+
+    def save_section(self, key, content):
+        """保存已生成的综述章节"""
+        self._write(self._path("sections", self._item_name(key)), {"key": key, "value": content})
+
+    def load_sections(self):
+        """
+        返回:
+        - 章节键 -> 内容
+        """
+        return self._read_items("sections")
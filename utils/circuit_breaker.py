@@ -0,0 +1,205 @@
+"""
+按来源熔断：连续失败达到阈值后在冷却期内直接跳过该来源，并提供带随机抖动的指数退避
+"""
+import os
+import json
+import time
+import random
+import tempfile
+import threading
+from email.utils import parsedate_to_datetime
+
+from config import (
+    CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_COOLDOWN, CIRCUIT_COOLDOWN_MAX, CIRCUIT_STATE_FILE,
+    BACKOFF_BASE, BACKOFF_MAX
+)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """来源处于熔断状态，请求未发出"""
+
+
+def parse_retry_after(value):
+    """
+    解析Retry-After响应头
+
+    返回:
+    - 需要等待的秒数，无法解析时返回None
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX, retry_after=None):
+    """
+    第attempt次重试(从0开始)前的等待时间
+
+    在 [0, min(cap, base * 2^attempt)] 内均匀取值(full jitter)，避免多个线程同时重试；
+    服务器给出Retry-After时至少等待该时长
+    """
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, cap))
+    return delay
+
+
+class _Circuit:
+    def __init__(self, state=CLOSED, failures=0, trips=0, open_until=0.0):
+        self.state = state
+        self.failures = failures        # 连续失败次数
+        self.trips = trips              # 连续熔断次数，决定下一次冷却时长
+        self.open_until = open_until    # 冷却结束的时间(墙上时间)
+        self.probing = False            # 半开状态下是否已有试探请求在进行
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, cooldown=CIRCUIT_COOLDOWN,
+                 max_cooldown=CIRCUIT_COOLDOWN_MAX, state_file=None):
+        """
+        参数:
+        - failure_threshold: 连续失败多少次后熔断
+        - cooldown: 首次熔断的冷却时长(秒)，之后每次翻倍
+        - max_cooldown: 冷却时长上限(秒)
+        - state_file: 可选，保存熔断状态的文件，使下一次运行也会跳过仍在冷却期的来源
+        """
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state_file = state_file
+        self._circuits = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def allow(self, key):
+        """
+        是否可以向key发出请求；冷却期结束后进入半开状态，只放行一个试探请求
+        """
+        with self._lock:
+            circuit = self._get(key)
+            if circuit.state == CLOSED:
+                return True
+            if circuit.state == OPEN:
+                if time.time() < circuit.open_until:
+                    return False
+                circuit.state = HALF_OPEN
+                circuit.probing = False
+            if circuit.probing:
+                return False
+            circuit.probing = True
+            return True
+
+    def release(self, key):
+        """试探请求未能得出结果(例如时间预算耗尽)时归还试探名额"""
+        with self._lock:
+            circuit = self._circuits.get(key)
+            if circuit is not None:
+                circuit.probing = False
+
+    def is_open(self, key):
+        """key是否仍在冷却期内，不占用半开状态的试探名额"""
+        with self._lock:
+            circuit = self._circuits.get(key)
+            return circuit is not None and circuit.state == OPEN and time.time() < circuit.open_until
+
+    def retry_in(self, key):
+        """距离冷却结束的秒数"""
+        with self._lock:
+            circuit = self._circuits.get(key)
+            if circuit is None or circuit.state != OPEN:
+                return 0.0
+            return max(0.0, circuit.open_until - time.time())
+
+    def record_success(self, key):
+        with self._lock:
+            circuit = self._get(key)
+            changed = circuit.state != CLOSED or circuit.trips
+            circuit.state = CLOSED
+            circuit.failures = 0
+            circuit.trips = 0
+            circuit.probing = False
+            if changed:
+                self._save()
+
+    def record_failure(self, key):
+        """
+        记录一次失败
+
+        返回:
+        - 本次失败是否导致熔断
+        """
+        with self._lock:
+            circuit = self._get(key)
+            circuit.failures += 1
+            if circuit.state == HALF_OPEN or circuit.failures >= self.failure_threshold:
+                duration = min(self.max_cooldown, self.cooldown * 2 ** circuit.trips)
+                circuit.state = OPEN
+                circuit.trips += 1
+                circuit.failures = 0
+                circuit.probing = False
+                circuit.open_until = time.time() + duration
+                self._save()
+                return True
+            return False
+
+    def _get(self, key):
+        circuit = self._circuits.get(key)
+        if circuit is None:
+            circuit = self._circuits[key] = _Circuit()
+        return circuit
+
+    def _load(self):
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            for key, value in state.items():
+                self._circuits[key] = _Circuit(
+                    state=value.get("state", CLOSED),
+                    trips=value.get("trips", 0),
+                    open_until=value.get("open_until", 0.0)
+                )
+        except (OSError, ValueError):
+            self._circuits = {}
+
+    def _save(self):
+        """原子地写入状态文件，调用方需持有锁"""
+        if not self.state_file:
+            return
+        state = {
+            key: {"state": c.state if c.state != HALF_OPEN else OPEN, "trips": c.trips, "open_until": c.open_until}
+            for key, c in self._circuits.items() if c.state != CLOSED or c.trips
+        }
+        try:
+            directory = os.path.dirname(os.path.abspath(self.state_file))
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.state_file)
+        except OSError:
+            pass
+
+
+_shared_breaker = None
+_shared_lock = threading.Lock()
+
+
+def get_circuit_breaker():
+    """获取进程内共享的熔断器"""
+    global _shared_breaker
+    with _shared_lock:
+        if _shared_breaker is None:
+            _shared_breaker = CircuitBreaker(state_file=CIRCUIT_STATE_FILE)
+        return _shared_breaker
@@ -0,0 +1,104 @@
+"""
+文本聚类：哈希n-gram向量(无需调用接口)和基于余弦相似度的平均链接层次聚类
+"""
+import re
+import zlib
+
+import numpy as np
+
+from utils.ranking import tokenize
+
+
+def ngram_embeddings(texts, dim=1024):
+    """
+    用哈希后的字符n-gram和词构造文本向量，作为嵌入接口不可用时的后备
+
+    参数:
+    - texts: 文本列表
+    - dim: 向量维度
+
+    返回:
+    - 形状为(len(texts), dim)的numpy数组，每行已做L2归一化
+    """
+    vectors = np.zeros((len(texts), dim))
+    for i, text in enumerate(texts):
+        normalized = " ".join(re.sub(r"[^\w]+", " ", (text or "").casefold()).split())
+        features = list(tokenize(normalized))
+        padded = f" {normalized} "
+        features.extend(padded[j:j + 3] for j in range(len(padded) - 2))
+        for feature in features:
+            vectors[i, zlib.crc32(feature.encode("utf-8")) % dim] += 1.0
+    return normalize_rows(vectors)
+
+
+def normalize_rows(vectors):
+    vectors = np.asarray(vectors, dtype=float)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def agglomerative_clusters(vectors, max_clusters, threshold, weights=None):
+    """
+    平均链接层次聚类：反复合并最相似的两个簇，直到最高相似度低于阈值且簇数不超过上限
+
+    参数:
+    - vectors: 已归一化的向量，每行一个样本
+    - max_clusters: 簇数上限
+    - threshold: 余弦相似度阈值，相似度不低于阈值的簇总会被合并
+    - weights: 每个样本的权重(如该研究方向下的论文数)，默认都为1
+
+    返回:
+    - 簇列表，每个簇是样本下标的列表，按总权重从大到小排列
+    """
+    n = len(vectors)
+    if n == 0:
+        return []
+    weights = np.ones(n) if weights is None else np.asarray(weights, dtype=float)
+    max_clusters = max(1, max_clusters)
+
+    similarity = vectors @ vectors.T
+    np.fill_diagonal(similarity, -np.inf)
+    members = {i: [i] for i in range(n)}
+    sizes = weights.copy()
+    active = np.ones(n, dtype=bool)
+
+    while len(members) > 1:
+        flat = np.argmax(similarity)
+        a, b = divmod(int(flat), n)
+        best = similarity[a, b]
+        if best < threshold and len(members) <= max_clusters:
+            break
+
+        # 平均链接的Lance-Williams更新：新簇与其他簇的相似度为两簇相似度按权重的平均
+        merged = (sizes[a] * similarity[a] + sizes[b] * similarity[b]) / (sizes[a] + sizes[b])
+        similarity[a] = merged
+        similarity[:, a] = merged
+        similarity[a, a] = -np.inf
+        similarity[b] = -np.inf
+        similarity[:, b] = -np.inf
+        similarity[a, ~active] = -np.inf
+        similarity[~active, a] = -np.inf
+
+        sizes[a] += sizes[b]
+        members[a].extend(members.pop(b))
+        active[b] = False
+
+    return sorted(members.values(), key=lambda indices: (-weights[indices].sum(), indices[0]))
+
+
+def representative(indices, vectors, weights=None):
+    """
+    返回簇中最能代表整个簇的样本下标：与簇内其他样本按权重加权的相似度之和最大
+
+    参数:
+    - indices: 簇内样本下标
+    - vectors: 已归一化的向量
+    - weights: 样本权重
+    """
+    indices = list(indices)
+    weights = np.ones(len(vectors)) if weights is None else np.asarray(weights, dtype=float)
+    block = vectors[indices] @ vectors[indices].T
+    scores = block @ weights[indices]
+    # 分数相同时选权重更大的
+    order = np.lexsort((-weights[indices], -scores))
+    return indices[int(order[0])]
@@ -0,0 +1,68 @@
+"""
+全局时间预算，用于让整个搜索阶段遵守 --timeout
+"""
+import time
+import threading
+
+
+class DeadlineExceeded(Exception):
+    """时间预算已耗尽"""
+
+
+class Deadline:
+    def __init__(self, seconds=None):
+        """
+        参数:
+        - seconds: 预算时长(秒)，None表示不限时
+        """
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds if seconds is not None else None
+        self._cancelled = threading.Event()
+
+    def remaining(self):
+        """剩余时间(秒)，不限时返回None"""
+        if self._cancelled.is_set():
+            return 0.0
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        """预算是否已耗尽或被取消"""
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def cancel(self):
+        """提前结束预算，正在等待的sleep会立即返回"""
+        self._cancelled.set()
+
+    def sleep(self, seconds):
+        """
+        在预算内等待，最多等待到预算耗尽
+
+        返回:
+        - 等待结束后预算仍有剩余时返回True
+        """
+        remaining = self.remaining()
+        if remaining is not None:
+            seconds = min(seconds, remaining)
+        if seconds > 0:
+            self._cancelled.wait(seconds)
+        return not self.expired()
+
+    def timeout(self, limit=None):
+        """
+        计算单次请求可用的超时时间
+
+        参数:
+        - limit: 单次请求的超时上限
+
+        返回:
+        - min(limit, 剩余时间)，预算耗尽时抛出DeadlineExceeded
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return limit
+        if remaining <= 0:
+            raise DeadlineExceeded("搜索时间预算已耗尽")
+        return remaining if limit is None else min(limit, remaining)
@@ -0,0 +1,249 @@
+"""
+论文近似去重：DOI/arXiv ID精确匹配 + 标题字符shingle的MinHash/LSH近似匹配
+"""
+import re
+import zlib
+import random
+
+from config import DEDUP_SIMILARITY_THRESHOLD, RRF_K
+
+# Google Scholar等来源在标题前附加的类型标记，例如 "[PDF] ..."、"[HTML][HTML] ..."
+_TITLE_MARKER = re.compile(r"^\s*(\[[^\]]{1,12}\]\s*)+")
+# 被截断的标题以省略号结尾
+_TRUNCATION = re.compile(r"(\.\.\.|…)\s*$")
+_DOI = re.compile(r"10\.\d{4,9}/[^\s\"'<>?#]+", re.I)
+_ARXIV_ID = re.compile(r"(?:arxiv\.org/(?:abs|pdf)/|arxiv[:.])([a-z\-]+/\d{7}|\d{4}\.\d{4,5})", re.I)
+
+_SHINGLE_SIZE = 3
+_PRIME = (1 << 61) - 1
+
+
+def normalize_title(title):
+    """
+    规范化标题
+
+    返回:
+    - (规范化后的标题, 是否被截断)
+    """
+    title = _TITLE_MARKER.sub("", title or "")
+    truncated = bool(_TRUNCATION.search(title))
+    title = _TRUNCATION.sub("", title)
+    return " ".join(re.sub(r"[^\w]+", " ", title.casefold()).split()), truncated
+
+
+def extract_identifiers(paper):
+    """从id和url中提取DOI与arXiv ID"""
+    text = " ".join(str(paper.get(field) or "") for field in ("id", "url", "doi", "arxiv_id"))
+    identifiers = set()
+
+    doi = _DOI.search(text)
+    if doi:
+        identifiers.add("doi:" + doi.group(0).rstrip(".,;").lower())
+
+    arxiv_id = _ARXIV_ID.search(text)
+    if arxiv_id:
+        identifiers.add("arxiv:" + arxiv_id.group(1).lower())
+    elif doi and doi.group(0).lower().startswith("10.48550/arxiv."):
+        identifiers.add("arxiv:" + doi.group(0)[len("10.48550/arxiv."):].lower())
+
+    return identifiers
+
+
+def _shingles(text):
+    if len(text) <= _SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + _SHINGLE_SIZE] for i in range(len(text) - _SHINGLE_SIZE + 1)}
+
+
+class PaperDeduplicator:
+    def __init__(self, threshold=DEDUP_SIMILARITY_THRESHOLD, num_perm=32, bands=8, seed=1):
+        """
+        参数:
+        - threshold: 标题shingle的Jaccard相似度阈值，达到即视为同一篇论文
+        - num_perm: MinHash签名长度
+        - bands: LSH分段数，num_perm必须能被整除
+        - seed: 哈希函数的随机种子，固定后结果可复现
+        """
+        assert num_perm % bands == 0
+        self.threshold = threshold
+        self.rows = num_perm // bands
+        self.bands = bands
+        rng = random.Random(seed)
+        self._hash_params = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+
+        self._records = []          # 合并后的论文，按首次出现顺序
+        self._shingles = []         # 每条记录的标题shingle集合
+        self._truncated = []        # 每条记录的标题是否被截断
+        self._by_identifier = {}    # DOI/arXiv ID -> 记录下标
+        self._by_title = {}         # 规范化标题 -> 记录下标
+        self._lsh_buckets = {}      # (段号, 段签名) -> 记录下标列表
+        self._by_prefix = {}        # 标题前4个词 -> 记录下标列表，用于匹配被截断的标题
+
+    def add(self, paper):
+        """
+        加入一篇论文，与已有记录重复时合并元数据
+
+        返回:
+        - (合并后的记录, 是否为新论文)
+        """
+        title, truncated = normalize_title(paper.get("title", ""))
+        if not title:
+            return None, False
+
+        identifiers = extract_identifiers(paper)
+        shingles = _shingles(title)
+        signature = self._minhash(shingles)
+        prefix = " ".join(title.split()[:4])
+
+        index = self._find(title, truncated, identifiers, shingles, signature, prefix)
+        if index is not None:
+            self._merge(index, paper, title, identifiers, truncated, shingles)
+            return self._records[index], False
+
+        record = dict(paper)
+        record["sources"] = [paper.get("source")] if paper.get("source") else []
+        self._annotate(record, identifiers)
+
+        index = len(self._records)
+        self._records.append(record)
+        self._shingles.append(shingles)
+        self._truncated.append(truncated)
+        self._index(index, title, identifiers, signature, prefix)
+        return record, True
+
+    def papers(self):
+        """去重后的论文，按首次出现的顺序"""
+        return list(self._records)
+
+    def _find(self, title, truncated, identifiers, shingles, signature, prefix):
+        for identifier in identifiers:
+            if identifier in self._by_identifier:
+                return self._by_identifier[identifier]
+
+        if title in self._by_title:
+            return self._by_title[title]
+
+        candidates = set()
+        for band in range(self.bands):
+            candidates.update(self._lsh_buckets.get(self._band_key(signature, band), ()))
+        candidates.update(self._by_prefix.get(prefix, ()))
+
+        best, best_score = None, 0.0
+        for index in sorted(candidates):
+            score = self._similarity(shingles, truncated, self._shingles[index], self._truncated[index])
+            if score >= self.threshold and score > best_score:
+                best, best_score = index, score
+        return best
+
+    @staticmethod
+    def _similarity(a, a_truncated, b, b_truncated):
+        """Jaccard相似度；一方标题被截断时，用截断标题被另一方包含的比例"""
+        if not a or not b:
+            return 0.0
+        overlap = len(a & b)
+        if a_truncated and not b_truncated:
+            return overlap / len(a)
+        if b_truncated and not a_truncated:
+            return overlap / len(b)
+        return overlap / len(a | b)
+
+    def _merge(self, index, paper, title, identifiers, truncated, shingles):
+        """把重复论文的元数据合并到已有记录中"""
+        record = self._records[index]
+
+        # 优先保留完整、不带标记的标题
+        if self._truncated[index] and not truncated:
+            record["title"] = _TITLE_MARKER.sub("", paper.get("title", "")).strip()
+            self._truncated[index] = False
+            self._shingles[index] = shingles
+
+        if len(paper.get("abstract") or "") > len(record.get("abstract") or ""):
+            record["abstract"] = paper["abstract"]
+        if len(paper.get("authors") or []) > len(record.get("authors") or []):
+            record["authors"] = paper["authors"]
+        for field in ("year", "url", "id"):
+            if not record.get(field) and paper.get(field):
+                record[field] = paper[field]
+        if (paper.get("citations") or 0) > (record.get("citations") or 0):
+            record["citations"] = paper["citations"]
+
+        source = paper.get("source")
+        if source and source not in record["sources"]:
+            record["sources"].append(source)
+
+        self._annotate(record, identifiers)
+        for identifier in identifiers:
+            self._by_identifier.setdefault(identifier, index)
+        self._by_title.setdefault(title, index)
+
+    @staticmethod
+    def _annotate(record, identifiers):
+        for identifier in identifiers:
+            kind, value = identifier.split(":", 1)
+            field = "doi" if kind == "doi" else "arxiv_id"
+            record.setdefault(field, value)
+
+    def _index(self, index, title, identifiers, signature, prefix):
+        for identifier in identifiers:
+            self._by_identifier.setdefault(identifier, index)
+        self._by_title.setdefault(title, index)
+        for band in range(self.bands):
+            self._lsh_buckets.setdefault(self._band_key(signature, band), []).append(index)
+        self._by_prefix.setdefault(prefix, []).append(index)
+
+    def _minhash(self, shingles):
+        hashes = [zlib.crc32(shingle.encode("utf-8")) for shingle in shingles] or [0]
+        return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in self._hash_params)
+
+    def _band_key(self, signature, band):
+        return band, signature[band * self.rows:(band + 1) * self.rows]
+
+
+def deduplicate_papers(papers, threshold=DEDUP_SIMILARITY_THRESHOLD):
+    """
+    对论文列表去重
+
+    参数:
+    - papers: 论文列表，靠前的记录作为合并后的主记录
+    - threshold: 标题相似度阈值
+
+    返回:
+    - 去重并合并元数据后的论文列表
+    """
+    deduplicator = PaperDeduplicator(threshold=threshold)
+    for paper in papers:
+        deduplicator.add(paper)
+    return deduplicator.papers()
+
+
+def fuse_ranked_lists(ranked_lists, k=RRF_K, threshold=DEDUP_SIMILARITY_THRESHOLD):
+    """
+    用倒数排名融合(RRF)合并多个有序的检索结果并去重
+
+    每篇论文的分数为其在各列表中 权重 / (k + 排名) 之和，同一列表中的重复条目只计一次，
+    因此被多个来源或多个子查询同时检索到的论文排名更靠前
+
+    参数:
+    - ranked_lists: [(有序论文列表, 权重)]，靠前列表中的记录作为合并后的主记录
+    - k: RRF平滑常数
+    - threshold: 标题相似度阈值
+
+    返回:
+    - 按融合分数从高到低排列的论文列表，分数相同时保持首次出现的顺序；分数记录在'fusion_score'字段
+    """
+    deduplicator = PaperDeduplicator(threshold=threshold)
+    scores = {}
+    for papers, weight in ranked_lists:
+        counted = set()
+        for rank, paper in enumerate(papers, 1):
+            record, _ = deduplicator.add(paper)
+            if record is None or id(record) in counted:
+                continue
+            counted.add(id(record))
+            scores[id(record)] = scores.get(id(record), 0.0) + weight / (k + rank)
+
+    records = deduplicator.papers()
+    records.sort(key=lambda record: scores.get(id(record), 0.0), reverse=True)
+    for record in records:
+        record["fusion_score"] = round(scores.get(id(record), 0.0), 6)
+    return records
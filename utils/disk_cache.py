@@ -0,0 +1,136 @@
+"""
+基于磁盘的键值缓存，支持过期时间和按最近使用时间淘汰
+"""
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+
+
+class DiskCache:
+    def __init__(self, directory, ttl=None, max_entries=None):
+        """
+        参数:
+        - directory: 缓存目录，每个条目保存为一个JSON文件
+        - ttl: 条目有效期(秒)，None表示永不过期
+        - max_entries: 最大条目数，超出后淘汰最久未使用的条目，一次淘汰到容量的90%，避免每次写入都扫描目录
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        os.makedirs(self.directory, exist_ok=True)
+
+        # 条目数在内存中计数，首次写入时扫描一次目录；其他进程的写入只在下次淘汰扫描时计入
+        self._lock = threading.Lock()
+        self._count = None
+
+    @staticmethod
+    def make_key(*parts):
+        """根据任意可JSON序列化的内容生成缓存键"""
+        raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """
+        读取缓存
+
+        返回:
+        - 缓存的值，不存在或已过期时返回None
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if self.ttl is not None and time.time() - entry.get("created", 0) > self.ttl:
+            self._discard(path)
+            return None
+
+        # 更新访问时间，供LRU淘汰使用
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return entry.get("value")
+
+    def set(self, key, value):
+        """写入缓存，先写临时文件再原子替换，多进程并发写入也不会读到半个文件"""
+        entry = {"created": time.time(), "value": value}
+        path = self._path(key)
+        is_new = not os.path.exists(path)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception:
+            self._remove(tmp_path)
+            raise
+
+        if self.max_entries is None or not is_new:
+            return
+        with self._lock:
+            if self._count is None:
+                self._count = len(self._scan())
+            else:
+                self._count += 1
+            if self._count > self.max_entries:
+                self._evict()
+
+    def delete(self, key):
+        self._discard(self._path(key))
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                self._remove(os.path.join(self.directory, name))
+        with self._lock:
+            self._count = None
+
+    def _discard(self, path):
+        """删除条目并更新计数"""
+        if self._remove(path):
+            with self._lock:
+                if self._count is not None:
+                    self._count -= 1
+
+    def _scan(self):
+        """返回目录中所有条目的 (访问时间, 路径)"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue
+            entries.append((mtime, path))
+        return entries
+
+    def _evict(self):
+        """超出容量时淘汰最久未使用的条目，调用方持有self._lock"""
+        entries = self._scan()
+        keep = self.max_entries - self.max_entries // 10
+        if len(entries) > self.max_entries:
+            entries.sort()
+            removed = sum(1 for mtime, path in entries[:len(entries) - keep] if self._remove(path))
+            self._count = len(entries) - removed
+        else:
+            self._count = len(entries)
+
+    @staticmethod
+    def _remove(path):
+        """删除文件，返回是否删除成功"""
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
@@ -0,0 +1,61 @@
+"""
+HTML解析工具：优先使用C实现的lxml解析器，并支持只解析结果列表子树、直接扫描页面内嵌的JSON
+"""
+import re
+import json
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+_json_decoder = json.JSONDecoder()
+
+
+def make_soup(markup, parse_only=None):
+    """
+    解析HTML
+
+    参数:
+    - markup: HTML文本
+    - parse_only: 可选，SoupStrainer，只构建匹配的元素及其子树
+
+    返回:
+    - BeautifulSoup对象
+    """
+    return BeautifulSoup(markup, HTML_PARSER, parse_only=parse_only)
+
+
+def only(tag, class_name):
+    """只解析带有指定class的元素，例如 only("div", "gs_ri")"""
+    # 解析过程中class属性尚未拆分成列表，按单词边界匹配，使 class="issue-item clearfix" 也能命中
+    return SoupStrainer(tag, class_=re.compile(r"(?:^|\s)" + re.escape(class_name) + r"(?:\s|$)"))
+
+
+def extract_js_json(text, marker):
+    """
+    不构建DOM树，直接在页面源码中查找 `marker = {...}` 形式的内嵌JSON
+
+    参数:
+    - text: 页面源码
+    - marker: 赋值语句左侧的变量名，例如 "xplGlobal.document.metadata"
+
+    返回:
+    - 解析出的JSON对象列表
+    """
+    results = []
+    position = text.find(marker)
+    while position != -1:
+        start = position + len(marker)
+        # 跳过空白和等号，定位到JSON值的开头
+        while start < len(text) and text[start] in " \t\r\n=":
+            start += 1
+        try:
+            value, end = _json_decoder.raw_decode(text, start)
+            results.append(value)
+        except ValueError:
+            end = start
+        position = text.find(marker, end)
+    return results
@@ -0,0 +1,188 @@
+"""
+HTTP录制/回放传输层
+
+- RecordingAdapter: 正常发送请求，并把响应保存到夹具目录
+- ReplayAdapter: 不访问网络，直接从夹具目录返回响应
+- ForwardingAdapter: 把请求转发到本地回放服务器(benchmarks/replay_server.py)，用于模拟真实的网络延迟和错误
+"""
+import os
+import json
+import base64
+import hashlib
+import tempfile
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+# 转发给回放服务器时，用请求头携带原始URL
+ORIGINAL_URL_HEADER = "X-Replay-Original-Url"
+
+# 这些响应头描述的是原始传输编码，回放时已经是解码后的内容
+_DROPPED_HEADERS = {"content-encoding", "transfer-encoding", "content-length", "set-cookie", "connection"}
+
+
+def canonical_url(url):
+    """对查询参数排序，使参数顺序不同的相同请求得到同一个键"""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return f"{parts.scheme}://{parts.netloc}{parts.path}" + (f"?{query}" if query else "")
+
+
+def route_of(url):
+    """主机+路径，不含查询参数"""
+    parts = urlsplit(url)
+    return f"{parts.netloc}{parts.path}"
+
+
+class FixtureStore:
+    def __init__(self, directory):
+        """
+        参数:
+        - directory: 夹具目录，每个响应保存为一个JSON文件
+        """
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def request_keys(method, url, body=None):
+        """
+        请求的查找键，从精确到宽松:
+        1. 方法+规范化URL+请求体
+        2. 方法+规范化URL
+        3. 方法+主机+路径
+        """
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        url = canonical_url(url)
+        body_hash = hashlib.sha256(body or b"").hexdigest()
+        return [
+            hashlib.sha256(f"{method} {url} {body_hash}".encode("utf-8")).hexdigest(),
+            hashlib.sha256(f"{method} {url}".encode("utf-8")).hexdigest(),
+            hashlib.sha256(f"{method} {route_of(url)}".encode("utf-8")).hexdigest(),
+        ]
+
+    def save(self, method, url, status, headers, content, body=None, level=0):
+        """
+        保存一个响应
+
+        参数:
+        - level: 使用第几级查找键，录制时为0(精确匹配)，手工构造的通用夹具可用1或2
+        """
+        key = self.request_keys(method, url, body)[level]
+        fixture = {
+            "method": method,
+            "url": url,
+            "status": status,
+            "headers": {k: v for k, v in dict(headers).items() if k.lower() not in _DROPPED_HEADERS},
+            "content": base64.b64encode(content).decode("ascii"),
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(fixture, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, os.path.join(self.directory, f"{key}.json"))
+
+    def load(self, method, url, body=None):
+        """
+        查找响应
+
+        返回:
+        - (状态码, 响应头字典, 响应内容bytes)，找不到时返回None
+        """
+        for key in self.request_keys(method, url, body):
+            path = os.path.join(self.directory, f"{key}.json")
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    fixture = json.load(f)
+                return fixture["status"], fixture["headers"], base64.b64decode(fixture["content"])
+        return None
+
+
+def build_response(request, status, headers, content):
+    """根据夹具构造requests.Response"""
+    response = requests.Response()
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = content
+    response.url = request.url
+    response.request = request
+    response.reason = "Replayed"
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    return response
+
+
+class RecordingAdapter(HTTPAdapter):
+    def __init__(self, store, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        # 读取全部内容，既用于保存也保证调用方仍可正常访问response.content
+        self.store.save(request.method, request.url, response.status_code,
+                        response.headers, response.content, body=request.body)
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    def __init__(self, store):
+        super().__init__()
+        self.store = store
+
+    def send(self, request, **kwargs):
+        fixture = self.store.load(request.method, request.url, request.body)
+        if fixture is None:
+            raise requests.ConnectionError(f"没有可回放的响应: {request.method} {request.url}", request=request)
+        return build_response(request, *fixture)
+
+    def close(self):
+        pass
+
+
+class ForwardingAdapter(HTTPAdapter):
+    def __init__(self, server_url, **kwargs):
+        """
+        参数:
+        - server_url: 本地回放服务器地址，例如 http://127.0.0.1:8765
+        """
+        super().__init__(**kwargs)
+        self.server_url = server_url.rstrip("/")
+
+    def send(self, request, **kwargs):
+        original_url = request.url
+        forwarded = request.copy()
+        parts = urlsplit(original_url)
+        forwarded.url = self.server_url + parts.path + (f"?{parts.query}" if parts.query else "")
+        forwarded.headers[ORIGINAL_URL_HEADER] = original_url
+        # 本地服务器不经过任何代理
+        kwargs["proxies"] = None
+        response = super().send(forwarded, **kwargs)
+        response.url = original_url
+        response.request = request
+        return response
+
+
+def make_transport(mode, fixture_dir=None, server_url=None):
+    """
+    根据模式创建传输适配器
+
+    参数:
+    - mode: "record"、"replay"或"forward"，None表示使用默认网络传输
+    - fixture_dir: record/replay模式的夹具目录
+    - server_url: forward模式的回放服务器地址
+
+    返回:
+    - 适配器工厂函数或None
+    """
+    if not mode:
+        return None
+    if mode == "record":
+        store = FixtureStore(fixture_dir)
+        return lambda: RecordingAdapter(store)
+    if mode == "replay":
+        store = FixtureStore(fixture_dir)
+        return lambda: ReplayAdapter(store)
+    if mode == "forward":
+        return lambda: ForwardingAdapter(server_url)
+    raise ValueError(f"未知的HTTP传输模式: {mode}")
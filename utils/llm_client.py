@@ -0,0 +1,347 @@
+"""
+共享的大模型调用客户端：限速、失败重试、按响应头调整节奏，以及按阶段统计token和延迟
+"""
+import re
+import time
+import threading
+from collections import defaultdict
+
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+from utils.logger import Logger
+from utils.rate_limiter import get_llm_rate_limiter
+from utils.circuit_breaker import backoff_delay, parse_retry_after
+from config import (
+    OPENAI_API_KEY, OPENAI_API_BASE_URL, OPENAI_MODEL, EMBEDDING_MODEL, LLM_OUTPUT_TOKENS_ESTIMATE,
+    LLM_MAX_RETRIES, LLM_REQUEST_TIMEOUT, LLM_TOKEN_BUDGET,
+    RETRY_STATUS_CODES, BACKOFF_BASE, BACKOFF_MAX
+)
+
+# 没有状态码但值得重试的异常(超时、连接中断)
+_RETRYABLE_ERRORS = {"APITimeoutError", "APIConnectionError", "Timeout", "ReadTimeout", "ConnectTimeout",
+                     "ConnectionError", "TimeoutError", "RemoteProtocolError"}
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+class LLMBudgetExceeded(Exception):
+    """本次运行的token预算已用完"""
+
+
+def estimate_tokens(text):
+    """粗略估算文本的token数：中文约每字1个token，其他字符约每4个字符1个token"""
+    cjk = sum(1 for ch in text if '\u4e00' <= ch <= '\u9fff')
+    return cjk + (len(text) - cjk) // 4 + 1
+
+
+def parse_reset(value):
+    """
+    解析x-ratelimit-reset-*响应头，如"1s"、"6m0s"、"250ms"
+
+    返回:
+    - 秒数，无法解析时返回None
+    """
+    if not value:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION.findall(value)
+    if not parts:
+        return None
+    scale = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+
+def _percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))]
+
+
+class LLMClient:
+    def __init__(self, model=OPENAI_MODEL, api_key=OPENAI_API_KEY, base_url=OPENAI_API_BASE_URL,
+                 max_retries=LLM_MAX_RETRIES, timeout=LLM_REQUEST_TIMEOUT, token_budget=LLM_TOKEN_BUDGET,
+                 rate_limiter=None):
+        """
+        参数:
+        - model / api_key / base_url: 模型和接口配置
+        - max_retries: 429、5xx、超时等可重试错误的最大重试次数
+        - timeout: 单次请求超时(秒)
+        - token_budget: 本次运行最多消耗的token数(输入加输出)，0表示不限制
+        - rate_limiter: 限速器，默认使用进程内共享的大模型限速器
+        """
+        self.logger = Logger("LLMClient")
+        # 重试由本客户端负责，底层客户端不再自行重试
+        options = dict(model_name=model, openai_api_key=api_key, base_url=base_url,
+                       max_retries=0, timeout=timeout)
+        try:
+            self.chat_model = ChatOpenAI(include_response_headers=True, **options)
+        except Exception:
+            # 旧版本langchain-openai不支持返回响应头，只能依靠429时的Retry-After
+            self.chat_model = ChatOpenAI(**options)
+        self.logger.info(f"初始化 ChatOpenAI 模型: {model}")
+        self.logger.info(f"使用API基础URL: {base_url if base_url else '默认'}")
+
+        self.model = model
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.token_budget = token_budget
+        self.rate_limiter = rate_limiter or get_llm_rate_limiter()
+
+        self._lock = threading.Lock()
+        # 已发出但尚未完成的调用预留的token数，与已用量一起检查预算，避免并发调用超出预算
+        self._reserved = 0
+        # 嵌入模型名 -> OpenAIEmbeddings，第一次调用时创建
+        self._embedding_models = {}
+        # 接口额度用完或返回429时，所有线程等到该时刻(单调时钟)后再发请求
+        self._paused_until = 0.0
+        self._usage = defaultdict(lambda: {
+            "calls": 0, "failures": 0, "retries": 0,
+            "prompt_tokens": 0, "completion_tokens": 0, "latencies": []
+        })
+
+    def invoke(self, messages, stage="default", output_tokens=LLM_OUTPUT_TOKENS_ESTIMATE, **kwargs):
+        """
+        调用模型，可重试的错误按指数退避重试
+
+        参数:
+        - messages: 消息列表
+        - stage: 统计用的阶段名，如"analysis"、"section"
+        - output_tokens: 为输出预留的token数，用于限速和预算检查
+        - kwargs: 传给接口的其他参数，如temperature、max_tokens、response_format
+
+        返回:
+        - 模型输出的文本
+
+        异常:
+        - LLMBudgetExceeded: token预算已用完
+        - 其他异常: 不可重试的错误，或重试次数用完后的最后一个错误
+        """
+        prompt_tokens = sum(estimate_tokens(str(m.get("content", ""))) for m in messages)
+        reserved = prompt_tokens + output_tokens
+        self._reserve(reserved)
+        try:
+            return self._invoke(messages, stage, prompt_tokens, output_tokens, kwargs)
+        finally:
+            self._release(reserved)
+
+    def _invoke(self, messages, stage, prompt_tokens, output_tokens, kwargs):
+        attempt = 0
+        while True:
+            self._wait_if_paused()
+            self.rate_limiter.acquire("requests")
+            self.rate_limiter.acquire("tokens", cost=prompt_tokens + output_tokens)
+
+            started = time.perf_counter()
+            try:
+                response = self.chat_model.invoke(messages, **kwargs)
+            except Exception as e:
+                status = getattr(e, "status_code", None)
+                retryable = status in RETRY_STATUS_CODES or type(e).__name__ in _RETRYABLE_ERRORS
+                if not retryable or attempt >= self.max_retries:
+                    self._record(stage, failed=True)
+                    raise
+
+                headers = getattr(getattr(e, "response", None), "headers", None) or {}
+                retry_after = parse_retry_after(headers.get("retry-after"))
+                delay = backoff_delay(attempt, BACKOFF_BASE, BACKOFF_MAX, retry_after)
+                if status == 429:
+                    # 限流是整个账号的，其他线程也一起暂停
+                    self._pause(delay)
+                self.logger.warning(f"调用模型失败({status or type(e).__name__})，{delay:.1f}秒后第 {attempt + 1} 次重试: {str(e)}")
+                self._record(stage, retried=True)
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            latency = time.perf_counter() - started
+            metadata = getattr(response, "response_metadata", None) or {}
+            self._pace(metadata.get("headers") or {})
+            used_prompt, used_completion = self._token_usage(response, prompt_tokens, output_tokens)
+            self._record(stage, latency=latency, prompt_tokens=used_prompt, completion_tokens=used_completion)
+            return response.content
+
+    @staticmethod
+    def _token_usage(response, prompt_estimate, output_estimate):
+        """从响应中读取实际消耗的token数，没有时使用估算值"""
+        usage = getattr(response, "usage_metadata", None)
+        if usage:
+            return usage.get("input_tokens", prompt_estimate), usage.get("output_tokens", output_estimate)
+        usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+        if usage:
+            return usage.get("prompt_tokens", prompt_estimate), usage.get("completion_tokens", output_estimate)
+        return prompt_estimate, estimate_tokens(response.content or "")
+
+    def embed(self, texts, stage="embedding", model=EMBEDDING_MODEL):
+        """
+        调用嵌入接口，与对话调用共用限速、token预算和用量统计；失败时不重试，由调用方降级处理
+
+        参数:
+        - texts: 文本列表
+        - stage: 统计用的阶段名
+        - model: 嵌入模型
+
+        返回:
+        - 与texts顺序一致的向量列表
+
+        异常:
+        - LLMBudgetExceeded: token预算已用完
+        - 其他异常: 接口调用失败
+        """
+        cost = sum(estimate_tokens(text) for text in texts)
+        self._reserve(cost)
+        try:
+            self._wait_if_paused()
+            self.rate_limiter.acquire("requests")
+            self.rate_limiter.acquire("tokens", cost=cost)
+
+            started = time.perf_counter()
+            try:
+                vectors = self._embedding_model(model).embed_documents(texts)
+            except Exception:
+                self._record(stage, failed=True)
+                raise
+            # 嵌入接口的用量不随结果返回，按估算值计入
+            self._record(stage, latency=time.perf_counter() - started, prompt_tokens=cost)
+            return vectors
+        finally:
+            self._release(cost)
+
+    def _embedding_model(self, model):
+        with self._lock:
+            if model not in self._embedding_models:
+                self._embedding_models[model] = OpenAIEmbeddings(
+                    model=model, openai_api_key=self.api_key, base_url=self.base_url,
+                    max_retries=0, timeout=self.timeout
+                )
+            return self._embedding_models[model]
+
+    def _reserve(self, cost):
+        """发出调用前在锁内检查预算并预留预计的token数，调用结束后由_release归还"""
+        with self._lock:
+            if self.token_budget:
+                spent = self._spent()
+                if spent + self._reserved + cost > self.token_budget:
+                    raise LLMBudgetExceeded(
+                        f"token预算已用完: 已使用 {spent}，进行中的调用预留 {self._reserved}，"
+                        f"本次预计 {cost}，预算 {self.token_budget}"
+                    )
+            self._reserved += cost
+
+    def _release(self, cost):
+        with self._lock:
+            self._reserved -= cost
+
+    def _pace(self, headers):
+        """剩余请求数或token额度即将用完时，暂停到额度重置"""
+        headers = {k.lower(): v for k, v in headers.items()}
+        waits = []
+        for kind, floor in (("requests", 1), ("tokens", LLM_OUTPUT_TOKENS_ESTIMATE)):
+            try:
+                remaining = int(headers.get(f"x-ratelimit-remaining-{kind}"))
+            except (TypeError, ValueError):
+                continue
+            if remaining <= floor:
+                reset = parse_reset(headers.get(f"x-ratelimit-reset-{kind}"))
+                if reset:
+                    waits.append(reset)
+        if waits:
+            self.logger.info(f"接口剩余额度不足，暂停 {max(waits):.1f} 秒等待额度重置")
+            self._pause(max(waits))
+
+    def _pause(self, seconds):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _wait_if_paused(self):
+        while True:
+            with self._lock:
+                remaining = self._paused_until - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(min(remaining, 1.0))
+
+    def _record(self, stage, latency=None, prompt_tokens=0, completion_tokens=0, failed=False, retried=False):
+        with self._lock:
+            usage = self._usage[stage]
+            if retried:
+                usage["retries"] += 1
+                return
+            if failed:
+                usage["failures"] += 1
+                return
+            usage["calls"] += 1
+            usage["prompt_tokens"] += prompt_tokens
+            usage["completion_tokens"] += completion_tokens
+            usage["latencies"].append(latency)
+
+    def _spent(self):
+        """已完成调用的token总数，调用方持有self._lock"""
+        return sum(u["prompt_tokens"] + u["completion_tokens"] for u in self._usage.values())
+
+    def total_tokens(self):
+        with self._lock:
+            return self._spent()
+
+    def usage_report(self):
+        """
+        返回:
+        - 阶段名 -> 调用次数、失败和重试次数、token数及延迟(平均/p50/p95/p99，秒)
+        """
+        with self._lock:
+            report = {}
+            for stage, usage in self._usage.items():
+                latencies = usage["latencies"]
+                report[stage] = {
+                    "calls": usage["calls"],
+                    "failures": usage["failures"],
+                    "retries": usage["retries"],
+                    "prompt_tokens": usage["prompt_tokens"],
+                    "completion_tokens": usage["completion_tokens"],
+                    "latency_mean": sum(latencies) / len(latencies) if latencies else 0.0,
+                    "latency_p50": _percentile(latencies, 50),
+                    "latency_p95": _percentile(latencies, 95),
+                    "latency_p99": _percentile(latencies, 99),
+                }
+            return report
+
+    def log_usage(self):
+        """把各阶段的用量写入日志"""
+        report = self.usage_report()
+        if not report:
+            return
+        self.logger.info("大模型调用统计:")
+        for stage, usage in report.items():
+            self.logger.info(
+                f"- {stage}: {usage['calls']} 次调用，失败 {usage['failures']} 次，重试 {usage['retries']} 次，"
+                f"输入 {usage['prompt_tokens']} / 输出 {usage['completion_tokens']} tokens，"
+                f"延迟 平均 {usage['latency_mean']:.2f}s p95 {usage['latency_p95']:.2f}s"
+            )
+        total = self.total_tokens()
+        budget = f" / 预算 {self.token_budget}" if self.token_budget else ""
+        self.logger.info(f"- 合计: {total} tokens{budget}")
+
+
+_shared_client = None
+_shared_lock = threading.Lock()
+
+
+def get_llm_client():
+    """获取进程内共享的大模型调用客户端，各模块共用同一套限速、重试和用量统计"""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = LLMClient()
+        return _shared_client
+
+
+def set_llm_client(client):
+    """替换进程内共享的客户端，供基准测试等场景指向其他接口；之后创建的模块使用新的客户端"""
+    global _shared_client
+    with _shared_lock:
+        _shared_client = client
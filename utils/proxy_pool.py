@@ -0,0 +1,150 @@
+"""
+代理池：按(代理, 主机)记录延迟、错误率和封禁信号，为每个请求挑选最健康的代理
+"""
+import time
+import threading
+
+from config import PROXY_QUARANTINE_BASE, PROXY_QUARANTINE_MAX
+
+# 判定为被封禁的状态码
+BAN_STATUS_CODES = (403, 429)
+
+# 判定为验证码/封禁页面的特征文本
+BAN_MARKERS = (
+    "gs_captcha",
+    "id=\"captcha-form\"",
+    "class=\"g-recaptcha\"",
+    "unusual traffic from your computer",
+    "please show you're not a robot",
+    "/sorry/index",
+)
+
+
+def is_banned_response(response):
+    """根据状态码和页面内容判断请求是否被目标网站拦截"""
+    if response.status_code in BAN_STATUS_CODES:
+        return True
+    if "html" not in response.headers.get("Content-Type", ""):
+        return False
+    text = response.text.lower()
+    return any(marker in text for marker in BAN_MARKERS)
+
+
+def proxy_name(proxies):
+    """代理字典的标识，None表示直连"""
+    if not proxies:
+        return "direct"
+    return proxies.get("https") or proxies.get("http")
+
+
+class _ProxyHealth:
+    def __init__(self):
+        self.latency = None         # 延迟的指数移动平均(秒)，None表示尚无样本
+        self.error_rate = 0.0       # 失败率的指数移动平均
+        self.consecutive_failures = 0
+        self.strikes = 0            # 连续隔离次数，决定下一次隔离时长
+        self.quarantined_until = 0.0
+
+
+class ProxyPool:
+    def __init__(self, quarantine_base=PROXY_QUARANTINE_BASE, quarantine_max=PROXY_QUARANTINE_MAX,
+                 alpha=0.3, max_consecutive_failures=2):
+        """
+        参数:
+        - quarantine_base: 首次隔离时长(秒)，之后每次翻倍
+        - quarantine_max: 隔离时长上限(秒)
+        - alpha: 指数移动平均的平滑系数
+        - max_consecutive_failures: 连续失败多少次后隔离
+        """
+        self.quarantine_base = quarantine_base
+        self.quarantine_max = quarantine_max
+        self.alpha = alpha
+        self.max_consecutive_failures = max_consecutive_failures
+        self._candidates = {}
+        self._health = {}
+        self._lock = threading.Lock()
+
+    def add(self, site, proxies):
+        """为网站添加一个候选代理，按添加顺序作为同等健康度下的优先级"""
+        if not proxies:
+            return
+        with self._lock:
+            candidates = self._candidates.setdefault(site, [])
+            if all(proxy_name(p) != proxy_name(proxies) for p in candidates):
+                candidates.append(proxies)
+
+    def candidates(self, site):
+        with self._lock:
+            return list(self._candidates.get(site, []))
+
+    def select(self, site, host, exclude=()):
+        """
+        选择当前最健康的代理
+
+        参数:
+        - site: 网站标识
+        - host: 目标主机，健康度按主机分别统计
+        - exclude: 本次请求已经试过的代理标识
+
+        返回:
+        - 代理字典；网站没有配置代理时返回None；候选全部试过时返回False
+        """
+        with self._lock:
+            candidates = [p for p in self._candidates.get(site, []) if proxy_name(p) not in exclude]
+            if not candidates:
+                return None if not self._candidates.get(site) else False
+
+            now = time.time()
+            available = [p for p in candidates if self._get_health(p, host).quarantined_until <= now]
+            if not available:
+                # 全部处于隔离期时，使用最早解除隔离的代理
+                return min(candidates, key=lambda p: self._get_health(p, host).quarantined_until)
+
+            return min(available, key=lambda p: self._score(self._get_health(p, host)))
+
+    def report(self, proxies, host, ok, latency=None, banned=False):
+        """
+        记录一次请求的结果
+
+        参数:
+        - proxies: 使用的代理字典
+        - host: 目标主机
+        - ok: 请求是否成功
+        - latency: 请求耗时(秒)
+        - banned: 是否被目标网站拦截(429/403/验证码)
+        """
+        if not proxies:
+            return
+        with self._lock:
+            health = self._get_health(proxies, host)
+            if latency is not None:
+                if health.latency is None:
+                    health.latency = latency
+                else:
+                    health.latency = self.alpha * latency + (1 - self.alpha) * health.latency
+            health.error_rate = self.alpha * (0.0 if ok else 1.0) + (1 - self.alpha) * health.error_rate
+
+            if ok:
+                health.consecutive_failures = 0
+                health.strikes = max(0, health.strikes - 1)
+                return
+
+            health.consecutive_failures += 1
+            if banned or health.consecutive_failures >= self.max_consecutive_failures:
+                health.strikes += 1
+                duration = min(self.quarantine_max, self.quarantine_base * 2 ** (health.strikes - 1))
+                health.quarantined_until = time.time() + duration
+                health.consecutive_failures = 0
+
+    def _get_health(self, proxies, host):
+        key = (proxy_name(proxies), host)
+        health = self._health.get(key)
+        if health is None:
+            health = self._health[key] = _ProxyHealth()
+        return health
+
+    @staticmethod
+    def _score(health):
+        """分数越低越健康，错误率的权重远高于延迟；尚无延迟样本的代理按1秒估计"""
+        latency = health.latency if health.latency is not None else 1.0
+        return health.error_rate * 100 + latency
@@ -0,0 +1,185 @@
+"""
+论文相关性排序：标题+摘要对主题的BM25分数，结合发表年份、引用数和多路检索的融合分数
+"""
+import re
+import datetime
+from collections import Counter
+
+import numpy as np
+
+from config import RANKING_WEIGHTS, RANKING_RECENCY_HALF_LIFE, BM25_K1, BM25_B
+
+_LATIN = re.compile(r"[a-z0-9]+")
+_CJK = re.compile(r"[㐀-䶿一-鿿豈-﫿]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in into is it its of on or that the their this to was were with
+we our via using based towards toward new approach approaches study method methods paper survey review
+""".split())
+
+
+def tokenize(text):
+    """
+    分词：英文按单词(去掉停用词)，中文按相邻两个字切分
+
+    返回:
+    - 词列表
+    """
+    text = (text or "").casefold()
+    tokens = [t for t in _LATIN.findall(text) if len(t) > 1 and t not in STOPWORDS]
+    for run in _CJK.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def bm25_scores(query_terms, documents, k1=BM25_K1, b=BM25_B):
+    """
+    计算每篇文档对查询的BM25分数
+
+    参数:
+    - query_terms: 查询词集合
+    - documents: 每篇文档的词列表
+
+    返回:
+    - numpy数组，长度与documents相同
+    """
+    terms = sorted(set(query_terms))
+    if not terms or not documents:
+        return np.zeros(len(documents))
+
+    column = {term: j for j, term in enumerate(terms)}
+    tf = np.zeros((len(documents), len(terms)))
+    lengths = np.empty(len(documents))
+    for i, tokens in enumerate(documents):
+        lengths[i] = len(tokens)
+        for term, count in Counter(tokens).items():
+            j = column.get(term)
+            if j is not None:
+                tf[i, j] = count
+
+    df = np.count_nonzero(tf, axis=0)
+    n = len(documents)
+    idf = np.log1p((n - df + 0.5) / (df + 0.5))
+    average_length = lengths.mean() or 1.0
+    norm = k1 * (1 - b + b * lengths / average_length)
+    return ((tf * (k1 + 1)) / (tf + norm[:, None]) * idf).sum(axis=1)
+
+
+def _normalize(values):
+    top = values.max() if len(values) else 0.0
+    return values / top if top > 0 else np.zeros_like(values)
+
+
+def _year(value):
+    match = re.search(r"(19|20)\d{2}", str(value or ""))
+    return int(match.group(0)) if match else None
+
+
+def rank_papers(papers, queries, weights=None, current_year=None):
+    """
+    按相关性从高到低排序论文
+
+    参数:
+    - papers: 论文列表
+    - queries: 主题字符串或子查询列表，所有子查询的词一起作为BM25的查询
+    - weights: 各信号的权重，默认RANKING_WEIGHTS；缺少的信号按0计
+    - current_year: 计算新近度的基准年份，默认今年
+
+    返回:
+    - 排序后的论文列表，分数相同时保持原顺序；综合分数记录在'relevance_score'字段
+    """
+    if not papers:
+        return []
+    if isinstance(queries, str):
+        queries = [queries]
+    weights = dict(RANKING_WEIGHTS if weights is None else weights)
+    current_year = current_year or datetime.date.today().year
+
+    query_terms = set()
+    for query in queries:
+        query_terms.update(tokenize(query))
+    # 标题计两次，使标题中的命中比摘要中的更重要
+    documents = [tokenize(f"{p.get('title', '')} {p.get('title', '')} {p.get('abstract', '')}") for p in papers]
+    relevance = _normalize(bm25_scores(query_terms, documents))
+
+    years = np.array([_year(p.get("year")) or np.nan for p in papers], dtype=float)
+    age = np.clip(current_year - years, 0, None)
+    recency = np.nan_to_num(np.power(0.5, age / RANKING_RECENCY_HALF_LIFE), nan=0.0)
+
+    citations = np.array([float(p.get("citations") or 0) for p in papers])
+    citations = _normalize(np.log1p(np.clip(citations, 0, None)))
+
+    fusion = _normalize(np.array([float(p.get("fusion_score") or 0) for p in papers]))
+
+    scores = (
+        weights.get("bm25", 0) * relevance
+        + weights.get("recency", 0) * recency
+        + weights.get("citations", 0) * citations
+        + weights.get("fusion", 0) * fusion
+    )
+
+    # 稳定排序，分数相同时保持融合排序的结果
+    order = np.argsort(-scores, kind="stable")
+    ranked = []
+    for index in order:
+        paper = papers[index]
+        paper["relevance_score"] = round(float(scores[index]), 6)
+        ranked.append(paper)
+    return ranked
+
+
+def query_terms(queries):
+    """主题字符串或子查询列表中的所有词"""
+    if isinstance(queries, str):
+        queries = [queries]
+    terms = set()
+    for query in queries:
+        terms.update(tokenize(query))
+    return terms
+
+
+def paper_terms(paper):
+    """论文标题和摘要中的词，标题计两次"""
+    return tokenize(f"{paper.get('title', '')} {paper.get('title', '')} {paper.get('abstract', '')}")
+
+
+def filter_relevant(papers, queries, min_score, max_keep=0, require_match=False):
+    """
+    分析前的本地相关性预筛选，只按标题和摘要对主题的BM25分数判断
+
+    参数:
+    - papers: 论文列表
+    - queries: 主题字符串或子查询列表
+    - min_score: 相对分数阈值(0~1)，以得分最高的论文为1，低于阈值或与主题没有共同词的论文被剔除
+    - max_keep: 最多保留的论文数，0表示不限制
+    - require_match: 为False时，若没有任何论文与主题有共同词(如中文主题对英文摘要)，无法判断相关性，全部保留；
+      为True时照常剔除，供已确认主题能匹配到论文的分批筛选使用
+
+    返回:
+    - (保留的论文列表, 剔除的论文列表)，两者都保持输入顺序；主题中没有可用的词时全部保留
+    """
+    terms = query_terms(queries)
+    if not papers or not terms:
+        return list(papers), []
+
+    documents = [paper_terms(p) for p in papers]
+    scores = bm25_scores(terms, documents)
+    if not require_match and scores.max() <= 0:
+        # 无法判断相关性时不剔除，只按输入顺序(检索排名)截断
+        limit = max_keep or len(papers)
+        return list(papers[:limit]), list(papers[limit:])
+
+    relative = _normalize(scores)
+    eligible = [i for i in range(len(papers)) if scores[i] > 0 and relative[i] >= min_score]
+    if max_keep and len(eligible) > max_keep:
+        # 超出预算时保留分数最高的，分数相同时保留靠前的
+        eligible = sorted(sorted(eligible, key=lambda i: -scores[i])[:max_keep])
+
+    keep = set(eligible)
+    kept = [p for i, p in enumerate(papers) if i in keep]
+    dropped = [p for i, p in enumerate(papers) if i not in keep]
+    return kept, dropped
+
@@ -0,0 +1,141 @@
+"""
+按主机划分的令牌桶限速器，可在线程之间以及(通过状态文件)进程之间共享
+"""
+import os
+import json
+import time
+import random
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows下没有fcntl，退化为仅进程内共享
+    fcntl = None
+
+from config import (
+    CRAWLER_DELAY_MIN, CRAWLER_DELAY_MAX, CRAWLER_BURST,
+    CRAWLER_HOST_LIMITS, CRAWLER_RATE_STATE_FILE,
+    LLM_RPM_LIMIT, LLM_TPM_LIMIT
+)
+
+
+class RateLimiter:
+    def __init__(self, min_interval=CRAWLER_DELAY_MIN, max_interval=CRAWLER_DELAY_MAX,
+                 burst=CRAWLER_BURST, limits=None, state_file=None):
+        """
+        参数:
+        - min_interval, max_interval: 未单独配置的键的请求间隔范围(秒)，每次取其中的随机值
+        - burst: 未单独配置的键在空闲后允许连续发出的请求数
+        - limits: {键: (最小间隔, 最大间隔, 突发数)}
+        - state_file: 可选，多进程共享的状态文件；为None时只在进程内共享
+        """
+        self.default_limit = (min_interval, max_interval, burst)
+        self.limits = dict(limits or {})
+        self.state_file = state_file if fcntl is not None else None
+        # 每个键的理论到达时间(TAT)，早于当前时间表示桶已满
+        self._tat = {}
+        self._lock = threading.Lock()
+        if self.state_file:
+            os.makedirs(os.path.dirname(os.path.abspath(self.state_file)), exist_ok=True)
+
+    def configure(self, key, min_interval, max_interval=None, burst=1):
+        """设置某个键的速率"""
+        with self._lock:
+            self.limits[key] = (min_interval, max_interval if max_interval is not None else min_interval, burst)
+
+    def acquire(self, key, cost=1, deadline=None):
+        """
+        等待直到可以对key发出请求
+
+        参数:
+        - key: 限速键，通常是主机名
+        - cost: 本次消耗的令牌数
+        - deadline: 可选，utils.deadline.Deadline；需要等待的时间超过剩余预算时不占用令牌
+
+        返回:
+        - 获得令牌返回True，预算不足返回False
+        """
+        remaining = deadline.remaining() if deadline is not None else None
+        wait = self._reserve(key, cost, remaining)
+        if wait is None:
+            return False
+        if wait > 0:
+            if deadline is not None:
+                return deadline.sleep(wait)
+            time.sleep(wait)
+        return True
+
+    def _reserve(self, key, cost, max_wait):
+        """预约令牌，返回需要等待的秒数；超过max_wait时不预约并返回None"""
+        min_interval, max_interval, burst = self.limits.get(key, self.default_limit)
+        increment = random.uniform(min_interval, max_interval) * cost
+        tolerance = min_interval * (burst - 1)
+
+        with self._lock:
+            if self.state_file:
+                with open(self.state_file, "a+", encoding="utf-8") as f:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                    try:
+                        f.seek(0)
+                        try:
+                            state = json.loads(f.read() or "{}")
+                        except ValueError:
+                            state = {}
+                        # 跨进程时使用墙上时间
+                        wait, new_tat = self._schedule(state.get(key), time.time(), increment, tolerance)
+                        if max_wait is not None and wait > max_wait:
+                            return None
+                        state[key] = new_tat
+                        f.seek(0)
+                        f.truncate()
+                        f.write(json.dumps(state))
+                        f.flush()
+                    finally:
+                        fcntl.flock(f, fcntl.LOCK_UN)
+                return wait
+
+            wait, new_tat = self._schedule(self._tat.get(key), time.monotonic(), increment, tolerance)
+            if max_wait is not None and wait > max_wait:
+                return None
+            self._tat[key] = new_tat
+            return wait
+
+    @staticmethod
+    def _schedule(tat, now, increment, tolerance):
+        """GCRA: 根据理论到达时间计算等待时间和新的理论到达时间"""
+        start = max(tat or now, now)
+        return max(0.0, start - tolerance - now), start + increment
+
+
+_shared_limiter = None
+_shared_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """获取进程内共享的爬虫限速器"""
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter(limits=CRAWLER_HOST_LIMITS, state_file=CRAWLER_RATE_STATE_FILE)
+        return _shared_limiter
+
+
+_llm_limiter = None
+
+
+def get_llm_rate_limiter():
+    """
+    获取进程内共享的大模型调用限速器
+
+    键"requests"按请求数计，键"tokens"按token数计(acquire时以cost传入)；
+    两者都允许积攒约10秒的配额，限制为0时对应的键不限速
+    """
+    global _llm_limiter
+    with _shared_lock:
+        if _llm_limiter is None:
+            _llm_limiter = RateLimiter(0, 0, burst=1)
+            if LLM_RPM_LIMIT:
+                _llm_limiter.configure("requests", 60 / LLM_RPM_LIMIT, burst=max(1, LLM_RPM_LIMIT // 6))
+            if LLM_TPM_LIMIT:
+                _llm_limiter.configure("tokens", 60 / LLM_TPM_LIMIT, burst=max(1, LLM_TPM_LIMIT // 6))
+        return _llm_limiter
@@ -0,0 +1,69 @@
+"""
+按主机复用的HTTP会话池，跨请求保持长连接和Cookie
+"""
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class SessionPool:
+    def __init__(self, pool_maxsize=10, adapter_factory=None):
+        """
+        参数:
+        - pool_maxsize: 每个主机保持的最大连接数
+        - adapter_factory: 可选，返回传输适配器的函数，用于录制/回放(见utils.http_replay)
+        """
+        self.pool_maxsize = pool_maxsize
+        self.adapter_factory = adapter_factory
+        self._sessions = {}
+        self._warmed_hosts = set()
+        self._lock = threading.Lock()
+        self._host_locks = {}
+
+    def get(self, host):
+        """获取指定主机的会话，不存在时创建"""
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = self._create_session()
+                self._sessions[host] = session
+                self._host_locks[host] = threading.Lock()
+            return session
+
+    def _create_session(self):
+        session = requests.Session()
+        if self.adapter_factory is not None:
+            adapter = self.adapter_factory()
+        else:
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def warm_up(self, host, fetch):
+        """
+        对主机执行一次预热请求(例如访问首页获取Cookie)，同一主机只预热一次
+
+        参数:
+        - host: 主机名
+        - fetch: 执行预热请求的函数，接收该主机的会话作为参数，抛出异常视为预热失败
+
+        返回:
+        - 本次是否实际执行了预热请求
+        """
+        session = self.get(host)
+        with self._host_locks[host]:
+            if host in self._warmed_hosts:
+                return False
+            fetch(session)
+            self._warmed_hosts.add(host)
+            return True
+
+    def close(self):
+        """关闭所有会话并释放连接"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+            self._warmed_hosts.clear()
+            self._host_locks.clear()